@@ -1,27 +1,42 @@
 #!/usr/bin/env python
 # coding: utf-8
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for, send_file, abort, flash, session
+from flask import Flask, Request, render_template, request, jsonify, redirect, url_for, send_file, abort, flash, session
 import requests
 import sqlite3
 import json
 import os
 import csv
+import re
 import io
 import uuid
-import base64
 import time
+import math
+import random
 import datetime
+import threading
+import queue
+import atexit
+import multiprocessing
+import unicodedata
 import logging
 from logging.handlers import RotatingFileHandler
 from functools import wraps
+from array import array
+from collections import OrderedDict
+from urllib.parse import quote
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
 from werkzeug.utils import secure_filename
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.security import generate_password_hash, check_password_hash
 from dotenv import load_dotenv
+import click
 from flask_wtf.csrf import CSRFProtect
-import matplotlib
-matplotlib.use('Agg')  # Use Agg backend to avoid GUI requirements
-import matplotlib.pyplot as plt
+from markupsafe import escape
+import chart_render
+import text_terms
 import numpy as np
 
 # Load environment variables
@@ -39,7 +54,62 @@ class Config:
     SESSION_COOKIE_SECURE = os.environ.get('SESSION_COOKIE_SECURE', 'False').lower() == 'true'
     SESSION_COOKIE_HTTPONLY = True
     PERMANENT_SESSION_LIFETIME = int(os.environ.get('SESSION_LIFETIME', '1800'))
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '8'))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '30'))
+    DB_STORAGE_PROFILE = os.environ.get('DB_STORAGE_PROFILE', 'concurrent')
+    DB_PRAGMAS = {}  # Per-pragma overrides on top of the storage profile
+    DB_BUSY_TIMEOUT = float(os.environ.get('DB_BUSY_TIMEOUT', '5'))
+    DB_BUSY_RETRIES = int(os.environ.get('DB_BUSY_RETRIES', '5'))
+    DB_BUSY_BACKOFF = float(os.environ.get('DB_BUSY_BACKOFF', '0.05'))
+    DB_BUSY_BACKOFF_MAX = float(os.environ.get('DB_BUSY_BACKOFF_MAX', '1.0'))
+    SURVEY_CACHE_MAX_ENTRIES = int(os.environ.get('SURVEY_CACHE_MAX_ENTRIES', '512'))
+    SURVEY_CACHE_MAX_BYTES = int(os.environ.get('SURVEY_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+    SURVEY_CACHE_TTL = float(os.environ.get('SURVEY_CACHE_TTL', '60'))
+    OWNERSHIP_CACHE_MAX_ENTRIES = int(os.environ.get('OWNERSHIP_CACHE_MAX_ENTRIES', '20000'))
+    OWNERSHIP_CACHE_TTL = float(os.environ.get('OWNERSHIP_CACHE_TTL', '60'))  # Bounds how long another worker's survey delete goes unnoticed
+    CHART_RENDER_PROCESSES = int(os.environ.get('CHART_RENDER_PROCESSES', '2'))  # 0 renders in the request thread
+    CHART_RENDER_TIMEOUT = float(os.environ.get('CHART_RENDER_TIMEOUT', '30'))
+    CHART_BACKEND = os.environ.get('CHART_BACKEND', 'svg')  # svg, json (drawn in the browser) or matplotlib
+    RESPONSES_PAGE_SIZE = int(os.environ.get('RESPONSES_PAGE_SIZE', '50'))
+    RESPONSES_PAGE_SIZE_MAX = int(os.environ.get('RESPONSES_PAGE_SIZE_MAX', '500'))
+    EXPORT_WORKERS = int(os.environ.get('EXPORT_WORKERS', '2'))
+    EXPORT_INLINE_MAX_RESPONSES = int(os.environ.get('EXPORT_INLINE_MAX_RESPONSES', '5000'))  # Larger exports run as jobs
+    EXPORT_JOB_STALE_AFTER = int(os.environ.get('EXPORT_JOB_STALE_AFTER', '300'))  # Seconds without progress before requeueing
+    SUBMIT_MODE = os.environ.get('SUBMIT_MODE', 'direct')  # direct (a commit per submission) or group (batched by a writer thread)
+    SUBMIT_BATCH_SIZE = int(os.environ.get('SUBMIT_BATCH_SIZE', '200'))
+    SUBMIT_BATCH_WAIT = float(os.environ.get('SUBMIT_BATCH_WAIT', '0.01'))  # Seconds the writer waits for a batch to fill
+    SUBMIT_QUEUE_MAX = int(os.environ.get('SUBMIT_QUEUE_MAX', '10000'))  # Queued submissions before new ones get a 503
+    SUBMIT_ACK_TIMEOUT = float(os.environ.get('SUBMIT_ACK_TIMEOUT', '10'))  # Seconds a submission waits for its commit
+    IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', '1000'))  # Imported responses per write transaction
+    IMPORT_MAX_CONTENT_LENGTH = int(os.environ.get('IMPORT_MAX_CONTENT_LENGTH', str(1024 * 1024 * 1024)))  # 1GB max import upload
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'sqlite')  # sqlite (shared by all workers) or memory (per process)
+    RATE_LIMIT_LOCAL_ROUTES = os.environ.get('RATE_LIMIT_LOCAL_ROUTES', 'submit_survey')  # Routes limited per process, off the write lock
+    RATE_LIMITS = os.environ.get('RATE_LIMITS', '')  # Per-route overrides, e.g. "submit_survey=100/60,generate_questions=5/60"
     
+# SQLite storage profiles, applied in init_db and on every pooled connection.
+# 'legacy' keeps SQLite's rollback journal; 'concurrent' switches to WAL so
+# readers never block the writer; 'durable' is WAL with a full fsync per commit.
+STORAGE_PROFILES = {
+    'legacy': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL'
+    },
+    'concurrent': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -16000,  # 16MB page cache
+        'mmap_size': 134217728,  # 128MB
+        'temp_store': 'MEMORY'
+    },
+    'durable': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'cache_size': -16000,
+        'mmap_size': 134217728,
+        'temp_store': 'MEMORY'
+    }
+}
+
 class DevelopmentConfig(Config):
     DEBUG = True
     SESSION_COOKIE_SECURE = False
@@ -52,7 +122,17 @@ class TestingConfig(Config):
     DATABASE = 'test.db'
 
 # Flask application setup
+class SurveyRequest(Request):
+    """Request with a larger body limit for bulk imports, which are streamed rather than held in memory"""
+
+    @property
+    def max_content_length(self):
+        if self.endpoint == 'import_responses':
+            return app.config['IMPORT_MAX_CONTENT_LENGTH']
+        return app.config['MAX_CONTENT_LENGTH']
+
 app = Flask(__name__)
+app.request_class = SurveyRequest
 
 # Add context processor for now() function in templates
 @app.context_processor
@@ -87,205 +167,765 @@ if not app.debug:
     app.logger.info('Survey app startup')
 
 # Database connection management
+class ConnectionPool:
+    """Pool of warm SQLite connections shared by the threads of one worker process.
+
+    A thread holds at most one connection at a time; nested ``DatabaseConnection``
+    blocks on the same thread reuse it and only the outermost block commits and
+    hands the connection back. Idle connections are kept on a LIFO stack so the
+    most recently used (warmest) connection is handed out first.
+    """
+
+    def __init__(self, db_path, max_connections=8, timeout=30.0, pragmas=None, busy_timeout=5.0):
+        self.db_path = db_path
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.busy_timeout = busy_timeout
+        self.pragmas = dict(pragmas or {})
+        self._lock = threading.Condition(threading.Lock())
+        self._local = threading.local()
+        self._reset()
+
+    def _reset(self):
+        """Forget every connection (used after a fork, where they can't be shared)"""
+        self._pid = os.getpid()
+        self._idle = []
+        self._open = 0
+        self._hits = 0
+        self._misses = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def dedicated(self):
+        """A new connection configured like the pooled ones but outside the pool; the caller closes it"""
+        return self._connect()
+
+    def acquire(self):
+        """Check out a connection for the current thread, re-entrantly"""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._reset()
+
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            self._local.depth += 1
+            return held
+
+        with self._lock:
+            if not self._idle and self._open >= self.max_connections:
+                self._waits += 1
+                started = time.monotonic()
+                while not self._idle and self._open >= self.max_connections:
+                    remaining = self.timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        raise sqlite3.OperationalError('Timed out waiting for a pooled database connection')
+                    self._lock.wait(remaining)
+                self._wait_time += time.monotonic() - started
+
+            if self._idle:
+                conn = self._idle.pop()
+                self._hits += 1
+            else:
+                conn = None
+                self._open += 1
+                self._misses += 1
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._lock:
+                    self._open -= 1
+                    self._lock.notify()
+                raise
+
+        self._local.conn = conn
+        self._local.depth = 1
+        self._local.callbacks = []
+        return conn
+
+    def depth(self):
+        """How many nested blocks on the current thread hold its connection"""
+        return getattr(self._local, 'depth', 0) if getattr(self._local, 'conn', None) else 0
+
+    def after_release(self, callback):
+        """Run callback once the current thread's transaction has finished.
+
+        Runs immediately when the thread holds no connection. Used to invalidate
+        caches only after a change is committed, so a concurrent reader can't
+        re-cache the old data in between.
+        """
+        if self.depth() == 0:
+            callback()
+        else:
+            self._local.callbacks.append(callback)
+
+    def release(self, conn, discard=False):
+        """Give a connection back; returns True once the outermost holder is done"""
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return False
+
+        self._local.conn = None
+        callbacks, self._local.callbacks = self._local.callbacks, []
+        try:
+            self._return(conn, discard)
+        finally:
+            for callback in callbacks:
+                callback()
+        return True
+
+    def _return(self, conn, discard):
+        with self._lock:
+            if discard or conn.in_transaction:
+                # Never hand out a connection in an unknown state
+                self._open -= 1
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            else:
+                self._idle.append(conn)
+            self._lock.notify()
+
+    def close_all(self):
+        """Close idle connections (connections in use are closed on release)"""
+        with self._lock:
+            while self._idle:
+                self._idle.pop().close()
+                self._open -= 1
+
+    def stats(self):
+        """Counters used to size gunicorn workers/threads against the pool"""
+        with self._lock:
+            return {
+                'db_path': self.db_path,
+                'max_connections': self.max_connections,
+                'open': self._open,
+                'idle': len(self._idle),
+                'in_use': self._open - len(self._idle),
+                'hits': self._hits,
+                'misses': self._misses,
+                'waits': self._waits,
+                'wait_time': round(self._wait_time, 4)
+            }
+
+def get_storage_pragmas():
+    """Pragmas for the configured storage profile plus any DB_PRAGMAS overrides"""
+    profile = app.config['DB_STORAGE_PROFILE']
+    if profile not in STORAGE_PROFILES:
+        raise ValueError(f"Unknown DB_STORAGE_PROFILE '{profile}'. Must be one of: {', '.join(STORAGE_PROFILES)}")
+    pragmas = dict(STORAGE_PROFILES[profile])
+    pragmas.update(app.config['DB_PRAGMAS'])
+    return pragmas
+
+def is_busy_error(error):
+    """True for the SQLITE_BUSY/SQLITE_LOCKED errors worth retrying"""
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ('locked' in message or 'busy' in message)
+
+def retry_on_busy(operation, description='database write'):
+    """Run operation(), retrying busy errors with bounded exponential backoff.
+
+    Only use this for operations that are safe to repeat, i.e. ones that fail
+    before any statement of the transaction has taken effect.
+    """
+    attempts = max(app.config['DB_BUSY_RETRIES'], 0) + 1
+    delay = app.config['DB_BUSY_BACKOFF']
+    for attempt in range(1, attempts + 1):
+        try:
+            return operation()
+        except sqlite3.OperationalError as e:
+            if not is_busy_error(e) or attempt == attempts:
+                raise
+            app.logger.warning(f"Database busy during {description}, retry {attempt}/{attempts - 1} in {delay:.3f}s")
+            time.sleep(delay * random.uniform(0.5, 1.0))
+            delay = min(delay * 2, app.config['DB_BUSY_BACKOFF_MAX'])
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(db_path=None):
+    """Return the connection pool for a database path, creating it on first use"""
+    db_path = db_path or app.config['DATABASE']
+    pool = _pools.get(db_path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(db_path)
+            if pool is None:
+                pool = ConnectionPool(
+                    db_path,
+                    max_connections=app.config['DB_POOL_SIZE'],
+                    timeout=app.config['DB_POOL_TIMEOUT'],
+                    pragmas=get_storage_pragmas(),
+                    busy_timeout=app.config['DB_BUSY_TIMEOUT']
+                )
+                _pools[db_path] = pool
+    return pool
+
 class DatabaseConnection:
-    def __init__(self, db_path=None):
+    """Pooled connection whose block runs as one transaction.
+
+    Pass write=True for blocks that modify data: the transaction then starts
+    with BEGIN IMMEDIATE so the write lock is taken (with busy retries) up front
+    instead of failing half-way through when a read has to be upgraded.
+
+    Blocks nest on the thread's connection. A write block nested in another
+    transaction runs as a savepoint: its changes are released into the outer
+    transaction, or rolled back on their own if it raises. A write block
+    nested in a read block starts and commits its own transaction, so the
+    write lock is never held for the rest of the outer read.
+    """
+
+    def __init__(self, db_path=None, write=False):
         self.db_path = db_path or app.config['DATABASE']
+        self.write = write
         self.conn = None
+        self.pool = None
+        self.savepoint = None
+        self.owns_transaction = False
     
     def __enter__(self):
-        self.conn = sqlite3.connect(self.db_path)
-        self.conn.row_factory = sqlite3.Row
+        self.pool = get_pool(self.db_path)
+        self.conn = self.pool.acquire()
+        if self.write:
+            try:
+                if self.conn.in_transaction:
+                    self.savepoint = f"nested_{self.pool.depth()}"
+                    self.conn.execute(f"SAVEPOINT {self.savepoint}")
+                else:
+                    retry_on_busy(lambda: self.conn.execute('BEGIN IMMEDIATE'), 'BEGIN IMMEDIATE')
+                    self.owns_transaction = True
+            except Exception:
+                self.pool.release(self.conn)
+                raise
         return self.conn
     
     def __exit__(self, exc_type, exc_val, exc_tb):
         if self.conn:
-            if exc_type is not None:
-                self.conn.rollback()
-            else:
-                self.conn.commit()
-            self.conn.close()
+            if self.savepoint:
+                try:
+                    if exc_type is not None:
+                        self.conn.execute(f"ROLLBACK TO {self.savepoint}")
+                    self.conn.execute(f"RELEASE {self.savepoint}")
+                finally:
+                    self.pool.release(self.conn)
+                return
+            # Other nested blocks share the outer transaction; the block that began it finishes it
+            if self.pool.depth() > 1 and not self.owns_transaction:
+                self.pool.release(self.conn)
+                return
+            failed = False
+            try:
+                if exc_type is not None:
+                    self.conn.rollback()
+                else:
+                    # A busy COMMIT leaves the transaction open, so it can be retried
+                    retry_on_busy(self.conn.commit, 'COMMIT')
+            except sqlite3.Error:
+                failed = True
+                raise
+            finally:
+                self.pool.release(self.conn, discard=failed)
+
+class PooledConnection:
+    """Wrapper returned by get_db_connection() whose close() returns it to the pool"""
+
+    def __init__(self, pool):
+        self._pool = pool
+        self._conn = pool.acquire()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        if self._conn is not None:
+            try:
+                if self._pool.depth() == 1:
+                    self._conn.rollback()
+            finally:
+                self._pool.release(self._conn)
+                self._conn = None
 
 def get_db_connection():
     """Legacy function for backward compatibility"""
-    conn = sqlite3.connect(app.config['DATABASE'])
-    conn.row_factory = sqlite3.Row
-    return conn
+    return PooledConnection(get_pool())
 
-def init_db():
-    """Initialize the database schema and add default data"""
-    with DatabaseConnection() as conn:
-        cursor = conn.cursor()
-        
-        # Create surveys table with added features
+def apply_storage_profile(db_path=None):
+    """Persist the storage profile's journal mode on the database file"""
+    pragmas = get_storage_pragmas()
+    with DatabaseConnection(db_path) as conn:
+        journal_mode = conn.execute(f"PRAGMA journal_mode = {pragmas['journal_mode']}").fetchone()[0]
+    app.logger.info(f"Database storage profile '{app.config['DB_STORAGE_PROFILE']}' (journal_mode={journal_mode})")
+    return journal_mode
+
+# Schema migrations. Each migration runs once, in order, inside its own write
+# transaction, and PRAGMA user_version records the last one applied. Append new
+# migrations to MIGRATIONS; never edit one that has shipped.
+def _migration_initial_schema(cursor):
+    """Base tables plus the default templates for brand new databases"""
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='surveys'")
+    is_new_database = cursor.fetchone() is None
+    
+    # Create surveys table with added features
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS surveys (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        description TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        creator_ip TEXT,
+        creator_email TEXT,
+        theme TEXT DEFAULT 'dark',
+        header_image TEXT,
+        logo_image TEXT,
+        is_template INTEGER DEFAULT 0,
+        published INTEGER DEFAULT 0,
+        archived INTEGER DEFAULT 0,
+        expiry_date DATE
+    )
+    """)
+    
+    # Create questions table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS questions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        survey_id INTEGER NOT NULL,
+        question_text TEXT NOT NULL,
+        question_type TEXT DEFAULT 'multiple-choice',
+        position INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        image_path TEXT,
+        required INTEGER DEFAULT 0,
+        FOREIGN KEY (survey_id) REFERENCES surveys (id) ON DELETE CASCADE
+    )
+    """)
+    
+    # Create options table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS options (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        question_id INTEGER NOT NULL,
+        option_text TEXT NOT NULL,
+        position INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        image_path TEXT,
+        FOREIGN KEY (question_id) REFERENCES questions (id) ON DELETE CASCADE
+    )
+    """)
+    
+    # Create responses table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS responses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        survey_id INTEGER NOT NULL,
+        respondent_ip TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (survey_id) REFERENCES surveys (id) ON DELETE CASCADE
+    )
+    """)
+    
+    # Create answers table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS answers (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        response_id INTEGER NOT NULL,
+        question_id INTEGER NOT NULL,
+        option_id INTEGER,
+        text_answer TEXT,
+        number_answer REAL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (response_id) REFERENCES responses (id) ON DELETE CASCADE,
+        FOREIGN KEY (question_id) REFERENCES questions (id) ON DELETE CASCADE,
+        FOREIGN KEY (option_id) REFERENCES options (id) ON DELETE CASCADE
+    )
+    """)
+    
+    # Create users table for future authentication
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL,
+        name TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_login TIMESTAMP,
+        is_admin INTEGER DEFAULT 0
+    )
+    """)
+    
+    # Databases created before migrations existed already have their templates
+    if not is_new_database:
+        return
+    
+    # Add default templates only if they don't exist
+    cursor.execute("SELECT COUNT(*) as count FROM surveys WHERE is_template = 1")
+    template_count = cursor.fetchone()['count']
+    
+    if template_count == 0:
+        # Add template for customer satisfaction
         cursor.execute("""
-        CREATE TABLE IF NOT EXISTS surveys (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            description TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            creator_ip TEXT,
-            creator_email TEXT,
-            theme TEXT DEFAULT 'dark',
-            header_image TEXT,
-            logo_image TEXT,
-            is_template INTEGER DEFAULT 0,
-            published INTEGER DEFAULT 0,
-            archived INTEGER DEFAULT 0,
-            expiry_date DATE
-        )
-        """)
+        INSERT INTO surveys (title, description, is_template, theme)
+        VALUES (?, ?, ?, ?)
+        """, ("Customer Satisfaction Survey", "Template for measuring customer satisfaction with your product or service", 1, "dark"))
         
-        # Create questions table
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS questions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            survey_id INTEGER NOT NULL,
-            question_text TEXT NOT NULL,
-            question_type TEXT DEFAULT 'multiple-choice',
-            position INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            image_path TEXT,
-            required INTEGER DEFAULT 0,
-            FOREIGN KEY (survey_id) REFERENCES surveys (id) ON DELETE CASCADE
-        )
-        """)
+        template_id = cursor.lastrowid
         
-        # Create options table
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS options (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            question_id INTEGER NOT NULL,
-            option_text TEXT NOT NULL,
-            position INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            image_path TEXT,
-            FOREIGN KEY (question_id) REFERENCES questions (id) ON DELETE CASCADE
-        )
-        """)
+        # Add template questions
+        questions = [
+            ("How would you rate our product?", "rating", 1, None),
+            ("What features do you like the most?", "multiple-choice", 2, None),
+            ("How likely are you to recommend our product?", "slider", 3, None)
+        ]
         
-        # Create responses table
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS responses (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            survey_id INTEGER NOT NULL,
-            respondent_ip TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (survey_id) REFERENCES surveys (id) ON DELETE CASCADE
-        )
-        """)
+        for q_text, q_type, pos, img in questions:
+            cursor.execute("""
+            INSERT INTO questions (survey_id, question_text, question_type, position, image_path)
+            VALUES (?, ?, ?, ?, ?)
+            """, (template_id, q_text, q_type, pos, img))
+            
+            q_id = cursor.lastrowid
+            
+            # Add options for multiple choice
+            if q_type == "multiple-choice":
+                options = ["User Interface", "Performance", "Features", "Price", "Customer Support"]
+                for i, opt in enumerate(options):
+                    cursor.execute("""
+                    INSERT INTO options (question_id, option_text, position)
+                    VALUES (?, ?, ?)
+                    """, (q_id, opt, i+1))
         
-        # Create answers table
+        # Add template for event feedback
         cursor.execute("""
-        CREATE TABLE IF NOT EXISTS answers (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            response_id INTEGER NOT NULL,
-            question_id INTEGER NOT NULL,
-            option_id INTEGER,
-            text_answer TEXT,
-            number_answer REAL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (response_id) REFERENCES responses (id) ON DELETE CASCADE,
-            FOREIGN KEY (question_id) REFERENCES questions (id) ON DELETE CASCADE,
-            FOREIGN KEY (option_id) REFERENCES options (id) ON DELETE CASCADE
-        )
-        """)
+        INSERT INTO surveys (title, description, is_template, theme)
+        VALUES (?, ?, ?, ?)
+        """, ("Event Feedback Survey", "Collect feedback from attendees after your event", 1, "blue"))
         
-        # Create users table for future authentication
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            email TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            name TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            last_login TIMESTAMP,
-            is_admin INTEGER DEFAULT 0
-        )
-        """)
+        template_id = cursor.lastrowid
         
-        # Add default templates only if they don't exist
-        cursor.execute("SELECT COUNT(*) as count FROM surveys WHERE is_template = 1")
-        template_count = cursor.fetchone()['count']
+        # Add template questions
+        questions = [
+            ("How would you rate the overall event?", "rating", 1, None),
+            ("What did you enjoy most about the event?", "text", 2, None),
+            ("How was the venue?", "rating", 3, None),
+            ("Would you attend a similar event in the future?", "multiple-choice", 4, None)
+        ]
         
-        if template_count == 0:
-            # Add template for customer satisfaction
-            cursor.execute("""
-            INSERT INTO surveys (title, description, is_template, theme)
-            VALUES (?, ?, ?, ?)
-            """, ("Customer Satisfaction Survey", "Template for measuring customer satisfaction with your product or service", 1, "dark"))
-            
-            template_id = cursor.lastrowid
-            
-            # Add template questions
-            questions = [
-                ("How would you rate our product?", "rating", 1, None),
-                ("What features do you like the most?", "multiple-choice", 2, None),
-                ("How likely are you to recommend our product?", "slider", 3, None)
-            ]
-            
-            for q_text, q_type, pos, img in questions:
-                cursor.execute("""
-                INSERT INTO questions (survey_id, question_text, question_type, position, image_path)
-                VALUES (?, ?, ?, ?, ?)
-                """, (template_id, q_text, q_type, pos, img))
-                
-                q_id = cursor.lastrowid
-                
-                # Add options for multiple choice
-                if q_type == "multiple-choice":
-                    options = ["User Interface", "Performance", "Features", "Price", "Customer Support"]
-                    for i, opt in enumerate(options):
-                        cursor.execute("""
-                        INSERT INTO options (question_id, option_text, position)
-                        VALUES (?, ?, ?)
-                        """, (q_id, opt, i+1))
-            
-            # Add template for event feedback
+        for q_text, q_type, pos, img in questions:
             cursor.execute("""
-            INSERT INTO surveys (title, description, is_template, theme)
-            VALUES (?, ?, ?, ?)
-            """, ("Event Feedback Survey", "Collect feedback from attendees after your event", 1, "blue"))
-            
-            template_id = cursor.lastrowid
+            INSERT INTO questions (survey_id, question_text, question_type, position, image_path)
+            VALUES (?, ?, ?, ?, ?)
+            """, (template_id, q_text, q_type, pos, img))
             
-            # Add template questions
-            questions = [
-                ("How would you rate the overall event?", "rating", 1, None),
-                ("What did you enjoy most about the event?", "text", 2, None),
-                ("How was the venue?", "rating", 3, None),
-                ("Would you attend a similar event in the future?", "multiple-choice", 4, None)
-            ]
+            q_id = cursor.lastrowid
             
-            for q_text, q_type, pos, img in questions:
-                cursor.execute("""
-                INSERT INTO questions (survey_id, question_text, question_type, position, image_path)
-                VALUES (?, ?, ?, ?, ?)
-                """, (template_id, q_text, q_type, pos, img))
-                
-                q_id = cursor.lastrowid
-                
-                # Add options for multiple choice
-                if q_type == "multiple-choice":
-                    options = ["Definitely", "Probably", "Not sure", "Probably not", "Definitely not"]
-                    for i, opt in enumerate(options):
-                        cursor.execute("""
-                        INSERT INTO options (question_id, option_text, position)
-                        VALUES (?, ?, ?)
-                        """, (q_id, opt, i+1))
-
-# Initialize database
-if not os.path.exists(app.config['DATABASE']):
-    app.logger.info(f"Creating new database at {app.config['DATABASE']}")
-    init_db()
-else:
-    app.logger.info(f"Database exists at {app.config['DATABASE']}, checking tables")
-    # Check if tables exist without recreating default templates
-    with DatabaseConnection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='surveys'")
-        if not cursor.fetchone():
-            app.logger.info("Tables don't exist, initializing database")
-            init_db()
+            # Add options for multiple choice
+            if q_type == "multiple-choice":
+                options = ["Definitely", "Probably", "Not sure", "Probably not", "Definitely not"]
+                for i, opt in enumerate(options):
+                    cursor.execute("""
+                    INSERT INTO options (question_id, option_text, position)
+                    VALUES (?, ?, ?)
+                    """, (q_id, opt, i+1))
+
+def _migration_hot_path_indexes(cursor):
+    """Secondary indexes for the per-survey, per-question and per-response lookups"""
+    indexes = [
+        ('idx_answers_response_question', 'answers (response_id, question_id)'),
+        ('idx_answers_question_option', 'answers (question_id, option_id)'),
+        ('idx_responses_survey_created', 'responses (survey_id, created_at)'),
+        ('idx_questions_survey_position', 'questions (survey_id, position)'),
+        ('idx_options_question_position', 'options (question_id, position)'),
+        ('idx_surveys_creator', 'surveys (creator_ip, is_template, archived, created_at)')
+    ]
+    for name, definition in indexes:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {definition}")
+    cursor.execute("ANALYZE")
+
+def _migration_survey_versions(cursor):
+    """Per-survey version number, bumped by triggers whenever its definition changes"""
+    cursor.execute("ALTER TABLE surveys ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+    
+    # Every column except version itself, so the trigger doesn't fire on its own update
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_surveys_version_update
+    AFTER UPDATE OF title, description, creator_ip, creator_email, theme, header_image,
+                    logo_image, is_template, published, archived, expiry_date ON surveys
+    BEGIN
+        UPDATE surveys SET version = version + 1 WHERE id = NEW.id;
+    END
+    """)
+    
+    for event, row in [('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')]:
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_questions_version_{event.lower()}
+        AFTER {event} ON questions
+        BEGIN
+            UPDATE surveys SET version = version + 1 WHERE id = {row}.survey_id;
+        END
+        """)
+        cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_options_version_{event.lower()}
+        AFTER {event} ON options
+        BEGIN
+            UPDATE surveys SET version = version + 1
+            WHERE id = (SELECT survey_id FROM questions WHERE id = {row}.question_id);
+        END
+        """)
+    
+    # A question moved to another survey changes both surveys
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_questions_version_move
+    AFTER UPDATE OF survey_id ON questions
+    WHEN OLD.survey_id != NEW.survey_id
+    BEGIN
+        UPDATE surveys SET version = version + 1 WHERE id = OLD.survey_id;
+    END
+    """)
+
+def _migration_answer_aggregates(cursor):
+    """Per-question answer statistics maintained on submit (see record_answer_aggregates)"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS question_stats (
+        question_id INTEGER PRIMARY KEY,
+        survey_id INTEGER NOT NULL,
+        answer_count INTEGER NOT NULL DEFAULT 0,
+        number_count INTEGER NOT NULL DEFAULT 0,
+        number_sum REAL NOT NULL DEFAULT 0,
+        number_sum_squares REAL NOT NULL DEFAULT 0,
+        number_min REAL,
+        number_max REAL,
+        FOREIGN KEY (question_id) REFERENCES questions (id) ON DELETE CASCADE
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS option_stats (
+        question_id INTEGER NOT NULL,
+        option_id INTEGER NOT NULL,
+        answer_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (question_id, option_id)
+    ) WITHOUT ROWID
+    """)
+    # Numeric answers counted per unit-wide bucket (floor of the value)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS number_buckets (
+        question_id INTEGER NOT NULL,
+        bucket INTEGER NOT NULL,
+        answer_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (question_id, bucket)
+    ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_question_stats_survey ON question_stats (survey_id)")
+    _rebuild_answer_aggregates(cursor)
+
+def _migration_chart_cache(cursor):
+    """Rendered chart images, one row per question (see get_cached_chart)"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS chart_cache (
+        question_id INTEGER PRIMARY KEY,
+        stamp TEXT NOT NULL,
+        data BLOB NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (question_id) REFERENCES questions (id) ON DELETE CASCADE
+    )
+    """)
+
+def _migration_chart_mimetype(cursor):
+    """Charts can be SVG or JSON specs as well as PNG"""
+    cursor.execute("ALTER TABLE chart_cache ADD COLUMN mimetype TEXT NOT NULL DEFAULT 'image/png'")
+
+def _migration_export_jobs(cursor):
+    """Background export jobs and their finished files (see ExportJobs)"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS export_jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        survey_id INTEGER NOT NULL,
+        format TEXT NOT NULL,
+        stamp TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',
+        progress INTEGER NOT NULL DEFAULT 0,
+        total INTEGER NOT NULL DEFAULT 0,
+        error TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (survey_id) REFERENCES surveys (id) ON DELETE CASCADE
+    )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_export_jobs_survey ON export_jobs (survey_id, format, stamp)")
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS export_artifacts (
+        survey_id INTEGER NOT NULL,
+        format TEXT NOT NULL,
+        stamp TEXT NOT NULL,
+        data BLOB NOT NULL,
+        mimetype TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (survey_id, format),
+        FOREIGN KEY (survey_id) REFERENCES surveys (id) ON DELETE CASCADE
+    )
+    """)
+    # Latest response per survey, for export stamps
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_responses_survey_id ON responses (survey_id, id)")
+
+def _migration_response_counts(cursor):
+    """Per-survey response counts maintained on submit (see record_answer_aggregates)"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS survey_stats (
+        survey_id INTEGER PRIMARY KEY,
+        response_count INTEGER NOT NULL DEFAULT 0,
+        FOREIGN KEY (survey_id) REFERENCES surveys (id) ON DELETE CASCADE
+    )
+    """)
+    _rebuild_response_counts(cursor)
+
+def _migration_filter_indexes(cursor):
+    """Covering indexes for the responses filters (see parse_response_filters)"""
+    # Supersedes idx_answers_question_option, which is its prefix
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_answers_question_option_response ON answers (question_id, option_id, response_id)")
+    cursor.execute("DROP INDEX IF EXISTS idx_answers_question_option")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_answers_question_number ON answers (question_id, number_answer, response_id)")
+    cursor.execute("ANALYZE")
+
+def _migration_search_index(cursor):
+    """Full-text index over text answers (see search_answers)"""
+    try:
+        _create_search_index(cursor)
+    except sqlite3.OperationalError as e:
+        # SQLite built without FTS5; `flask rebuild-search-index` creates it later
+        app.logger.warning(f"Full-text search unavailable: {e}")
+        return
+    _rebuild_search_index(cursor)
+
+def _migration_text_terms(cursor):
+    """Per-question term and bigram counts for text answers (see record_answer_aggregates)"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS text_terms (
+        question_id INTEGER NOT NULL,
+        ngram INTEGER NOT NULL,
+        term TEXT NOT NULL,
+        answer_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (question_id, ngram, term)
+    ) WITHOUT ROWID
+    """)
+    # Top terms are the first rows of this index, however many terms a question has
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_text_terms_top ON text_terms (question_id, ngram, answer_count DESC)")
+    _rebuild_text_terms(cursor)
+
+def _migration_submission_keys(cursor):
+    """Client-supplied idempotency keys, so a retried submission isn't stored twice (see find_submission)"""
+    cursor.execute("ALTER TABLE responses ADD COLUMN submission_key TEXT")
+    cursor.execute("""
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_responses_submission_key
+    ON responses (survey_id, submission_key) WHERE submission_key IS NOT NULL
+    """)
+
+def _migration_rate_limits(cursor):
+    """Token buckets shared by all worker processes (see RateLimiter)"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS rate_limits (
+        key TEXT PRIMARY KEY,
+        tokens REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        full_at REAL NOT NULL
+    ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_rate_limits_full_at ON rate_limits (full_at)")
+
+MIGRATIONS = [
+    (1, 'initial schema', _migration_initial_schema),
+    (2, 'hot-path indexes', _migration_hot_path_indexes),
+    (3, 'survey versions', _migration_survey_versions),
+    (4, 'answer aggregates', _migration_answer_aggregates),
+    (5, 'chart cache', _migration_chart_cache),
+    (6, 'chart mimetype', _migration_chart_mimetype),
+    (7, 'export jobs', _migration_export_jobs),
+    (8, 'response counts', _migration_response_counts),
+    (9, 'filter indexes', _migration_filter_indexes),
+    (10, 'search index', _migration_search_index),
+    (11, 'text terms', _migration_text_terms),
+    (12, 'submission keys', _migration_submission_keys),
+    (13, 'rate limits', _migration_rate_limits)
+]
+
+def get_schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def migrate_db(db_path=None):
+    """Apply pending migrations and return the resulting schema version"""
+    for version, description, migration in MIGRATIONS:
+        with DatabaseConnection(db_path, write=True) as conn:
+            # Re-checked under the write lock so concurrent workers apply each migration once
+            if get_schema_version(conn) >= version:
+                continue
+            app.logger.info(f"Applying database migration {version}: {description}")
+            migration(conn.cursor())
+            conn.execute(f"PRAGMA user_version = {version}")
+    
+    with DatabaseConnection(db_path) as conn:
+        return get_schema_version(conn)
+
+def init_db():
+    """Initialize the database schema and add default data; returns the schema version"""
+    apply_storage_profile()
+    version = migrate_db()
+    app.logger.info(f"Database {app.config['DATABASE']} is at schema version {version}")
+    return version
+
+# Queries on hot paths and the index each must use; checked by `flask check-query-plans`
+QUERY_PLAN_EXPECTATIONS = [
+    ("SELECT * FROM answers WHERE response_id = ? AND question_id = ?", (1, 1), 'idx_answers_response_question'),
+    ("SELECT COUNT(*) FROM answers WHERE question_id = ? AND option_id = ?", (1, 1), 'idx_answers_question_option_response'),
+    ("SELECT response_id FROM answers WHERE question_id = ? AND number_answer >= ? AND number_answer <= ?", (1, 1, 5),
+     'idx_answers_question_number'),
+    ("SELECT term, answer_count FROM text_terms WHERE question_id = ? AND ngram = ? ORDER BY answer_count DESC, term LIMIT 20",
+     (1, 1), 'idx_text_terms_top'),
+    ("SELECT * FROM responses WHERE survey_id = ? ORDER BY created_at", (1,), 'idx_responses_survey_created'),
+    ("SELECT MAX(id) FROM responses WHERE survey_id = ?", (1,), 'idx_responses_survey_id'),
+    ("SELECT id FROM responses WHERE survey_id = ? AND submission_key = ?", (1, 'key'), 'idx_responses_submission_key'),
+    ("SELECT id FROM responses WHERE survey_id = ? AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT 50",
+     (1, '2024-01-01 00:00:00', 1), 'idx_responses_survey_created'),
+    ("SELECT * FROM responses r WHERE r.survey_id = ? AND r.id > ? AND r.id <= ? ORDER BY r.id", (1, 0, 10),
+     'idx_responses_survey_id'),
+    ("SELECT * FROM questions WHERE survey_id = ? ORDER BY position", (1,), 'idx_questions_survey_position'),
+    ("DELETE FROM rate_limits WHERE full_at <= ?", (0,), 'idx_rate_limits_full_at'),
+    ("SELECT * FROM options WHERE question_id = ? ORDER BY position", (1,), 'idx_options_question_position'),
+    ("SELECT * FROM surveys WHERE creator_ip = ? AND is_template = 0 AND archived = 1 ORDER BY created_at DESC",
+     ('127.0.0.1',), 'idx_surveys_creator')
+]
+
+def check_query_plans(db_path=None):
+    """Return (query, plan) pairs for hot-path queries that don't use their index"""
+    failures = []
+    with DatabaseConnection(db_path) as conn:
+        for query, params, index_name in QUERY_PLAN_EXPECTATIONS:
+            plan = ' | '.join(row['detail'] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", params))
+            if index_name not in plan or 'USE TEMP B-TREE' in plan:
+                failures.append((query, plan))
+    return failures
+
+@app.cli.command('migrate-db')
+def migrate_db_command():
+    """Apply pending schema migrations."""
+    print(f"Schema version: {init_db()}")
+
+@app.cli.command('check-query-plans')
+def check_query_plans_command():
+    """Fail if a hot-path query stops using its index."""
+    failures = check_query_plans()
+    for query, plan in failures:
+        print(f"NOT INDEXED: {query}\n    {plan}")
+    if failures:
+        raise SystemExit(1)
+    print(f"All {len(QUERY_PLAN_EXPECTATIONS)} hot-path queries use their indexes")
 
 # Validation functions
 def validate_survey_data(title, description=None):
@@ -386,138 +1026,1920 @@ def save_uploaded_file(file):
             return None
     return None
 
+# Answer aggregates. question_stats, option_stats and number_buckets hold running
+# totals per question so analytics reads cost O(options) instead of O(answers).
+# They are updated in the same transaction that inserts the answers.
+def record_answer_aggregates(conn, survey_id, answers, responses=1):
+    """Fold newly inserted responses and their answers into the aggregates.
+
+    answers is a list of (question_id, option_id, text_answer, number_answer)
+    tuples from the given number of responses; the batch is summed in Python
+    and written with one upsert per survey, question, option, bucket and text
+    term touched. Each text answer counts once towards each of its terms.
+    """
+    if responses:
+        conn.execute("""
+            INSERT INTO survey_stats (survey_id, response_count) VALUES (?, ?)
+            ON CONFLICT (survey_id) DO UPDATE SET response_count = response_count + excluded.response_count
+        """, (survey_id, responses))
+    
+    questions = {}
+    option_counts = {}
+    bucket_counts = {}
+    term_counts = {}
+    for question_id, option_id, text_answer, number_answer in answers:
+        stats = questions.setdefault(question_id, [0, 0, 0.0, 0.0, None, None])
+        stats[0] += 1
+        if text_answer:
+            count_text_terms(term_counts, question_id, text_answer)
+        if option_id is not None:
+            option_counts[(question_id, option_id)] = option_counts.get((question_id, option_id), 0) + 1
+        if number_answer is not None:
+            stats[1] += 1
+            stats[2] += number_answer
+            stats[3] += number_answer * number_answer
+            stats[4] = number_answer if stats[4] is None else min(stats[4], number_answer)
+            stats[5] = number_answer if stats[5] is None else max(stats[5], number_answer)
+            bucket = (question_id, math.floor(number_answer))
+            bucket_counts[bucket] = bucket_counts.get(bucket, 0) + 1
+    
+    if not questions:
+        return
+    
+    conn.executemany("""
+        INSERT INTO question_stats (question_id, survey_id, answer_count, number_count,
+                                    number_sum, number_sum_squares, number_min, number_max)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (question_id) DO UPDATE SET
+            answer_count = answer_count + excluded.answer_count,
+            number_count = number_count + excluded.number_count,
+            number_sum = number_sum + excluded.number_sum,
+            number_sum_squares = number_sum_squares + excluded.number_sum_squares,
+            number_min = CASE WHEN number_min IS NULL OR excluded.number_min < number_min
+                              THEN excluded.number_min ELSE number_min END,
+            number_max = CASE WHEN number_max IS NULL OR excluded.number_max > number_max
+                              THEN excluded.number_max ELSE number_max END
+    """, [(question_id, survey_id, *stats) for question_id, stats in questions.items()])
+    
+    if option_counts:
+        conn.executemany("""
+            INSERT INTO option_stats (question_id, option_id, answer_count) VALUES (?, ?, ?)
+            ON CONFLICT (question_id, option_id) DO UPDATE SET answer_count = answer_count + excluded.answer_count
+        """, [(question_id, option_id, count) for (question_id, option_id), count in option_counts.items()])
+    
+    if bucket_counts:
+        conn.executemany("""
+            INSERT INTO number_buckets (question_id, bucket, answer_count) VALUES (?, ?, ?)
+            ON CONFLICT (question_id, bucket) DO UPDATE SET answer_count = answer_count + excluded.answer_count
+        """, [(question_id, bucket, count) for (question_id, bucket), count in bucket_counts.items()])
+    
+    if term_counts:
+        conn.executemany("""
+            INSERT INTO text_terms (question_id, ngram, term, answer_count) VALUES (?, ?, ?, ?)
+            ON CONFLICT (question_id, ngram, term) DO UPDATE SET answer_count = answer_count + excluded.answer_count
+        """, [(*key, count) for key, count in term_counts.items()])
+
+def count_text_terms(term_counts, question_id, text_answer):
+    """Add a text answer's terms and bigrams to a (question_id, ngram, term) -> count dict"""
+    terms, bigrams = text_terms.extract_terms(text_answer)
+    for ngram, found in ((1, terms), (2, bigrams)):
+        for term in found:
+            key = (question_id, ngram, term)
+            term_counts[key] = term_counts.get(key, 0) + 1
+
+def _rebuild_answer_aggregates(cursor, survey_id=None):
+    """Recompute the aggregates from the answers table (all surveys, or one)"""
+    survey_filter = ''
+    params = ()
+    if survey_id is not None:
+        survey_filter = 'WHERE q.survey_id = ?'
+        params = (survey_id,)
+        cursor.execute("DELETE FROM question_stats WHERE survey_id = ?", params)
+        cursor.execute("DELETE FROM option_stats WHERE question_id IN (SELECT id FROM questions WHERE survey_id = ?)", params)
+        cursor.execute("DELETE FROM number_buckets WHERE question_id IN (SELECT id FROM questions WHERE survey_id = ?)", params)
+    else:
+        cursor.execute("DELETE FROM question_stats")
+        cursor.execute("DELETE FROM option_stats")
+        cursor.execute("DELETE FROM number_buckets")
+    
+    # Only answers whose response still belongs to the question's survey count,
+    # matching what the charts used to compute from the raw tables
+    answers = f"""
+        FROM answers a
+        JOIN questions q ON a.question_id = q.id
+        JOIN responses r ON a.response_id = r.id AND r.survey_id = q.survey_id
+        {survey_filter}
+    """
+    cursor.execute(f"""
+        INSERT INTO question_stats (question_id, survey_id, answer_count, number_count,
+                                    number_sum, number_sum_squares, number_min, number_max)
+        SELECT a.question_id, q.survey_id, COUNT(*), COUNT(a.number_answer),
+               COALESCE(SUM(a.number_answer), 0), COALESCE(SUM(a.number_answer * a.number_answer), 0),
+               MIN(a.number_answer), MAX(a.number_answer)
+        {answers}
+        GROUP BY a.question_id
+    """, params)
+    cursor.execute(f"""
+        INSERT INTO option_stats (question_id, option_id, answer_count)
+        SELECT a.question_id, a.option_id, COUNT(*)
+        {answers} {'AND' if survey_filter else 'WHERE'} a.option_id IS NOT NULL
+        GROUP BY a.question_id, a.option_id
+    """, params)
+    cursor.execute(f"""
+        INSERT INTO number_buckets (question_id, bucket, answer_count)
+        SELECT a.question_id, CAST(a.number_answer AS INTEGER) - (a.number_answer < CAST(a.number_answer AS INTEGER)) AS bucket, COUNT(*)
+        {answers} {'AND' if survey_filter else 'WHERE'} a.number_answer IS NOT NULL
+        GROUP BY a.question_id, bucket
+    """, params)
+
+def _rebuild_response_counts(cursor, survey_id=None):
+    """Recompute survey_stats from the responses table (all surveys, or one)"""
+    if survey_id is not None:
+        cursor.execute("DELETE FROM survey_stats WHERE survey_id = ?", (survey_id,))
+        cursor.execute("""
+            INSERT INTO survey_stats (survey_id, response_count)
+            SELECT survey_id, COUNT(*) FROM responses WHERE survey_id = ? GROUP BY survey_id
+        """, (survey_id,))
+    else:
+        cursor.execute("DELETE FROM survey_stats")
+        cursor.execute("""
+            INSERT INTO survey_stats (survey_id, response_count)
+            SELECT survey_id, COUNT(*) FROM responses GROUP BY survey_id
+        """)
+
+def _rebuild_text_terms(cursor, survey_id=None):
+    """Recompute text_terms from the answers table (all surveys, or one).
+
+    Tokenizing happens in Python, so this streams the text answers through
+    count_text_terms rather than aggregating in SQL.
+    """
+    survey_filter = ''
+    params = ()
+    if survey_id is not None:
+        survey_filter = 'AND q.survey_id = ?'
+        params = (survey_id,)
+        cursor.execute("DELETE FROM text_terms WHERE question_id IN (SELECT id FROM questions WHERE survey_id = ?)", params)
+    else:
+        cursor.execute("DELETE FROM text_terms")
+    
+    term_counts = {}
+    rows = cursor.connection.execute(f"""
+        SELECT a.question_id, a.text_answer
+        FROM answers a
+        JOIN questions q ON a.question_id = q.id
+        JOIN responses r ON a.response_id = r.id AND r.survey_id = q.survey_id
+        WHERE a.text_answer IS NOT NULL AND a.text_answer != '' {survey_filter}
+    """, params)
+    for question_id, text_answer in rows:
+        count_text_terms(term_counts, question_id, text_answer)
+    cursor.executemany(
+        "INSERT INTO text_terms (question_id, ngram, term, answer_count) VALUES (?, ?, ?, ?)",
+        [(*key, count) for key, count in term_counts.items()]
+    )
+
+def rebuild_answer_aggregates(survey_id=None):
+    with DatabaseConnection(write=True) as conn:
+        _rebuild_answer_aggregates(conn.cursor(), survey_id)
+        _rebuild_response_counts(conn.cursor(), survey_id)
+        _rebuild_text_terms(conn.cursor(), survey_id)
+
+def get_response_count(conn, survey_id):
+    row = conn.execute('SELECT response_count FROM survey_stats WHERE survey_id = ?', (survey_id,)).fetchone()
+    return row['response_count'] if row else 0
+
+@app.cli.command('rebuild-aggregates')
+@click.option('--survey-id', type=int, default=None, help='Only rebuild this survey')
+def rebuild_aggregates_command(survey_id):
+    """Recompute answer aggregates from the answers table."""
+    rebuild_answer_aggregates(survey_id)
+    print(f"Rebuilt answer aggregates for {'survey ' + str(survey_id) if survey_id else 'all surveys'}")
+
+def get_top_terms(conn, question_id, ngram=1, limit=20):
+    """The question's most mentioned terms (ngram=1) or bigrams (ngram=2) as (term, answer_count) rows"""
+    return conn.execute('''
+        SELECT term, answer_count FROM text_terms
+        WHERE question_id = ? AND ngram = ?
+        ORDER BY answer_count DESC, term
+        LIMIT ?
+    ''', (question_id, ngram, limit)).fetchall()
+
+def get_question_stats(conn, question_id):
+    """Count, mean, standard deviation, min and max of a question's numeric answers"""
+    row = conn.execute('SELECT * FROM question_stats WHERE question_id = ?', (question_id,)).fetchone()
+    if not row or not row['number_count']:
+        return None
+    count = row['number_count']
+    mean = row['number_sum'] / count
+    variance = max(row['number_sum_squares'] / count - mean * mean, 0.0)
+    return {
+        'count': count,
+        'mean': mean,
+        'stddev': math.sqrt(variance),
+        'min': row['number_min'],
+        'max': row['number_max']
+    }
+
 # Chart generation function
+TEXT_CHART_TERMS = 15
+
+def get_chart_spec(conn, question_id):
+    """Build the chart spec (see chart_render) for a question, or None if there's nothing to plot"""
+    question = conn.execute('SELECT * FROM questions WHERE id = ?', (question_id,)).fetchone()
+    
+    if not question:
+        app.logger.warning(f"Attempt to generate chart for non-existent question ID {question_id}")
+        return None
+    
+    question_type = question['question_type']
+    
+    # Different charts based on question type
+    if question_type == 'multiple-choice':
+        # Get options with their running answer counts
+        options = conn.execute('''
+            SELECT o.option_text, COALESCE(st.answer_count, 0) AS count
+            FROM options o
+            LEFT JOIN option_stats st ON st.question_id = o.question_id AND st.option_id = o.id
+            WHERE o.question_id = ?
+            ORDER BY o.position
+        ''', (question_id,)).fetchall()
+        
+        option_counts = [option['count'] for option in options]
+        
+        # Skip chart creation if no data
+        if sum(option_counts) == 0:
+            return None
+        
+        return {
+            'kind': 'bar',
+            'title': question['question_text'],
+            'labels': [option['option_text'] for option in options],
+            'counts': option_counts
+        }
+    
+    elif question_type in ['rating', 'slider']:
+        # Get the numeric answer distribution
+        buckets = conn.execute(
+            'SELECT bucket, answer_count FROM number_buckets WHERE question_id = ? ORDER BY bucket',
+            (question_id,)
+        ).fetchall()
+        
+        if not buckets:
+            return None
+        
+        return {
+            'kind': 'histogram',
+            'title': question['question_text'],
+            'values': [b['bucket'] for b in buckets],
+            'weights': [b['answer_count'] for b in buckets]
+        }
+    
+    elif question_type == 'text':
+        # Most mentioned terms, from the running term counts
+        terms = get_top_terms(conn, question_id, limit=TEXT_CHART_TERMS)
+        
+        if not terms:
+            return None
+        
+        return {
+            'kind': 'bar',
+            'title': question['question_text'],
+            'labels': [term['term'] for term in terms],
+            'counts': [term['answer_count'] for term in terms],
+            'x_label': 'Terms'
+        }
+    
+    return None
+
 def generate_chart(question_id, survey_id):
-    """Generate chart for question responses with error handling"""
+    """Render the chart for question responses in this process.
+
+    Returns (data, mimetype) in the configured CHART_BACKEND format, or None if
+    there's nothing to plot.
+    """
     try:
         with DatabaseConnection() as conn:
-            # Get question info
-            question = conn.execute('SELECT * FROM questions WHERE id = ?', (question_id,)).fetchone()
-            
-            if not question:
-                app.logger.warning(f"Attempt to generate chart for non-existent question ID {question_id}")
-                return None
-            
-            question_type = question['question_type']
-            
-            # Different charts based on question type
-            if question_type == 'multiple-choice':
-                # Get options
-                options = conn.execute(
-                    'SELECT * FROM options WHERE question_id = ? ORDER BY position', 
-                    (question_id,)
-                ).fetchall()
-                
-                # Get count of each option selected
-                option_counts = []
-                labels = []
-                
-                for option in options:
-                    count = conn.execute('''
-                        SELECT COUNT(*) as count FROM answers a
-                        JOIN responses r ON a.response_id = r.id
-                        WHERE a.question_id = ? AND a.option_id = ? AND r.survey_id = ?
-                    ''', (question_id, option['id'], survey_id)).fetchone()['count']
-                    
-                    option_counts.append(count)
-                    labels.append(option['option_text'])
-                
-                # Skip chart creation if no data
-                if sum(option_counts) == 0:
-                    return None
-                
-                # Create bar chart with improved styling
-                plt.figure(figsize=(10, 6))
-                bars = plt.bar(labels, option_counts, color='#1DB954')
-                
-                # Add value labels on top of bars
-                for bar in bars:
-                    height = bar.get_height()
-                    plt.text(bar.get_x() + bar.get_width()/2., height + 0.1,
-                            str(int(height)), ha='center', va='bottom')
-                
-                plt.xlabel('Options')
-                plt.ylabel('Response Count')
-                plt.title(question['question_text'])
-                plt.xticks(rotation=45, ha='right')
-                plt.tight_layout()
-                
-                # Save to buffer
-                buf = io.BytesIO()
-                plt.savefig(buf, format='png', transparent=True)
-                buf.seek(0)
-                plt.close()
-                
-                # Encode as base64
-                data = base64.b64encode(buf.getvalue()).decode('utf-8')
-                return f"data:image/png;base64,{data}"
-            
-            elif question_type in ['rating', 'slider']:
-                # Get all numeric answers
-                answers = conn.execute('''
-                    SELECT a.number_answer FROM answers a
-                    JOIN responses r ON a.response_id = r.id
-                    WHERE a.question_id = ? AND r.survey_id = ? AND a.number_answer IS NOT NULL
-                ''', (question_id, survey_id)).fetchall()
-                
-                values = [a['number_answer'] for a in answers]
-                
-                if not values:
-                    return None
-                    
-                # Create histogram with improved styling
-                plt.figure(figsize=(10, 6))
-                plt.hist(values, bins=5, color='#1DB954', alpha=0.7, edgecolor='black')
-                plt.xlabel('Rating')
-                plt.ylabel('Response Count')
-                plt.title(question['question_text'])
-                
-                # Add grid for better readability
-                plt.grid(axis='y', alpha=0.3)
-                plt.tight_layout()
-                
-                # Save to buffer
-                buf = io.BytesIO()
-                plt.savefig(buf, format='png', transparent=True)
-                buf.seek(0)
-                plt.close()
-                
-                # Encode as base64
-                data = base64.b64encode(buf.getvalue()).decode('utf-8')
-                return f"data:image/png;base64,{data}"
-            
-            # Text responses word cloud (could be implemented here)
-            elif question_type == 'text':
-                # Return None for now - could add word cloud visualization in the future
-                return None
-        
+            spec = get_chart_spec(conn, question_id)
+        return chart_render.render_chart(spec, app.config['CHART_BACKEND']) if spec else None
+    except Exception as e:
+        app.logger.error(f"Error generating chart for question {question_id}: {e}")
         return None
+
+# Chart render cache. Rendered charts are stored in chart_cache under a stamp
+# made of the survey version (question/option text), the question's answer
+# count and the chart backend, so a chart is only re-rendered after its inputs
+# or output format change.
+CHART_QUESTION_TYPES = ('multiple-choice', 'rating', 'slider', 'text')
+
+def get_chart_stamps(conn, survey_id, question_id=None):
+    """Map question id -> chart stamp for the survey's questions that have a chart to show"""
+    query = '''
+        SELECT q.id, s.version, st.answer_count
+        FROM questions q
+        JOIN surveys s ON s.id = q.survey_id
+        JOIN question_stats st ON st.question_id = q.id
+        WHERE q.survey_id = ? AND st.answer_count > 0
+          AND q.question_type IN ({})
+    '''.format(', '.join('?' * len(CHART_QUESTION_TYPES)))
+    params = [survey_id, *CHART_QUESTION_TYPES]
+    if question_id is not None:
+        query += ' AND q.id = ?'
+        params.append(question_id)
+    backend = app.config['CHART_BACKEND']
+    return {
+        row['id']: f"{row['version']}-{row['answer_count']}-{backend}"
+        for row in conn.execute(query, params)
+    }
+
+def store_chart(question_id, stamp, data, mimetype):
+    with DatabaseConnection(write=True) as conn:
+        conn.execute("""
+            INSERT INTO chart_cache (question_id, stamp, data, mimetype) VALUES (?, ?, ?, ?)
+            ON CONFLICT (question_id) DO UPDATE SET
+                stamp = excluded.stamp, data = excluded.data, mimetype = excluded.mimetype,
+                created_at = CURRENT_TIMESTAMP
+        """, (question_id, stamp, data, mimetype))
+
+class ChartRenderer:
+    """Renders charts off the request thread in a bounded process pool.
+
+    Chart specs are read from the database in the calling thread; only the
+    matplotlib work runs in the pool. Its processes are spawned, and spawn
+    re-imports the main module in each one: under gunicorn that is gunicorn's
+    own, but with `python app.py` it is app.py itself, as __mp_main__, which
+    is why the module-level init_db() is skipped under that name. The SVG and JSON backends are cheap enough to render
+    inline. Jobs are deduplicated per (question, stamp) and finished charts
+    are written to chart_cache from the executor's callback thread. With
+    processes=0 charts are always rendered synchronously.
+    """
+
+    def __init__(self, processes=2):
+        self.processes = processes
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._jobs = {}  # question_id -> (stamp, Future)
+
+    def _get_executor(self):
+        if self._executor is None or self._pid != os.getpid():
+            # spawn, not fork: forking a multi-threaded gunicorn worker isn't safe
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            self._pid = os.getpid()
+            self._jobs = {}
+        return self._executor
+
+    def submit(self, question_id, survey_id, stamp):
+        """Future resolving to the chart's (data, mimetype) (or None if there's nothing to plot)"""
+        with self._lock:
+            job = self._jobs.get(question_id)
+            if job and job[0] == stamp and self._pid == os.getpid():
+                return job[1]
+        
+        with DatabaseConnection() as conn:
+            spec = get_chart_spec(conn, question_id)
+        
+        backend = app.config['CHART_BACKEND']
+        future = None
+        if spec is None or self.processes <= 0 or chart_render.resolve_backend(spec, backend) != 'matplotlib':
+            future = Future()
+            try:
+                future.set_result(chart_render.render_chart(spec, backend) if spec else None)
+            except Exception as e:
+                future.set_exception(e)
+        
+        with self._lock:
+            job = self._jobs.get(question_id)
+            if job and job[0] == stamp and self._pid == os.getpid():
+                return job[1]
+            if future is None:
+                try:
+                    future = self._get_executor().submit(chart_render.render_chart, spec, backend)
+                except BrokenProcessPool:
+                    app.logger.warning("Chart render pool broke, restarting it")
+                    self._executor = None
+                    future = self._get_executor().submit(chart_render.render_chart, spec, backend)
+            self._jobs[question_id] = (stamp, future)
+        
+        future.add_done_callback(lambda f: self._finished(question_id, stamp, f))
+        return future
+
+    def _finished(self, question_id, stamp, future):
+        try:
+            chart = future.result()
+        except Exception as e:
+            app.logger.error(f"Error generating chart for question {question_id}: {e}")
+            chart = None
+        
+        if chart:
+            try:
+                store_chart(question_id, stamp, *chart)
+            except sqlite3.Error as e:
+                app.logger.error(f"Error caching chart for question {question_id}: {e}")
+                return
+            # Stored charts are served from chart_cache; only remember empty or failed jobs
+            with self._lock:
+                if self._jobs.get(question_id, (None, None))[1] is future:
+                    del self._jobs[question_id]
+
+    def render_missing(self, survey_id, stamps):
+        """Queue every chart in stamps that isn't cached yet.
+
+        Returns (pending, unavailable): question ids still rendering, and ones
+        whose render produced no chart or failed.
+        """
+        if not stamps:
+            return set(), set()
+        
+        with DatabaseConnection() as conn:
+            cached = {
+                row['question_id'] for row in conn.execute(
+                    'SELECT question_id, stamp FROM chart_cache WHERE question_id IN ({})'.format(
+                        ', '.join('?' * len(stamps))),
+                    list(stamps)
+                ) if stamps[row['question_id']] == row['stamp']
+            }
+        
+        pending = set()
+        unavailable = set()
+        for question_id, stamp in stamps.items():
+            if question_id in cached:
+                continue
+            future = self.submit(question_id, survey_id, stamp)
+            if not future.done():
+                pending.add(question_id)
+            elif future.exception() is not None or not future.result():
+                unavailable.add(question_id)
+        return pending, unavailable
+
+    def stats(self):
+        with self._lock:
+            return {
+                'processes': self.processes,
+                'jobs': len(self._jobs),
+                'running': sum(1 for _, future in self._jobs.values() if not future.done())
+            }
+
+if app.config['CHART_BACKEND'] not in chart_render.BACKENDS:
+    raise ValueError(f"Unknown CHART_BACKEND '{app.config['CHART_BACKEND']}'. Must be one of: {', '.join(chart_render.BACKENDS)}")
+
+chart_renderer = ChartRenderer(processes=app.config['CHART_RENDER_PROCESSES'])
+
+def get_cached_chart(question_id, survey_id, stamp):
+    """(data, mimetype) of a question's chart at the given stamp, rendering it on a cache miss"""
+    with DatabaseConnection() as conn:
+        row = conn.execute(
+            'SELECT data, mimetype FROM chart_cache WHERE question_id = ? AND stamp = ?', (question_id, stamp)
+        ).fetchone()
+    if row:
+        return row['data'], row['mimetype']
+    
+    future = chart_renderer.submit(question_id, survey_id, stamp)
+    try:
+        return future.result(timeout=app.config['CHART_RENDER_TIMEOUT'])
     except Exception as e:
         app.logger.error(f"Error generating chart for question {question_id}: {e}")
         return None
 
-# Rate limiting helper
-def rate_limit(key_prefix, limit=10, period=60):
-    """Basic rate limiting to prevent abuse"""
-    key = f"{key_prefix}:{request.remote_addr}"
-    current = session.get(key, {})
+# Full-text search over text answers. answers_fts holds each non-empty text
+# answer under its answer id, with a scope column of "s<survey id> q<question
+# id>" tokens so a search is narrowed to one survey or question inside the FTS
+# index itself. Triggers keep it in step with the answers table.
+SEARCH_SCOPE_SQL = "'s' || q.survey_id || ' q' || q.id"
+
+def _create_search_index(cursor):
+    cursor.execute("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS answers_fts USING fts5(
+        text_answer, scope, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_answers_fts_insert
+    AFTER INSERT ON answers
+    WHEN NEW.text_answer IS NOT NULL AND NEW.text_answer != ''
+    BEGIN
+        INSERT INTO answers_fts (rowid, text_answer, scope)
+        SELECT NEW.id, NEW.text_answer, {SEARCH_SCOPE_SQL} FROM questions q WHERE q.id = NEW.question_id;
+    END
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_answers_fts_delete
+    AFTER DELETE ON answers
+    WHEN OLD.text_answer IS NOT NULL AND OLD.text_answer != ''
+    BEGIN
+        DELETE FROM answers_fts WHERE rowid = OLD.id;
+    END
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_answers_fts_update
+    AFTER UPDATE OF text_answer, question_id ON answers
+    BEGIN
+        DELETE FROM answers_fts WHERE rowid = OLD.id;
+        INSERT INTO answers_fts (rowid, text_answer, scope)
+        SELECT NEW.id, NEW.text_answer, {SEARCH_SCOPE_SQL} FROM questions q
+        WHERE q.id = NEW.question_id AND NEW.text_answer IS NOT NULL AND NEW.text_answer != '';
+    END
+    """)
+    # A question moved to another survey takes its answers' scope along
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_questions_fts_move
+    AFTER UPDATE OF survey_id ON questions
+    WHEN OLD.survey_id != NEW.survey_id
+    BEGIN
+        UPDATE answers_fts SET scope = (SELECT {SEARCH_SCOPE_SQL} FROM questions q WHERE q.id = NEW.id)
+        WHERE rowid IN (SELECT id FROM answers WHERE question_id = NEW.id);
+    END
+    """)
+
+def _rebuild_search_index(cursor, survey_id=None):
+    """Re-index text answers from the answers table (all surveys, or one)"""
+    survey_filter = ''
+    params = ()
+    if survey_id is not None:
+        survey_filter = 'AND q.survey_id = ?'
+        params = (survey_id,)
+        cursor.execute(
+            "DELETE FROM answers_fts WHERE rowid IN (SELECT a.id FROM answers a JOIN questions q ON a.question_id = q.id WHERE q.survey_id = ?)",
+            params
+        )
+    else:
+        cursor.execute("DELETE FROM answers_fts")
     
-    # Clean up old entries
-    now = time.time()
-    current = {ts: count for ts, count in current.items() if now - float(ts) < period}
+    cursor.execute(f"""
+        INSERT INTO answers_fts (rowid, text_answer, scope)
+        SELECT a.id, a.text_answer, {SEARCH_SCOPE_SQL}
+        FROM answers a
+        JOIN questions q ON a.question_id = q.id
+        WHERE a.text_answer IS NOT NULL AND a.text_answer != '' {survey_filter}
+    """, params)
+    cursor.execute("INSERT INTO answers_fts (answers_fts) VALUES ('optimize')")
+
+def search_index_available(conn):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'answers_fts'"
+    ).fetchone() is not None
+
+@app.cli.command('rebuild-search-index')
+@click.option('--survey-id', type=int, default=None, help='Only re-index this survey')
+def rebuild_search_index_command(survey_id):
+    """Create the text answer search index if needed and backfill it."""
+    with DatabaseConnection(write=True) as conn:
+        _create_search_index(conn.cursor())
+        _rebuild_search_index(conn.cursor(), survey_id)
+        indexed = conn.execute('SELECT COUNT(*) FROM answers_fts').fetchone()[0]
+    print(f"Indexed text answers for {'survey ' + str(survey_id) if survey_id else 'all surveys'} ({indexed} in the index)")
+
+def build_search_query(text, survey_id, question_id=None):
+    """An FTS5 query matching every word of text (a trailing * keeps prefix matching) within the scope"""
+    terms = []
+    for word in text.split():
+        prefix = word.endswith('*')
+        word = word.rstrip('*').replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ('*' if prefix else ''))
+    if not terms:
+        return None
+    scope = f'"s{survey_id}"' + (f' "q{question_id}"' if question_id is not None else '')
+    return f"text_answer : ({' '.join(terms)}) AND scope : ({scope})"
+
+SNIPPET_START, SNIPPET_END = '\x02', '\x03'
+
+def search_answers(conn, survey_id, text, question_id=None, limit=20):
+    """Text answers in a survey (or one question) matching text, best first, with highlighted HTML snippets"""
+    query = build_search_query(text, survey_id, question_id)
+    if query is None:
+        return []
+    rows = conn.execute(f'''
+        SELECT a.id AS answer_id, a.response_id, a.question_id, r.created_at,
+               snippet(answers_fts, 0, '{SNIPPET_START}', '{SNIPPET_END}', '…', 16) AS snippet
+        FROM answers_fts
+        JOIN answers a ON a.id = answers_fts.rowid
+        JOIN responses r ON r.id = a.response_id
+        WHERE answers_fts MATCH ?
+        ORDER BY bm25(answers_fts, 1.0, 0.0)
+        LIMIT ?
+    ''', (query, limit)).fetchall()
+    
+    results = []
+    for row in rows:
+        result = dict(row)
+        # Escape the answer text, then turn the match markers into <mark> tags
+        result['snippet'] = str(escape(row['snippet'])).replace(SNIPPET_START, '<mark>').replace(SNIPPET_END, '</mark>')
+        results.append(result)
+    return results
+
+# Response filters, given as query parameters to the responses page and the
+# export route alike:
+#   from, to                           submission date range (YYYY-MM-DD, inclusive)
+#   option_<question id>               chose this option id
+#   min_<question id>, max_<question id>   numeric answer range (inclusive)
+#   contains_<question id>             text answer has words starting with each word of this,
+#                                      ignoring case and accents (matched in answers_fts)
+RESPONSE_FILTER_PARAM = re.compile(r'^(option|min|max|contains)_(\d+)$')
+
+def get_filter_args(args):
+    """The non-empty filter parameters in args, for carrying over into links"""
+    return {
+        name: value for name, value in args.items()
+        if value and (name in ('from', 'to') or RESPONSE_FILTER_PARAM.match(name))
+    }
+
+def parse_response_filters(args, questions):
+    """Compile filter parameters into (conditions, params) on responses aliased r.
+
+    Date bounds are ranges on idx_responses_survey_created; each answer
+    condition is an r.id IN (...) subquery over a per-question answers index,
+    or for text over answers_fts scoped to the question. Raises ValueError for
+    malformed values or questions not in the survey.
+    """
+    conditions = []
+    params = []
+    
+    filter_args = get_filter_args(args)
+    if 'from' in filter_args:
+        conditions.append('r.created_at >= ?')
+        params.append(datetime.date.fromisoformat(filter_args['from']).isoformat())
+    if 'to' in filter_args:
+        conditions.append('r.created_at < ?')
+        params.append((datetime.date.fromisoformat(filter_args['to']) + datetime.timedelta(days=1)).isoformat())
+    
+    questions_by_id = {question['id']: question for question in questions}
+    ranges = {}
+    for name, value in filter_args.items():
+        match = RESPONSE_FILTER_PARAM.match(name)
+        if not match:
+            continue
+        kind, question_id = match.group(1), int(match.group(2))
+        if question_id not in questions_by_id:
+            raise ValueError(f"Question {question_id} is not part of this survey")
+        
+        if kind == 'option':
+            conditions.append('r.id IN (SELECT response_id FROM answers WHERE question_id = ? AND option_id = ?)')
+            params.extend([question_id, int(value)])
+        elif kind == 'contains':
+            # Each word as a prefix, folded like search_answers by the index's tokenizer
+            words = ' '.join(word.rstrip('*') + '*' for word in value.split() if word.rstrip('*'))
+            query = build_search_query(words, questions_by_id[question_id]['survey_id'], question_id)
+            if query is None:
+                raise ValueError(f"Enter a word to look for in question {question_id}")
+            conditions.append('''r.id IN (
+                SELECT a.response_id FROM answers_fts JOIN answers a ON a.id = answers_fts.rowid
+                WHERE answers_fts MATCH ?
+            )''')
+            params.append(query)
+        else:
+            bound = float(value)
+            if not math.isfinite(bound):
+                raise ValueError(f"Invalid {kind} for question {question_id}: {value}")
+            ranges.setdefault(question_id, {})[kind] = bound
+    
+    for question_id, bounds in ranges.items():
+        conditions.append(
+            'r.id IN (SELECT response_id FROM answers WHERE question_id = ? AND number_answer >= ? AND number_answer <= ?)'
+        )
+        params.extend([question_id, bounds.get('min', -math.inf), bounds.get('max', math.inf)])
+    
+    return conditions, params
+
+# Responses page
+def load_response_page(conn, survey_id, per_page, before=None, after=None, filters=None):
+    """One page of a survey's responses, newest first, with their answers.
+
+    Keyset pagination on (created_at, id): before (after) is the id of the
+    response the page continues from towards older (newer) responses. Returns
+    (responses, older, newer), where older and newer are the before/after
+    cursors for the adjacent pages, or None at either end. Each response's
+    answers are a dict of question id -> its first answer to that question,
+    all loaded with one query for the page. filters are (conditions, params)
+    from parse_response_filters.
+    """
+    conditions, filter_params = filters or ([], [])
+    where = ' AND '.join(['r.survey_id = ?'] + conditions)
+    
+    anchor = None
+    cursor_id = before if before is not None else after
+    if cursor_id is not None:
+        anchor = conn.execute(
+            'SELECT created_at, id FROM responses WHERE id = ? AND survey_id = ?', (cursor_id, survey_id)
+        ).fetchone()
+    
+    if anchor is None:
+        rows = conn.execute(f'''
+            SELECT r.id, r.created_at, r.respondent_ip FROM responses r
+            WHERE {where}
+            ORDER BY r.created_at DESC, r.id DESC LIMIT ?
+        ''', (survey_id, *filter_params, per_page + 1)).fetchall()
+        has_older, has_newer = len(rows) > per_page, False
+    elif before is not None:
+        rows = conn.execute(f'''
+            SELECT r.id, r.created_at, r.respondent_ip FROM responses r
+            WHERE {where} AND (r.created_at, r.id) < (?, ?)
+            ORDER BY r.created_at DESC, r.id DESC LIMIT ?
+        ''', (survey_id, *filter_params, anchor['created_at'], anchor['id'], per_page + 1)).fetchall()
+        has_older, has_newer = len(rows) > per_page, True
+    else:
+        rows = conn.execute(f'''
+            SELECT r.id, r.created_at, r.respondent_ip FROM responses r
+            WHERE {where} AND (r.created_at, r.id) > (?, ?)
+            ORDER BY r.created_at, r.id LIMIT ?
+        ''', (survey_id, *filter_params, anchor['created_at'], anchor['id'], per_page + 1)).fetchall()
+        has_older, has_newer = True, len(rows) > per_page
+        rows = rows[:per_page][::-1]
+    rows = rows[:per_page]
+    
+    responses = [
+        {'id': row['id'], 'created_at': row['created_at'], 'ip': row['respondent_ip'], 'answers': {}}
+        for row in rows
+    ]
+    by_id = {response['id']: response for response in responses}
+    if by_id:
+        answers = conn.execute('''
+            SELECT a.response_id, a.question_id, a.text_answer, a.number_answer, o.option_text
+            FROM answers a
+            LEFT JOIN options o ON a.option_id = o.id
+            WHERE a.response_id IN ({})
+            ORDER BY a.id
+        '''.format(', '.join('?' * len(by_id))), list(by_id)).fetchall()
+        for answer in answers:
+            by_id[answer['response_id']]['answers'].setdefault(answer['question_id'], answer)
+    
+    older = responses[-1]['id'] if responses and has_older else None
+    newer = responses[0]['id'] if responses and has_newer else None
+    return responses, older, newer
+
+# Export helpers
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+def export_response_filter(survey_id, id_range=None, filters=None):
+    """(WHERE, ORDER BY, params) selecting the responses an export covers.
+
+    A full export is ordered by submission time. An incremental one covers
+    responses with since < id <= until, where id_range is (since, until), in
+    id order so it can be resumed from its last id. filters are (conditions,
+    params) from parse_response_filters.
+    """
+    conditions, params = ['r.survey_id = ?'], [survey_id]
+    order = 'r.created_at, r.id'
+    if id_range is not None:
+        conditions.append('r.id > ? AND r.id <= ?')
+        params.extend(id_range)
+        order = 'r.id'
+    if filters:
+        conditions.extend(filters[0])
+        params.extend(filters[1])
+    return ' AND '.join(conditions), order, params
+
+def iter_response_rows(survey_id, questions, **selection):
+    """Yield (response_id, created_at, respondent_ip, submission_key, answers) for every response, oldest first.
+
+    One ordered join over responses/answers/options feeds the whole export; it
+    is consumed row by row, so memory stays constant however many responses
+    there are. answers maps question id -> (option_text, text_answer,
+    number_answer) of the response's first answer to that question. selection
+    (id_range, filters) narrows the responses, see export_response_filter.
+    """
+    where, order, params = export_response_filter(survey_id, **selection)
+    question_ids = {question['id'] for question in questions}
+    with DatabaseConnection() as conn:
+        # Plain tuples: building a sqlite3.Row per joined row dominates the export otherwise
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(f'''
+            SELECT r.id, r.created_at, r.respondent_ip, r.submission_key,
+                   a.id, a.question_id, o.option_text, a.text_answer, a.number_answer
+            FROM responses r
+            LEFT JOIN answers a ON a.response_id = r.id
+            LEFT JOIN options o ON o.id = a.option_id
+            WHERE {where}
+            ORDER BY {order}
+        ''', params)
+        
+        current = None
+        answers = first_ids = None
+        for response_id, created_at, respondent_ip, submission_key, answer_id, question_id, *answer in cursor:
+            if current is None or response_id != current[0]:
+                if current is not None:
+                    yield (*current, answers)
+                current = (response_id, created_at, respondent_ip,
+                           export_submission_key(survey_id, response_id, submission_key))
+                answers, first_ids = {}, {}
+            if question_id in question_ids and answer_id < first_ids.get(question_id, answer_id + 1):
+                first_ids[question_id] = answer_id
+                answers[question_id] = answer
+        if current is not None:
+            yield (*current, answers)
+
+def export_submission_key(survey_id, response_id, submission_key):
+    """The key an export writes for a response: its own, or one naming the response it was exported from.
+
+    Every exported row carries a key, so importing an export again (here or
+    into another survey) counts its rows as duplicates instead of storing them
+    twice; see find_exported_response.
+    """
+    return submission_key or f"survey-{survey_id}-response-{response_id}"
+
+def format_csv_answer(question, answer):
+    """The export cell for one question of one response"""
+    if answer is None:
+        return 'No answer'
+    option_text, text_answer, number_answer = answer
+    if question['question_type'] == 'multiple-choice':
+        return option_text if option_text is not None else 'No answer'
+    # For rating, slider, text questions
+    if text_answer:
+        return text_answer
+    if number_answer is not None:
+        return str(number_answer)
+    return 'No answer'
+
+def iter_answer_rows(survey_id, questions, **selection):
+    """Yield (responses_seen, response_id, question_id, option_id, text_answer, number_answer)
+    for every answer, oldest response first, from one ordered join like iter_response_rows.
+    """
+    where, order, params = export_response_filter(survey_id, **selection)
+    question_ids = {question['id'] for question in questions}
+    with DatabaseConnection() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute(f'''
+            SELECT r.id, a.question_id, a.option_id, a.text_answer, a.number_answer
+            FROM responses r
+            JOIN answers a ON a.response_id = r.id
+            WHERE {where}
+            ORDER BY {order}
+        ''', params)
+        
+        seen = 0
+        last_response_id = None
+        for row in cursor:
+            if row[0] != last_response_id:
+                last_response_id = row[0]
+                seen += 1
+            if row[1] in question_ids:
+                yield (seen, *row)
+
+def chunk_export(pieces, progress=None):
+    """Join (responses_written, text) pieces into chunks of roughly EXPORT_CHUNK_SIZE characters.
+
+    progress, if given, is called with the number of responses written so far
+    before each chunk is yielded.
+    """
+    buffer = []
+    size = written = 0
+    for written, text in pieces:
+        buffer.append(text)
+        size += len(text)
+        if size >= EXPORT_CHUNK_SIZE:
+            if progress:
+                progress(written)
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    
+    if progress:
+        progress(written)
+    yield ''.join(buffer)
+
+def csv_formatter():
+    """A function formatting one row as a CSV line"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    
+    def format_row(row):
+        output.seek(0)
+        output.truncate()
+        writer.writerow(row)
+        return output.getvalue()
+    return format_row
+
+def generate_responses_csv(survey_id, questions, progress=None, **selection):
+    """Stream the responses CSV: one row per response, one column per question"""
+    format_row = csv_formatter()
+    
+    def pieces():
+        # Write header row
+        header = ['Response ID', 'Submission Time', 'IP Address', 'Submission Key']
+        for question in questions:
+            header.append(f"Q{question['position']}: {question['question_text']}")
+        yield 0, format_row(header)
+        
+        # Write data rows
+        for written, (response_id, created_at, respondent_ip, submission_key, answers) in enumerate(
+                iter_response_rows(survey_id, questions, **selection), 1):
+            row = [response_id, created_at, respondent_ip, submission_key]
+            for question in questions:
+                row.append(format_csv_answer(question, answers.get(question['id'])))
+            yield written, format_row(row)
+    
+    return chunk_export(pieces(), progress)
+
+def json_answer(answer):
+    """An answer's value with its native type: option text, free text, a number, or None"""
+    if answer is None:
+        return None
+    option_text, text_answer, number_answer = answer
+    if option_text is not None:
+        return option_text
+    if text_answer:
+        return text_answer
+    return number_answer
+
+def generate_responses_ndjson(survey_id, questions, progress=None, **selection):
+    """Stream one JSON object per line per response, answers keyed by question id"""
+    def pieces():
+        for written, (response_id, created_at, respondent_ip, submission_key, answers) in enumerate(
+                iter_response_rows(survey_id, questions, **selection), 1):
+            record = {
+                'response_id': response_id,
+                'created_at': created_at,
+                'respondent_ip': respondent_ip,
+                'submission_key': submission_key,
+                'answers': {str(question['id']): json_answer(answers.get(question['id'])) for question in questions}
+            }
+            yield written, json.dumps(record, separators=(',', ':')) + '\n'
+    
+    return chunk_export(pieces(), progress)
+
+def generate_answers_long(survey_id, questions, progress=None, **selection):
+    """Stream the long (tidy) CSV: one row per answer, empty cells for missing values"""
+    format_row = csv_formatter()
+    
+    def pieces():
+        yield 0, format_row(['response_id', 'question_id', 'option_id', 'text', 'number'])
+        for written, *row in iter_answer_rows(survey_id, questions, **selection):
+            yield written, format_row(row)
+    
+    return chunk_export(pieces(), progress)
+
+def generate_answers_npz(survey_id, questions, progress=None, **selection):
+    """The long format as typed numpy columns in one compressed .npz file.
+
+    response_id, question_id and option_id are int64 (option_id 0 when there
+    is none) and number is float64 (NaN when there is none). Texts are
+    concatenated UTF-8 in text_data; answer i's text is
+    text_data[text_offsets[i]:text_offsets[i + 1]]. The file can't be written
+    incrementally, so it's yielded as a single chunk once complete.
+    """
+    response_ids, question_ids, option_ids = array('q'), array('q'), array('q')
+    numbers = array('d')
+    text_offsets = array('q', [0])
+    text_data = bytearray()
+    
+    written = 0
+    for written, response_id, question_id, option_id, text_answer, number_answer in iter_answer_rows(survey_id, questions, **selection):
+        response_ids.append(response_id)
+        question_ids.append(question_id)
+        option_ids.append(option_id or 0)
+        numbers.append(math.nan if number_answer is None else number_answer)
+        if text_answer:
+            text_data += text_answer.encode('utf-8')
+        text_offsets.append(len(text_data))
+        if progress and len(response_ids) % 10000 == 0:
+            progress(written)
+    
+    output = io.BytesIO()
+    np.savez_compressed(
+        output,
+        response_id=np.frombuffer(response_ids, dtype=np.int64),
+        question_id=np.frombuffer(question_ids, dtype=np.int64),
+        option_id=np.frombuffer(option_ids, dtype=np.int64),
+        number=np.frombuffer(numbers, dtype=np.float64),
+        text_offsets=np.frombuffer(text_offsets, dtype=np.int64),
+        text_data=np.frombuffer(bytes(text_data), dtype=np.uint8)
+    )
+    if progress:
+        progress(written)
+    yield output.getvalue()
+
+# Export formats: ?format= -> (generator, mimetype, file name suffix)
+EXPORT_FORMATS = {
+    'csv': (generate_responses_csv, 'text/csv', 'responses.csv'),
+    'ndjson': (generate_responses_ndjson, 'application/x-ndjson', 'responses.ndjson'),
+    'long': (generate_answers_long, 'text/csv', 'answers_long.csv'),
+    'npz': (generate_answers_npz, 'application/octet-stream', 'answers.npz')
+}
+
+# Export jobs. Exports of more than EXPORT_INLINE_MAX_RESPONSES responses are
+# built in the background and kept in export_artifacts under a stamp made of
+# the survey version and its latest response id, so a finished file is reused
+# until a new response arrives or the survey is edited.
+# Bumped when the export files' layout changes, so artifacts cached before it are rebuilt
+EXPORT_LAYOUT = 2
+
+def get_export_stamp(conn, survey_id):
+    """(stamp, response_count) for the survey's current responses"""
+    row = conn.execute('''
+        SELECT s.version,
+               (SELECT MAX(id) FROM responses WHERE survey_id = s.id) AS last_response_id,
+               COALESCE(st.response_count, 0) AS response_count
+        FROM surveys s
+        LEFT JOIN survey_stats st ON st.survey_id = s.id
+        WHERE s.id = ?
+    ''', (survey_id,)).fetchone()
+    return f"{EXPORT_LAYOUT}-{row['version']}-{row['last_response_id'] or 0}", row['response_count']
+
+def build_export(survey_id, export_format, progress=None):
+    """A complete export file as (data, mimetype)"""
+    generate, mimetype, _ = EXPORT_FORMATS[export_format]
+    with DatabaseConnection() as conn:
+        questions = [dict(q) for q in conn.execute(
+            'SELECT * FROM questions WHERE survey_id = ? ORDER BY position', (survey_id,)
+        )]
+    data = b''.join(
+        chunk if isinstance(chunk, bytes) else chunk.encode('utf-8')
+        for chunk in generate(survey_id, questions, progress=progress)
+    )
+    return data, mimetype
+
+def store_export(survey_id, export_format, stamp, data, mimetype):
+    with DatabaseConnection(write=True) as conn:
+        conn.execute("""
+            INSERT INTO export_artifacts (survey_id, format, stamp, data, mimetype) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (survey_id, format) DO UPDATE SET
+                stamp = excluded.stamp, data = excluded.data, mimetype = excluded.mimetype,
+                created_at = CURRENT_TIMESTAMP
+        """, (survey_id, export_format, stamp, data, mimetype))
+
+class ExportJobs:
+    """Runs large exports on a bounded thread pool, tracking them in export_jobs.
+
+    Job state lives in the database, so whichever worker process serves a
+    status poll can report on a job another process is running, and requests
+    for the same survey, format and stamp share one job. A job whose row stops
+    being updated for EXPORT_JOB_STALE_AFTER seconds (its process died) is
+    considered abandoned and a new one is started in its place.
+
+    Job rows are written on a connection of the job's own, never the pooled
+    one: progress is reported from inside build_export while its read cursor
+    holds the thread's pooled connection, and a write nested in that block
+    would hold the database's write lock, uncommitted, until the export ended.
+    """
+
+    # Progress is written at most this often (seconds)
+    PROGRESS_INTERVAL = 1.0
+
+    def __init__(self, workers=2):
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._jobs = {}  # job_id -> Future, for jobs submitted by this process
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='export')
+                self._pid = os.getpid()
+                self._jobs = {}
+            return self._executor
+
+    def enqueue(self, survey_id, export_format, stamp, total):
+        """Id of the job producing this export, starting one unless a live or finished one exists"""
+        with DatabaseConnection(write=True) as conn:
+            job = conn.execute('''
+                SELECT id FROM export_jobs
+                WHERE survey_id = ? AND format = ? AND stamp = ?
+                  AND (status = 'done' OR (status IN ('queued', 'running') AND updated_at >= datetime('now', ?)))
+                ORDER BY id DESC LIMIT 1
+            ''', (survey_id, export_format, stamp, f"-{app.config['EXPORT_JOB_STALE_AFTER']} seconds")).fetchone()
+            if job:
+                return job['id']
+            job_id = conn.execute(
+                'INSERT INTO export_jobs (survey_id, format, stamp, total) VALUES (?, ?, ?, ?)',
+                (survey_id, export_format, stamp, total)
+            ).lastrowid
+        
+        future = self._get_executor().submit(self._run, job_id, survey_id, export_format, stamp)
+        with self._lock:
+            self._jobs[job_id] = future
+        future.add_done_callback(lambda f: self._finished(job_id))
+        return job_id
+
+    def _update(self, job_id, **fields):
+        """Update the job's row, committed at once on a dedicated connection"""
+        assignments = ', '.join(f"{name} = ?" for name in fields)
+        conn = get_pool().dedicated()
+        try:
+            with conn:
+                conn.execute(
+                    f"UPDATE export_jobs SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                    (*fields.values(), job_id)
+                )
+        finally:
+            conn.close()
+
+    def _run(self, job_id, survey_id, export_format, stamp):
+        reported = {'done': 0, 'at': time.monotonic()}
+        # Without WAL the export's own read lock would block the commit, so
+        # progress is only written with the final status
+        live = str(get_pool().pragmas.get('journal_mode', '')).upper() == 'WAL'
+        
+        def progress(done):
+            # Written at most every PROGRESS_INTERVAL; the final count is written with the status
+            reported['done'] = done
+            if not live or time.monotonic() - reported['at'] < self.PROGRESS_INTERVAL:
+                return
+            reported['at'] = time.monotonic()
+            try:
+                self._update(job_id, progress=done)
+            except sqlite3.Error as e:
+                # Progress is informational, so the export carries on without it
+                app.logger.warning(f"Could not record progress of export job {job_id}: {e}")
+        
+        try:
+            self._update(job_id, status='running')
+            data, mimetype = build_export(survey_id, export_format, progress=progress)
+            store_export(survey_id, export_format, stamp, data, mimetype)
+            self._update(job_id, status='done', progress=reported['done'])
+        except Exception as e:
+            app.logger.error(f"Error exporting responses for survey {survey_id} (job {job_id}): {e}")
+            self._update(job_id, status='failed', error=str(e))
+
+    def _finished(self, job_id):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def status(self, survey_id, job_id):
+        """The job's row as a dict, or None if it isn't one of this survey's jobs"""
+        with DatabaseConnection() as conn:
+            job = conn.execute(
+                'SELECT * FROM export_jobs WHERE id = ? AND survey_id = ?', (job_id, survey_id)
+            ).fetchone()
+        return dict(job) if job else None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'jobs': len(self._jobs),
+                'running': sum(1 for future in self._jobs.values() if future.running())
+            }
+
+export_jobs = ExportJobs(workers=app.config['EXPORT_WORKERS'])
+
+def set_download_headers(response, filename):
+    """Mark a response as a file download, like send_file's download_name does"""
+    try:
+        filename.encode('ascii')
+        names = {'filename': filename}
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', filename).encode('ascii', 'ignore').decode('ascii')
+        names = {'filename': simple, 'filename*': f"UTF-8''{quote(filename, safe='')}"}
+    response.headers.set('Content-Disposition', 'attachment', **names)
+    return response
+
+# Submission helpers
+def _as_id(value):
+    """An id from submitted JSON (int or numeric string), or None"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return None
+
+# Largest magnitude accepted for a rating or slider answer
+NUMBER_ANSWER_MAX = 1e9
+
+def validate_answers(survey, answers, errors=None):
+    """Submitted answers checked against a survey tree (see load_survey_tree).
+
+    Returns (question_id, option_id, text_answer, number_answer) rows ready for
+    insert_submission. Answers to questions outside the survey, options outside
+    their question, non-string text answers and non-numeric, non-finite or
+    out-of-range ratings are dropped with a warning (or, if an errors list is
+    given, a message appended to it), and a blank answer to a required text
+    question is dropped. Numeric text answers are stored as strings.
+    """
+    def reject(message):
+        if errors is None:
+            app.logger.warning(message)
+        else:
+            errors.append(message)
+    
+    questions = {question['id']: question for question in survey['questions']}
+    options = {
+        question['id']: {option['id'] for option in question['options']}
+        for question in survey['questions']
+    }
+    
+    rows = []
+    for answer in answers:
+        question_id = _as_id(answer.get('question_id'))
+        if not question_id:
+            reject(f"Missing question_id in answer for survey {survey['id']}")
+            continue
+        
+        question = questions.get(question_id)
+        if not question:
+            reject(f"Question {question_id} not found in survey {survey['id']}")
+            continue
+        
+        question_type = question['question_type']
+        if question_type == 'multiple-choice' or question_type == 'image-choice':
+            option_id = _as_id(answer.get('option_id'))
+            if option_id:
+                # Verify option belongs to question
+                if option_id in options[question_id]:
+                    rows.append((question_id, option_id, None, None))
+                else:
+                    reject(f"Option {option_id} does not belong to question {question_id}")
+        elif question_type == 'text':
+            text_answer = answer.get('text_answer', '')
+            if isinstance(text_answer, (int, float)) and not isinstance(text_answer, bool):
+                # A number typed into a text box arrives as a JSON number
+                text_answer = str(text_answer)
+            elif text_answer is not None and not isinstance(text_answer, str):
+                reject(f"Invalid text answer for question {question_id}: expected a string")
+                continue
+            if text_answer or not question.get('required'):
+                rows.append((question_id, None, text_answer, None))
+        elif question_type in ['rating', 'slider']:
+            number_answer = answer.get('number_answer')
+            if number_answer is not None:
+                try:
+                    number_answer = float(number_answer)
+                except (ValueError, TypeError):
+                    reject(f"Invalid numeric value for question {question_id}: {number_answer}")
+                    continue
+                # nan/inf (and huge values) would poison the running sums in question_stats
+                if not math.isfinite(number_answer) or abs(number_answer) > NUMBER_ANSWER_MAX:
+                    reject(f"Numeric value out of range for question {question_id}: {number_answer}")
+                    continue
+                rows.append((question_id, None, None, number_answer))
+    return rows
+
+SUBMISSION_KEY_MAX_LENGTH = 128
+
+def get_submission_key(data):
+    """The submission's idempotency key (Idempotency-Key header or "submission_key"), or None.
+
+    Raises ValueError for a key that isn't a short string.
+    """
+    return check_submission_key(request.headers.get('Idempotency-Key') or data.get('submission_key'))
+
+def check_submission_key(key):
+    """key stripped, or None if there is none; raises ValueError for one that isn't a short string"""
+    if key is None:
+        return None
+    if not isinstance(key, str) or not key.strip() or len(key) > SUBMISSION_KEY_MAX_LENGTH:
+        raise ValueError(f"Submission key must be a string of 1-{SUBMISSION_KEY_MAX_LENGTH} characters")
+    return key.strip()
+
+def find_submission(conn, survey_id, submission_key):
+    """Id of the response already stored under this submission key, or None"""
+    if submission_key is None:
+        return None
+    row = conn.execute(
+        'SELECT id FROM responses WHERE survey_id = ? AND submission_key = ?', (survey_id, submission_key)
+    ).fetchone()
+    return row['id'] if row else None
+
+EXPORTED_KEY = re.compile(r'survey-(\d+)-response-(\d+)$')
+
+def find_exported_response(conn, survey_id, submission_key, created_at=None):
+    """Id of the response an exported row was written from, if it is one of this survey's.
+
+    Responses stored without a key are exported under export_submission_key's
+    derived key, which find_submission can't see; the submission time must
+    match too, so a file exported from another database isn't mistaken for ours.
+    """
+    match = EXPORTED_KEY.match(submission_key or '')
+    if not match or int(match.group(1)) != survey_id:
+        return None
+    row = conn.execute(
+        'SELECT id FROM responses WHERE id = ? AND survey_id = ? AND created_at IS ?',
+        (int(match.group(2)), survey_id, created_at)
+    ).fetchone()
+    return row['id'] if row else None
+
+def insert_response(conn, survey_id, respondent_ip, rows, submission_key=None, created_at=None):
+    """Insert one response and its validated answer rows (one executemany); returns the response id"""
+    response_id = conn.execute(
+        'INSERT INTO responses (survey_id, respondent_ip, submission_key, created_at) '
+        'VALUES (?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))',
+        (survey_id, respondent_ip, submission_key, created_at)
+    ).lastrowid
     
-    # Add current timestamp
-    current_ts = str(now)
-    current[current_ts] = current.get(current_ts, 0) + 1
+    conn.executemany(
+        'INSERT INTO answers (response_id, question_id, option_id, text_answer, number_answer) VALUES (?, ?, ?, ?, ?)',
+        [(response_id, *row) for row in rows]
+    )
+    return response_id
+
+def insert_submission(conn, survey_id, respondent_ip, rows, submission_key=None):
+    """Store one response and its validated answer rows, in the caller's write transaction.
+
+    A fixed number of statements whatever the answer count: the response, one
+    executemany for the answers and the aggregate upserts.
+    """
+    response_id = insert_response(conn, survey_id, respondent_ip, rows, submission_key)
+    app.logger.info(f"Created response ID {response_id} for survey {survey_id}")
     
-    # Save back to session
-    session[key] = current
+    # Keep the analytics aggregates in step, in the same transaction
+    record_answer_aggregates(conn, survey_id, rows)
+    return response_id
+
+class SubmissionQueue:
+    """Group commit for survey submissions (SUBMIT_MODE=group).
+
+    Request threads validate their submission, queue it and wait; one writer
+    thread per process takes whatever has queued up (at most batch_size
+    submissions, waiting up to batch_wait seconds for more) and stores the
+    whole batch in one write transaction, so a burst of submissions shares a
+    few commits instead of queueing for SQLite's write lock one by one. A
+    submission's future is only resolved once the transaction holding it has
+    committed, and each one runs in its own savepoint so a failing submission
+    doesn't take the rest of its batch down with it.
+    """
+
+    def __init__(self, batch_size=200, batch_wait=0.01, max_depth=10000):
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self.batches = 0
+        self.submissions = 0
+        self.failed = 0
+        self.rejected = 0
+        self.last_batch = 0
+        self.commit_time = 0.0
+        self.max_commit_time = 0.0
+        self.ack_time = 0.0  # Queued to committed, summed over submissions
+
+    def _get_queue(self):
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self.max_depth)
+                self._thread = threading.Thread(target=self._run, args=(self._queue,),
+                                                name='submission-writer', daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
+            return self._queue
+
+    def submit(self, survey, answers, rows, respondent_ip, submission_key=None):
+        """Future resolving to (response id, created) once the submission has committed.
+
+        created is False when submission_key was already used, and the id is
+        the original response's. survey is the tree rows were validated
+        against; if the survey has been edited by the time the batch is
+        written, answers are validated again. Raises queue.Full when max_depth
+        submissions are already waiting.
+        """
+        future = Future()
+        item = (survey['id'], survey['version'], answers, rows, respondent_ip, submission_key,
+                time.monotonic(), future)
+        try:
+            self._get_queue().put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise
+        return future
+
+    def _run(self, submissions):
+        while True:
+            item = submissions.get()
+            if item is None:
+                return
+            batch = [item]
+            closing = False
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.batch_size:
+                try:
+                    item = submissions.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    closing = True
+                    break
+                batch.append(item)
+            self._write(batch)
+            if closing:
+                return
+
+    def _write(self, batch):
+        started = time.monotonic()
+        results = []
+        try:
+            with DatabaseConnection(write=True) as conn:
+                versions = {}
+                trees = {}
+                recorded = {}  # survey_id -> [responses, answer rows]
+                for survey_id, version, answers, rows, respondent_ip, submission_key, queued_at, future in batch:
+                    if survey_id not in versions:
+                        row = conn.execute('SELECT version FROM surveys WHERE id = ?', (survey_id,)).fetchone()
+                        versions[survey_id] = row['version'] if row else None
+                    if versions[survey_id] is None:
+                        results.append((future, LookupError(f"Survey {survey_id} not found")))
+                        continue
+                    # Earlier in this batch counts too: it's the same transaction
+                    duplicate = find_submission(conn, survey_id, submission_key)
+                    if duplicate:
+                        results.append((future, (duplicate, False)))
+                        continue
+                    if versions[survey_id] != version:
+                        if survey_id not in trees:
+                            trees[survey_id] = load_survey_tree(conn, survey_id)
+                        rows = validate_answers(trees[survey_id], answers)
+                    
+                    conn.execute('SAVEPOINT submission')
+                    try:
+                        response_id = insert_response(conn, survey_id, respondent_ip, rows, submission_key)
+                    except sqlite3.Error as e:
+                        app.logger.error(f"Error storing queued submission for survey {survey_id}: {e}")
+                        conn.execute('ROLLBACK TO submission')
+                        results.append((future, e))
+                    else:
+                        totals = recorded.setdefault(survey_id, [0, []])
+                        totals[0] += 1
+                        totals[1].extend(rows)
+                        results.append((future, (response_id, True)))
+                    conn.execute('RELEASE submission')
+                
+                # One set of aggregate upserts per survey for the whole batch
+                for survey_id, (responses, rows) in recorded.items():
+                    record_answer_aggregates(conn, survey_id, rows, responses=responses)
+        except Exception as e:
+            app.logger.error(f"Error committing a batch of {len(batch)} submissions: {e}", exc_info=True)
+            with self._lock:
+                self.failed += len(batch)
+            for *_, future in batch:
+                future.set_exception(e)
+            return
+        
+        committed = time.monotonic()
+        failed = 0
+        for future, result in results:
+            if isinstance(result, Exception):
+                failed += 1
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+        with self._lock:
+            self.batches += 1
+            self.submissions += len(batch) - failed
+            self.failed += failed
+            self.last_batch = len(batch)
+            self.commit_time += committed - started
+            self.max_commit_time = max(self.max_commit_time, committed - started)
+            self.ack_time += sum(committed - item[6] for item in batch)
+
+    def close(self, timeout=5):
+        """Write out everything still queued and stop the writer thread, waiting at most timeout seconds"""
+        with self._lock:
+            thread = self._thread if self._pid == os.getpid() else None
+            submissions = self._queue
+        if thread is None or not thread.is_alive():
+            return
+        deadline = time.monotonic() + timeout
+        try:
+            # A full queue only has room for the stop marker once the writer has taken a batch
+            submissions.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        thread.join(max(deadline - time.monotonic(), 0))
+        if thread.is_alive():
+            app.logger.warning(f"Submission writer still busy after {timeout}s; "
+                               f"{submissions.qsize()} queued submissions were not written")
+
+    def stats(self):
+        with self._lock:
+            depth = self._queue.qsize() if self._queue is not None and self._pid == os.getpid() else 0
+            return {
+                'depth': depth,
+                'max_depth': self.max_depth,
+                'batch_size': self.batch_size,
+                'batch_wait': self.batch_wait,
+                'batches': self.batches,
+                'submissions': self.submissions,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'last_batch': self.last_batch,
+                'avg_batch': round(self.submissions / self.batches, 1) if self.batches else 0,
+                'avg_commit_ms': round(self.commit_time * 1000 / self.batches, 2) if self.batches else 0,
+                'max_commit_ms': round(self.max_commit_time * 1000, 2),
+                'avg_ack_ms': round(self.ack_time * 1000 / self.submissions, 2) if self.submissions else 0
+            }
+
+SUBMIT_MODES = ('direct', 'group')
+
+def get_submit_mode():
+    """The configured SUBMIT_MODE; raises ValueError for one that isn't in SUBMIT_MODES"""
+    mode = app.config['SUBMIT_MODE']
+    if mode not in SUBMIT_MODES:
+        raise ValueError(f"Unknown SUBMIT_MODE '{mode}'. Must be one of: {', '.join(SUBMIT_MODES)}")
+    return mode
+
+submission_queue = SubmissionQueue(
+    batch_size=app.config['SUBMIT_BATCH_SIZE'],
+    batch_wait=app.config['SUBMIT_BATCH_WAIT'],
+    max_depth=app.config['SUBMIT_QUEUE_MAX']
+)
+atexit.register(submission_queue.close)
+get_submit_mode()  # Fail at startup rather than on the first submission
+
+def submission_reply(response_id, answers_recorded, created=True):
+    """submit_survey's acknowledgement, sent once the response is committed"""
+    if not created:
+        app.logger.info(f"Duplicate submission of response {response_id}, not stored again")
+    return jsonify({
+        'success': True,
+        'response_id': response_id,
+        'answers_recorded': answers_recorded if created else 0,
+        'committed': True,
+        'duplicate': not created
+    })
+
+def submit_to_queue(survey, answers, rows, submission_key=None):
+    """submit_survey's response in group mode: wait for the writer thread to commit the submission"""
+    try:
+        future = submission_queue.submit(survey, answers, rows, request.remote_addr, submission_key)
+    except queue.Full:
+        app.logger.warning(f"Submission queue full, rejecting submission to survey {survey['id']}")
+        return jsonify({'error': 'Too many submissions right now. Please try again shortly.'}), 503
     
-    # Count total requests in period
-    total = sum(current.values())
+    try:
+        response_id, created = future.result(timeout=app.config['SUBMIT_ACK_TIMEOUT'])
+    except FutureTimeoutError:
+        # Still queued: it will be written, but can't be acknowledged as durable yet
+        app.logger.warning(f"Submission to survey {survey['id']} not committed within {app.config['SUBMIT_ACK_TIMEOUT']}s")
+        return jsonify({
+            'success': True,
+            'answers_recorded': len(rows),
+            'committed': False
+        }), 202
+    except LookupError:
+        return jsonify({'error': 'Survey not found'}), 404
     
-    # Return True if limit exceeded
-    return total > limit
+    if created:
+        app.logger.info(f"Added {len(rows)} answers for response {response_id}")
+    return submission_reply(response_id, len(rows), created)
+
+# Response import. Kiosks and other offline collectors upload their responses
+# in bulk instead of replaying them through submit_survey one by one. Rows are
+# validated like submissions against the survey tree and stored
+# IMPORT_BATCH_SIZE to a write transaction, with per-row errors reported back.
+IMPORT_MAX_ERRORS = 100  # Row errors listed in the reply; the rest are only counted
+IMPORT_MIMETYPES = {
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'application/json': 'ndjson',
+    'text/csv': 'csv'
+}
+IMPORT_COLUMN = re.compile(r'^Q(\d+):')
+
+def parse_import_timestamp(value):
+    """A submission time as stored in responses.created_at (UTC); raises ValueError"""
+    if not isinstance(value, str):
+        raise ValueError(f"Invalid submission time {value!r}")
+    try:
+        moment = datetime.datetime.fromisoformat(value.strip())
+    except ValueError:
+        raise ValueError(f"Invalid submission time {value!r}") from None
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+class ResponseImport:
+    """One bulk import of responses into a survey.
+
+    Accepts NDJSON records in the submission format ({"answers": [...]}) or as
+    written by the ndjson export ({"answers": {question id: value}}), and CSV
+    in the layout of the csv export. Either may carry a submission time,
+    respondent IP and submission key per response; a key already stored is
+    counted as a duplicate, so an interrupted import can simply be re-run.
+    Exports write a key for every response, so they can be re-imported too;
+    responses without one are counted as unkeyed, since nothing stops them
+    being stored again.
+    """
+
+    def __init__(self, survey, respondent_ip, batch_size=1000):
+        self.survey = survey
+        self.respondent_ip = respondent_ip
+        self.batch_size = batch_size
+        self.questions = {question['id']: question for question in survey['questions']}
+        self.option_ids = {
+            question['id']: {option['option_text']: option['id'] for option in question['options']}
+            for question in survey['questions']
+        }
+        self.batch = []  # (answers, rows, submission_key, created_at, respondent_ip)
+        self.imported = 0
+        self.duplicates = 0
+        self.unkeyed = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def add(self, line, answers, submission_key=None, created_at=None, respondent_ip=None):
+        """Queue one response given as submission-format answers, storing the batch once it's full"""
+        if not isinstance(answers, list) or not all(isinstance(answer, dict) for answer in answers):
+            self.error(line, 'answers must be a list of objects')
+            return
+        try:
+            submission_key = check_submission_key(submission_key)
+            if created_at not in (None, ''):
+                created_at = parse_import_timestamp(created_at)
+        except ValueError as e:
+            self.error(line, str(e))
+            return
+        
+        problems = []
+        rows = validate_answers(self.survey, answers, problems)
+        if problems:
+            self.error(line, '; '.join(problems))
+            return
+        if not rows:
+            self.error(line, 'No answers')
+            return
+        
+        self.batch.append((answers, rows, submission_key, created_at or None, respondent_ip or self.respondent_ip))
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def add_exported(self, line, values, **fields):
+        """Queue one response given as {question id: value} with values as the exports write them"""
+        answers = []
+        for question_id, value in values.items():
+            question = self.questions.get(_as_id(question_id))
+            if question is None:
+                self.error(line, f"Question {question_id} not found in survey {self.survey['id']}")
+                return
+            if value is None or value == '' or value == 'No answer':
+                continue
+            
+            if question['question_type'] in ('multiple-choice', 'image-choice'):
+                option_id = self.option_ids[question['id']].get(value)
+                if option_id is None:
+                    self.error(line, f"Question {question['id']} has no option {value!r}")
+                    return
+                answers.append({'question_id': question['id'], 'option_id': option_id})
+            elif question['question_type'] == 'text':
+                answers.append({'question_id': question['id'], 'text_answer': str(value)})
+            else:
+                answers.append({'question_id': question['id'], 'number_answer': value})
+        self.add(line, answers, **fields)
+
+    def flush(self):
+        """Store the queued responses in one write transaction"""
+        if not self.batch:
+            return
+        survey_id = self.survey['id']
+        with DatabaseConnection(write=True) as conn:
+            current = conn.execute('SELECT version FROM surveys WHERE id = ?', (survey_id,)).fetchone()
+            if not current:
+                raise LookupError(f"Survey {survey_id} not found")
+            revalidate = current['version'] != self.survey['version']
+            if revalidate:
+                # Edited mid-import: the rest is checked against the survey as it is now
+                self.survey = load_survey_tree(conn, survey_id)
+            
+            recorded = []
+            stored = duplicates = unkeyed = 0
+            for answers, rows, submission_key, created_at, respondent_ip in self.batch:
+                if (find_submission(conn, survey_id, submission_key)
+                        or find_exported_response(conn, survey_id, submission_key, created_at)):
+                    duplicates += 1
+                    continue
+                if submission_key is None:
+                    unkeyed += 1
+                if revalidate:
+                    rows = validate_answers(self.survey, answers)
+                insert_response(conn, survey_id, respondent_ip, rows, submission_key, created_at)
+                recorded.extend(rows)
+                stored += 1
+            record_answer_aggregates(conn, survey_id, recorded, responses=stored)
+        
+        self.imported += stored
+        self.duplicates += duplicates
+        self.unkeyed += unkeyed
+        self.batch = []
+
+    def read_ndjson(self, lines):
+        for line, text in enumerate(lines, 1):
+            if not text.strip():
+                continue
+            try:
+                record = json.loads(text)
+            except ValueError as e:
+                self.error(line, f"Invalid JSON: {e}")
+                continue
+            if not isinstance(record, dict):
+                self.error(line, 'Expected a JSON object')
+                continue
+            
+            answers = record.get('answers')
+            fields = {
+                'submission_key': record.get('submission_key'),
+                'created_at': record.get('created_at'),
+                'respondent_ip': record.get('respondent_ip')
+            }
+            if isinstance(answers, dict):
+                self.add_exported(line, answers, **fields)
+            else:
+                self.add(line, answers, **fields)
+        self.flush()
+
+    def read_csv(self, lines):
+        """Rows in the csv export's layout; raises ValueError for a header it doesn't match"""
+        reader = csv.reader(lines)
+        header = next(reader, None)
+        if not header:
+            raise ValueError('The CSV file is empty')
+        
+        by_position = {question['position']: question['id'] for question in self.survey['questions']}
+        fields = {'Submission Time': 'created_at', 'IP Address': 'respondent_ip', 'Submission Key': 'submission_key'}
+        field_columns = {}
+        question_columns = {}
+        for index, name in enumerate(header):
+            match = IMPORT_COLUMN.match(name)
+            if name in fields:
+                field_columns[fields[name]] = index
+            elif match and int(match.group(1)) in by_position:
+                question_columns[by_position[int(match.group(1))]] = index
+            elif name != 'Response ID':
+                raise ValueError(f"Column {name!r} doesn't match a question of this survey")
+        
+        for row in reader:
+            if not any(row):
+                continue
+            if len(row) != len(header):
+                self.error(reader.line_num, f"Expected {len(header)} columns, found {len(row)}")
+                continue
+            values = {question_id: row[index] for question_id, index in question_columns.items()}
+            self.add_exported(reader.line_num, values,
+                              **{field: row[index] for field, index in field_columns.items()})
+        self.flush()
+
+    def summary(self):
+        summary = {
+            'imported': self.imported,
+            'duplicates': self.duplicates,
+            'unkeyed': self.unkeyed,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors)
+        }
+        if self.unkeyed:
+            summary['warning'] = (f"{self.unkeyed} responses had no submission key and can't be recognised as "
+                                  "duplicates: importing this file again will store them again.")
+        return summary
+
+# Rate limiting helper
+RATE_LIMIT_BACKENDS = ('sqlite', 'memory')
+
+def parse_rate_limits(value):
+    """{route: (limit, period)} from RATE_LIMITS ("route=limit/seconds,..."); raises ValueError if malformed"""
+    limits = {}
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        route, _, spec = item.partition('=')
+        count, _, seconds = spec.partition('/')
+        try:
+            limit, period = int(count), float(seconds or 60)
+        except ValueError:
+            limit = period = None
+        if not route.strip() or limit is None or limit <= 0 or not 0 < period < math.inf:
+            raise ValueError(f"Invalid RATE_LIMITS entry '{item}'. Must be route=requests/seconds "
+                             f"with a positive whole number of requests and a positive number of seconds")
+        limits[route.strip()] = (limit, period)
+    return limits
+
+class RateLimiter:
+    """Token buckets per route and client IP.
+
+    A route allowed limit requests per period gets a bucket of limit tokens,
+    refilled at limit / period tokens a second; each request takes a token and
+    is rejected when less than one is left. With the sqlite backend buckets
+    are rows of rate_limits, shared by every worker process. A check reads
+    the bucket without locking and only takes the write lock to spend a
+    token, so rejected requests never contend with writers. The memory
+    backend keeps buckets in this process only, which is also used for the
+    local_routes even with the sqlite backend: for hot write paths like
+    submit_survey, a write transaction per request would compete with the
+    submission writes (and the group commit writer) for SQLite's single
+    write lock, at the cost of each worker process enforcing the limit on
+    its own. A bucket that has refilled is the same as no bucket, so those
+    are pruned every PRUNE_EVERY checks.
+    """
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self, backend='sqlite', overrides=None, local_routes=()):
+        if backend not in RATE_LIMIT_BACKENDS:
+            raise ValueError(f"Unknown RATE_LIMIT_BACKEND '{backend}'. Must be one of: {', '.join(RATE_LIMIT_BACKENDS)}")
+        self.backend = backend
+        self.overrides = dict(overrides or {})
+        self.local_routes = set(local_routes)
+        self._lock = threading.Lock()
+        self._buckets = {}  # Memory backend: key -> (tokens, updated_at, full_at)
+        self._checks = 0
+        self.allowed = {}
+        self.rejected = {}
+        self.errors = 0
+
+    @staticmethod
+    def _take(tokens, updated_at, now, limit, rate):
+        """(allowed, tokens, full_at) for a bucket after a request at now"""
+        tokens = min(limit, tokens + (now - updated_at) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        return allowed, tokens, now + (limit - tokens) / rate
+
+    def _check_memory(self, key, now, limit, rate):
+        with self._lock:
+            tokens, updated_at, _ = self._buckets.get(key, (limit, now, now))
+            allowed, tokens, full_at = self._take(tokens, updated_at, now, limit, rate)
+            self._buckets[key] = (tokens, now, full_at)
+        return allowed
+
+    def _check_sqlite(self, key, now, limit, rate):
+        with DatabaseConnection() as conn:
+            bucket = conn.execute('SELECT tokens, updated_at FROM rate_limits WHERE key = ?', (key,)).fetchone()
+        if bucket and not self._take(bucket['tokens'], bucket['updated_at'], now, limit, rate)[0]:
+            # Empty: rejecting doesn't change the bucket, so no write is needed
+            return False
+        
+        # Read again under the write lock, as another request may have spent the token
+        with DatabaseConnection(write=True) as conn:
+            bucket = conn.execute('SELECT tokens, updated_at FROM rate_limits WHERE key = ?', (key,)).fetchone()
+            tokens, updated_at = (bucket['tokens'], bucket['updated_at']) if bucket else (limit, now)
+            allowed, tokens, full_at = self._take(tokens, updated_at, now, limit, rate)
+            conn.execute("""
+                INSERT INTO rate_limits (key, tokens, updated_at, full_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    tokens = excluded.tokens, updated_at = excluded.updated_at, full_at = excluded.full_at
+            """, (key, tokens, now, full_at))
+        return allowed
+
+    def check(self, route, client, limit, period):
+        """True if client may make another request to route (limit per period, unless overridden)"""
+        limit, period = self.overrides.get(route, (limit, period))
+        key = f"{route}:{client}"
+        now = time.time()
+        try:
+            if self.backend == 'memory' or route in self.local_routes:
+                allowed = self._check_memory(key, now, limit, limit / period)
+            else:
+                allowed = self._check_sqlite(key, now, limit, limit / period)
+        except sqlite3.Error as e:
+            # Fail open: a busy database shouldn't turn into rejected requests
+            app.logger.warning(f"Rate limit check failed for {key}: {e}")
+            with self._lock:
+                self.errors += 1
+            return True
+        
+        with self._lock:
+            counts = self.allowed if allowed else self.rejected
+            counts[route] = counts.get(route, 0) + 1
+            self._checks += 1
+            prune = self._checks % self.PRUNE_EVERY == 0
+        if prune:
+            self.prune(now)
+        return allowed
+
+    def prune(self, now=None):
+        """Drop buckets that have refilled completely"""
+        now = now or time.time()
+        with self._lock:
+            self._buckets = {key: bucket for key, bucket in self._buckets.items() if bucket[2] > now}
+        if self.backend == 'memory':
+            return
+        try:
+            with DatabaseConnection(write=True) as conn:
+                conn.execute('DELETE FROM rate_limits WHERE full_at <= ?', (now,))
+        except sqlite3.Error as e:
+            app.logger.warning(f"Error pruning rate limit buckets: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': self.backend,
+                'local_routes': sorted(self.local_routes),
+                'overrides': {route: list(limit) for route, limit in self.overrides.items()},
+                'allowed': dict(self.allowed),
+                'rejected': dict(self.rejected),
+                'errors': self.errors
+            }
+
+rate_limiter = RateLimiter(
+    backend=app.config['RATE_LIMIT_BACKEND'],
+    overrides=parse_rate_limits(app.config['RATE_LIMITS']),
+    local_routes=filter(None, (route.strip() for route in app.config['RATE_LIMIT_LOCAL_ROUTES'].split(',')))
+)
+
+def rate_limit(key_prefix, limit=10, period=60):
+    """True if this client has used up its allowance for the route (see RateLimiter)"""
+    return not rate_limiter.check(key_prefix, request.remote_addr, limit, period)
 
 # Authentication helper
 def login_required(f):
@@ -535,11 +2957,10 @@ def creator_only(f):
     """Ensure only the creator can access certain routes"""
     @wraps(f)
     def decorated_function(survey_id, *args, **kwargs):
-        with DatabaseConnection() as conn:
-            survey = conn.execute('SELECT * FROM surveys WHERE id = ?', (survey_id,)).fetchone()
+        owner = ownership.resolve('survey', survey_id)
         
         # If there's no creator_ip, we'll assume anyone can edit for backward compatibility
-        if survey and (not survey['creator_ip'] or survey['creator_ip'] == request.remote_addr):
+        if owner and (not owner[1] or owner[1] == request.remote_addr):
             return f(survey_id, *args, **kwargs)
         else:
             # Not the creator - redirect to view-only mode
@@ -548,33 +2969,258 @@ def creator_only(f):
     
     return decorated_function
 
+# Survey loading helpers
+def load_questions(conn, survey_id, question_id=None):
+    """Questions of a survey (or one of them) with their options nested under 'options'.
+
+    Runs two queries however many questions there are and assembles the tree
+    in Python, instead of one options query per question.
+    """
+    question_filter = 'q.survey_id = ?'
+    params = [survey_id]
+    if question_id is not None:
+        question_filter += ' AND q.id = ?'
+        params.append(question_id)
+    
+    questions = [dict(row) for row in conn.execute(
+        f'SELECT * FROM questions q WHERE {question_filter} ORDER BY q.position', params
+    )]
+    if not questions:
+        return questions
+    
+    questions_by_id = {}
+    for question in questions:
+        question['options'] = []
+        questions_by_id[question['id']] = question
+    
+    options = conn.execute(f"""
+        SELECT o.* FROM options o
+        JOIN questions q ON o.question_id = q.id
+        WHERE {question_filter}
+        ORDER BY o.question_id, o.position
+    """, params)
+    for option in options:
+        questions_by_id[option['question_id']]['options'].append(dict(option))
+    
+    return questions
+
+def load_survey_tree(conn, survey_id):
+    """Survey row as a dict with nested 'questions' and their 'options', or None"""
+    survey = conn.execute('SELECT * FROM surveys WHERE id = ?', (survey_id,)).fetchone()
+    if not survey:
+        return None
+    survey = dict(survey)
+    survey['questions'] = load_questions(conn, survey_id)
+    return survey
+
 # Cache for frequently accessed data
-survey_cache = {}
-def get_cached_survey(survey_id, max_age=60):
-    """Get survey data from cache or database"""
-    cache_key = f"survey_{survey_id}"
-    if cache_key in survey_cache:
-        # Check if cache is still valid
-        cached_time, survey_data = survey_cache[cache_key]
-        if time.time() - cached_time < max_age:
-            return survey_data
-    
-    # Get fresh data from database
+class SurveyCache:
+    """Thread-safe LRU cache of complete survey definitions.
+
+    Entries expire after ttl seconds and the least recently used ones are
+    evicted once either max_entries or max_bytes (estimated from each entry's
+    JSON size) is exceeded. An entry may carry a version; a get() asking for a
+    different version treats it as stale, which is how other gunicorn workers'
+    edits reach this worker's cache. Cached trees are shared between requests,
+    so callers must treat them as read-only.
+    """
+
+    def __init__(self, max_entries=512, max_bytes=32 * 1024 * 1024, ttl=60):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (expires_at, size, version, value)
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale = 0
+        self.invalidations = 0
+
+    def get(self, key, version=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, cached_version, value = entry
+            if time.monotonic() >= expires_at:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            if version is not None and cached_version != version:
+                self._remove(key)
+                self.stale += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, version=None):
+        size = len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, size, version, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        self._bytes -= self._entries.pop(key)[1]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'stale': self.stale,
+                'invalidations': self.invalidations
+            }
+
+survey_cache = SurveyCache(
+    max_entries=app.config['SURVEY_CACHE_MAX_ENTRIES'],
+    max_bytes=app.config['SURVEY_CACHE_MAX_BYTES'],
+    ttl=app.config['SURVEY_CACHE_TTL']
+)
+
+def get_cached_survey(survey_id):
+    """Get the survey with its nested questions and options from cache or database.
+
+    Every hit is validated against surveys.version (a primary key lookup), which
+    the schema triggers bump on any change to the survey, its questions or its
+    options, so edits made through another worker are never served stale.
+    """
     with DatabaseConnection() as conn:
-        survey = conn.execute('SELECT * FROM surveys WHERE id = ?', (survey_id,)).fetchone()
-        if survey:
-            survey_data = dict(survey)
-            # Store in cache
-            survey_cache[cache_key] = (time.time(), survey_data)
-            return survey_data
+        row = conn.execute('SELECT version FROM surveys WHERE id = ?', (survey_id,)).fetchone()
+        if not row:
+            survey_cache.invalidate(survey_id)
+            return None
+        
+        survey = survey_cache.get(survey_id, version=row['version'])
+        if survey is not None:
+            return survey
+        
+        # SELECTs otherwise autocommit one by one, so the tree is read in one
+        # explicit read transaction: its questions and options are then those
+        # of the version it's cached under, whatever is committed meanwhile
+        began = not conn.in_transaction
+        if began:
+            conn.execute('BEGIN')
+        try:
+            survey = load_survey_tree(conn, survey_id)
+        finally:
+            if began:
+                conn.commit()
     
-    return None
+    if survey:
+        survey_cache.set(survey_id, survey, version=survey['version'])
+    return survey
 
 def clear_survey_cache(survey_id):
     """Clear cached survey data when it's updated"""
-    cache_key = f"survey_{survey_id}"
-    if cache_key in survey_cache:
-        del survey_cache[cache_key]
+    survey_cache.invalidate(survey_id)
+    # Drop it again once the surrounding transaction commits, in case another
+    # request re-cached the pre-commit version in the meantime
+    get_pool().after_release(lambda: survey_cache.invalidate(survey_id))
+
+# Ownership lookups for the editor API. Every autosave checks that the
+# requester created the survey a question or option belongs to; the answer is
+# cached per process instead of joining up to surveys on each call.
+class OwnershipResolver:
+    """Cached question -> survey and option -> survey maps, plus each survey's creator.
+
+    Ids are never reused (AUTOINCREMENT) and questions and options never move
+    to another survey, so those maps can only go stale by their row being
+    deleted; this process forgets deleted rows straight away, and the editor
+    routes treat a write that changes no row as not found. A survey's creator
+    is what's checked, so survey entries are dropped when a survey is deleted
+    here and expire after ttl seconds for deletes made by other workers.
+    """
+
+    QUERIES = {
+        'survey': 'SELECT id, creator_ip FROM surveys WHERE id = ?',
+        'question': """
+            SELECT s.id, s.creator_ip FROM questions q
+            JOIN surveys s ON q.survey_id = s.id
+            WHERE q.id = ?
+        """,
+        'option': """
+            SELECT s.id, s.creator_ip FROM options o
+            JOIN questions q ON o.question_id = q.id
+            JOIN surveys s ON q.survey_id = s.id
+            WHERE o.id = ?
+        """
+    }
+
+    def __init__(self, max_entries=20000, ttl=60):
+        self._cache = SurveyCache(max_entries=max_entries, max_bytes=max_entries * 64, ttl=ttl)
+
+    def resolve(self, kind, object_id):
+        """(survey_id, creator_ip) for a survey, question or option, or None if it doesn't exist"""
+        survey_id = object_id if kind == 'survey' else self._cache.get((kind, object_id))
+        if survey_id is not None:
+            creator = self._cache.get(('survey', survey_id))
+            if creator is not None:
+                return survey_id, creator[0]
+        
+        with DatabaseConnection() as conn:
+            row = conn.execute(self.QUERIES[kind], (object_id,)).fetchone()
+        if not row:
+            return None
+        if kind != 'survey':
+            self._cache.set((kind, object_id), row['id'])
+        # Wrapped, as a survey without a creator_ip is a cached None
+        self._cache.set(('survey', row['id']), [row['creator_ip']])
+        return row['id'], row['creator_ip']
+
+    def forget(self, kind, object_id):
+        """Drop a deleted survey, question or option, again once the delete has committed"""
+        self._cache.invalidate((kind, object_id))
+        get_pool().after_release(lambda: self._cache.invalidate((kind, object_id)))
+
+    def stats(self):
+        return self._cache.stats()
+
+ownership = OwnershipResolver(
+    max_entries=app.config['OWNERSHIP_CACHE_MAX_ENTRIES'],
+    ttl=app.config['OWNERSHIP_CACHE_TTL']
+)
+
+def editor_owner(kind, object_id):
+    """(survey_id, None) if the requester may edit the question or option, else (None, error reply)"""
+    owner = ownership.resolve(kind, object_id)
+    if not owner:
+        return None, (jsonify({'error': f"{kind.capitalize()} not found"}), 404)
+    survey_id, creator_ip = owner
+    if str(creator_ip) != str(request.remote_addr):
+        return None, (jsonify({'error': 'Unauthorized'}), 403)
+    return survey_id, None
 
 # Routes
 @app.route('/')
@@ -605,7 +3251,7 @@ def create_survey():
             flash(message, 'danger')
         return redirect(url_for('index'))
     
-    with DatabaseConnection() as conn:
+    with DatabaseConnection(write=True) as conn:
         if template_id:
             # Creating from template - copy the template
             template = conn.execute('SELECT * FROM surveys WHERE id = ? AND is_template = 1', (template_id,)).fetchone()
@@ -656,33 +3302,18 @@ def create_survey():
 @creator_only
 def edit_survey(survey_id):
     with DatabaseConnection() as conn:
-        survey = conn.execute('SELECT * FROM surveys WHERE id = ?', (survey_id,)).fetchone()
-        questions = conn.execute(
-            'SELECT * FROM questions WHERE survey_id = ? ORDER BY position', 
-            (survey_id,)
-        ).fetchall()
-        
-        # Fetch options for each question
-        questions_with_options = []
-        for question in questions:
-            options = conn.execute(
-                'SELECT * FROM options WHERE question_id = ? ORDER BY position',
-                (question['id'],)
-            ).fetchall()
-            question_dict = dict(question)
-            question_dict['options'] = [dict(option) for option in options]
-            questions_with_options.append(question_dict)
+        survey = load_survey_tree(conn, survey_id)
     
     return render_template(
         'survey_editor.html', 
         survey=survey, 
-        questions=questions_with_options
+        questions=survey['questions']
     )
 
 @app.route('/survey/<int:survey_id>/settings', methods=['GET', 'POST'])
 @creator_only
 def survey_settings(survey_id):
-    with DatabaseConnection() as conn:
+    with DatabaseConnection(write=request.method == 'POST') as conn:
         survey = conn.execute('SELECT * FROM surveys WHERE id = ?', (survey_id,)).fetchone()
         
         if request.method == 'POST':
@@ -759,23 +3390,6 @@ def view_survey(survey_id):
     if survey.get('published') == 0 and survey.get('creator_ip') != request.remote_addr:
         return render_template('survey_not_published.html', survey=survey)
         
-    with DatabaseConnection() as conn:
-        questions = conn.execute(
-            'SELECT * FROM questions WHERE survey_id = ? ORDER BY position', 
-            (survey_id,)
-        ).fetchall()
-        
-        # Fetch options for each question
-        questions_with_options = []
-        for question in questions:
-            options = conn.execute(
-                'SELECT * FROM options WHERE question_id = ? ORDER BY position',
-                (question['id'],)
-            ).fetchall()
-            question_dict = dict(question)
-            question_dict['options'] = [dict(option) for option in options]
-            questions_with_options.append(question_dict)
-    
     # FIXED: Strict comparison for creator check, using string comparison to be safe
     is_creator = str(survey.get('creator_ip', '')) == str(request.remote_addr)
     app.logger.info(f"Survey {survey_id} viewed by IP {request.remote_addr}, creator IP: {survey.get('creator_ip')}, is_creator: {is_creator}")
@@ -783,14 +3397,14 @@ def view_survey(survey_id):
     return render_template(
         'survey_view.html', 
         survey=survey, 
-        questions=questions_with_options,
+        questions=survey['questions'],
         is_creator=is_creator
     )
 
 @app.route('/survey/<int:survey_id>/duplicate', methods=['POST'])
 @creator_only
 def duplicate_survey(survey_id):
-    with DatabaseConnection() as conn:
+    with DatabaseConnection(write=True) as conn:
         # Get the original survey
         survey = conn.execute('SELECT * FROM surveys WHERE id = ?', (survey_id,)).fetchone()
         
@@ -829,7 +3443,7 @@ def duplicate_survey(survey_id):
 @app.route('/survey/<int:survey_id>/toggle-publish', methods=['POST'])
 @creator_only
 def toggle_publish_survey(survey_id):
-    with DatabaseConnection() as conn:
+    with DatabaseConnection(write=True) as conn:
         # Get current status
         survey = conn.execute('SELECT published FROM surveys WHERE id = ?', (survey_id,)).fetchone()
         
@@ -855,7 +3469,7 @@ def toggle_publish_survey(survey_id):
 @app.route('/survey/<int:survey_id>/toggle-archive', methods=['POST'])
 @creator_only
 def toggle_archive_survey(survey_id):
-    with DatabaseConnection() as conn:
+    with DatabaseConnection(write=True) as conn:
         # Get current status
         survey = conn.execute('SELECT archived FROM surveys WHERE id = ?', (survey_id,)).fetchone()
         
@@ -892,9 +3506,10 @@ def archived_surveys():
 @app.route('/survey/<int:survey_id>/delete', methods=['POST'])
 @creator_only
 def delete_survey(survey_id):
-    with DatabaseConnection() as conn:
+    with DatabaseConnection(write=True) as conn:
         # Delete the survey (cascading delete will handle related records)
         conn.execute('DELETE FROM surveys WHERE id = ?', (survey_id,))
+        ownership.forget('survey', survey_id)
     
     # Clear cache
     clear_survey_cache(survey_id)
@@ -908,162 +3523,252 @@ def view_responses(survey_id):
     with DatabaseConnection() as conn:
         survey = conn.execute('SELECT * FROM surveys WHERE id = ?', (survey_id,)).fetchone()
         
-        # Get all questions for this survey
-        questions = conn.execute(
-            'SELECT * FROM questions WHERE survey_id = ? ORDER BY position', 
-            (survey_id,)
-        ).fetchall()
+        # Questions with their options, for the table and the filter form
+        questions = load_questions(conn, survey_id)
         
-        # Generate charts for each question
-        charts = {}
-        for question in questions:
-            chart_data = generate_chart(question['id'], survey_id)
-            if chart_data:
-                charts[question['id']] = chart_data
+        # Chart URLs carry their stamp, so unchanged charts come from the browser cache
+        chart_stamps = get_chart_stamps(conn, survey_id)
+        charts = {
+            question_id: url_for('question_chart', survey_id=survey_id, question_id=question_id, v=stamp)
+            for question_id, stamp in chart_stamps.items()
+        }
         
-        # Get response data
-        responses = conn.execute(
-            'SELECT * FROM responses WHERE survey_id = ? ORDER BY created_at DESC', 
-            (survey_id,)
-        ).fetchall()
+        try:
+            filters = parse_response_filters(request.args, questions)
+        except ValueError as e:
+            flash(f"Invalid filter ignored: {e}", 'warning')
+            filters = ([], [])
         
-        # Prepare data for the template
-        response_data = []
-        for response in responses:
-            # Get all answers for this response
-            answers = conn.execute('''
-                SELECT a.*, q.question_text, q.question_type, o.option_text 
-                FROM answers a
-                JOIN questions q ON a.question_id = q.id
-                LEFT JOIN options o ON a.option_id = o.id
-                WHERE a.response_id = ?
-            ''', (response['id'],)).fetchall()
-            
-            response_data.append({
-                'id': response['id'],
-                'created_at': response['created_at'],
-                'ip': response['respondent_ip'],
-                'answers': answers
-            })
+        response_count = get_response_count(conn, survey_id)
+        matching_count = None
+        if filters[0]:
+            matching_count = conn.execute(
+                'SELECT COUNT(*) FROM responses r WHERE r.survey_id = ? AND ' + ' AND '.join(filters[0]),
+                (survey_id, *filters[1])
+            ).fetchone()[0]
+        
+        per_page = max(1, min(request.args.get('per_page', app.config['RESPONSES_PAGE_SIZE'], type=int),
+                              app.config['RESPONSES_PAGE_SIZE_MAX']))
+        responses, older, newer = load_response_page(
+            conn, survey_id, per_page,
+            before=request.args.get('before', type=int),
+            after=request.args.get('after', type=int),
+            filters=filters
+        )
+    
+    # Charts that aren't rendered yet show a placeholder the page fills in when ready
+    pending_charts, unavailable = chart_renderer.render_missing(survey_id, chart_stamps)
+    for question_id in unavailable:
+        charts.pop(question_id, None)
     
     return render_template(
         'survey_responses.html',
         survey=survey,
         questions=questions,
-        responses=response_data,
-        response_count=len(responses),
-        charts=charts
+        responses=responses,
+        response_count=response_count,
+        matching_count=matching_count,
+        filter_args=get_filter_args(request.args) if filters[0] else {},
+        per_page=per_page,
+        older=older,
+        newer=newer,
+        charts=charts,
+        pending_charts=pending_charts,
+        chart_backend=app.config['CHART_BACKEND'],
+        export_job=request.args.get('export_job', type=int)
     )
 
+@app.route('/survey/<int:survey_id>/chart/<int:question_id>', methods=['GET'])
+@creator_only
+def question_chart(survey_id, question_id):
+    """Serve a question's chart from the render cache with ETag revalidation"""
+    with DatabaseConnection() as conn:
+        stamp = get_chart_stamps(conn, survey_id, question_id=question_id).get(question_id)
+    
+    if not stamp:
+        abort(404)
+    
+    if stamp in request.if_none_match:
+        response = app.response_class(status=304)
+    else:
+        chart = get_cached_chart(question_id, survey_id, stamp)
+        if not chart:
+            abort(404)
+        data, mimetype = chart
+        response = app.response_class(data, mimetype=mimetype)
+    
+    response.set_etag(stamp)
+    if request.args.get('v') == stamp:
+        # The URL names this exact rendering, so it can never change
+        response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    else:
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@app.route('/survey/<int:survey_id>/charts/status', methods=['GET'])
+@creator_only
+def chart_status(survey_id):
+    """Which of the survey's charts are rendered, for the responses page to poll"""
+    with DatabaseConnection() as conn:
+        chart_stamps = get_chart_stamps(conn, survey_id)
+    pending, unavailable = chart_renderer.render_missing(survey_id, chart_stamps)
+    
+    return jsonify({
+        'charts': {
+            str(question_id): url_for('question_chart', survey_id=survey_id, question_id=question_id, v=stamp)
+            for question_id, stamp in chart_stamps.items() if question_id not in unavailable
+        },
+        'pending': sorted(pending)
+    })
+
+def export_filename(survey, export_format, date=None):
+    date = date or datetime.datetime.now()
+    name, extension = EXPORT_FORMATS[export_format][2].rsplit('.', 1)
+    return f"{survey['title'].replace(' ', '_')}_{name}_{date.strftime('%Y%m%d')}.{extension}"
+
+def send_export_artifact(survey_id, export_format):
+    """Serve a stored export file, named for the day it was built"""
+    with DatabaseConnection() as conn:
+        survey = conn.execute('SELECT * FROM surveys WHERE id = ?', (survey_id,)).fetchone()
+        artifact = conn.execute(
+            'SELECT * FROM export_artifacts WHERE survey_id = ? AND format = ?', (survey_id, export_format)
+        ).fetchone()
+    
+    if not artifact:
+        abort(404)
+    
+    created = datetime.datetime.strptime(artifact['created_at'], '%Y-%m-%d %H:%M:%S')
+    response = app.response_class(artifact['data'], mimetype=artifact['mimetype'])
+    set_download_headers(response, export_filename(survey, export_format, created))
+    return response
+
+def export_job_status(survey_id, job):
+    """JSON-ready view of an export_jobs row for status polling"""
+    return {
+        'id': job['id'],
+        'status': job['status'],
+        'progress': job['progress'],
+        'total': job['total'],
+        'error': job['error'],
+        'status_url': url_for('export_status', survey_id=survey_id, job_id=job['id']),
+        'download_url': url_for('download_export', survey_id=survey_id, format=job['format']) if job['status'] == 'done' else None
+    }
+
 @app.route('/survey/<int:survey_id>/export', methods=['GET'])
 @creator_only
 def export_responses(survey_id):
-    # Apply rate limiting to prevent abuse
-    if rate_limit('export', limit=5, period=60):
-        flash('Too many export requests. Please try again later.', 'danger')
-        return redirect(url_for('view_responses', survey_id=survey_id))
+    """Download responses in the ?format= requested (CSV by default).
+
+    Served from the artifact cache when it's current, streamed inline for
+    small surveys, and otherwise built by a background job. With
+    ?since_response_id= only responses after that id are streamed, and the
+    X-Next-Cursor header gives the since_response_id for the next pull.
+    Filter parameters (see parse_response_filters) narrow either kind.
+    """
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"Unknown export format. Must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    generate, mimetype, _ = EXPORT_FORMATS[export_format]
+    
+    since = request.args.get('since_response_id')
+    if since is not None and not since.isdigit():
+        return jsonify({'error': 'since_response_id must be a non-negative integer'}), 400
     
     with DatabaseConnection() as conn:
         survey = conn.execute('SELECT * FROM surveys WHERE id = ?', (survey_id,)).fetchone()
+        stamp, response_count = get_export_stamp(conn, survey_id)
+        artifact = conn.execute(
+            'SELECT stamp FROM export_artifacts WHERE survey_id = ? AND format = ?', (survey_id, export_format)
+        ).fetchone()
         
         # Get all questions for this survey
-        questions = conn.execute(
+        questions = [dict(q) for q in conn.execute(
             'SELECT * FROM questions WHERE survey_id = ? ORDER BY position', 
             (survey_id,)
-        ).fetchall()
-        
-        # Get all responses
-        responses = conn.execute(
-            'SELECT * FROM responses WHERE survey_id = ? ORDER BY created_at', 
-            (survey_id,)
-        ).fetchall()
-        
-        # Create a CSV in memory
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header row
-        header = ['Response ID', 'Submission Time', 'IP Address']
-        for question in questions:
-            header.append(f"Q{question['position']}: {question['question_text']}")
-        writer.writerow(header)
-        
-        # Write data rows
-        for response in responses:
-            row = [response['id'], response['created_at'], response['respondent_ip']]
-            
-            # Get answers for this response
-            for question in questions:
-                if question['question_type'] == 'multiple-choice':
-                    answer = conn.execute('''
-                        SELECT a.*, o.option_text FROM answers a
-                        JOIN options o ON a.option_id = o.id
-                        WHERE a.response_id = ? AND a.question_id = ?
-                    ''', (response['id'], question['id'])).fetchone()
-                    
-                    if answer:
-                        row.append(answer['option_text'])
-                    else:
-                        row.append('No answer')
-                else:
-                    # For rating, slider, text questions
-                    answer = conn.execute('''
-                        SELECT * FROM answers
-                        WHERE response_id = ? AND question_id = ?
-                    ''', (response['id'], question['id'])).fetchone()
-                    
-                    if answer:
-                        if answer['text_answer']:
-                            row.append(answer['text_answer'])
-                        elif answer['number_answer'] is not None:
-                            row.append(str(answer['number_answer']))
-                        else:
-                            row.append('No answer')
-                    else:
-                        row.append('No answer')
-            
-            writer.writerow(row)
+        )]
+    
+    try:
+        filters = parse_response_filters(request.args, questions)
+    except ValueError as e:
+        return jsonify({'error': f"Invalid filter: {e}"}), 400
+    
+    if since is not None:
+        return export_since(survey_id, export_format, int(since), filters)
+    
+    # Filtered exports are streamed as they're asked for; only full exports are cached
+    if filters[0]:
+        response = app.response_class(generate(survey_id, questions, filters=filters), mimetype=mimetype)
+        set_download_headers(response, export_filename(survey, export_format))
+        return response
+    
+    if artifact and artifact['stamp'] == stamp:
+        return send_export_artifact(survey_id, export_format)
+    
+    if response_count <= app.config['EXPORT_INLINE_MAX_RESPONSES']:
+        response = app.response_class(generate(survey_id, questions), mimetype=mimetype)
+        set_download_headers(response, export_filename(survey, export_format))
+        return response
+    
+    job_id = export_jobs.enqueue(survey_id, export_format, stamp, response_count)
+    if request.accept_mimetypes.best_match(['text/html', 'application/json']) == 'application/json':
+        return jsonify(export_job_status(survey_id, export_jobs.status(survey_id, job_id))), 202
     
-    # Prepare the CSV for download
-    output.seek(0)
-    filename = f"{survey['title'].replace(' ', '_')}_responses_{datetime.datetime.now().strftime('%Y%m%d')}.csv"
+    flash('Your export is being prepared and will download when it is ready.', 'info')
+    return redirect(url_for('view_responses', survey_id=survey_id, export_job=job_id))
+
+def export_since(survey_id, export_format, since, filters=None):
+    """Stream the responses with ids after since, up to the latest one at request time"""
+    generate, mimetype, _ = EXPORT_FORMATS[export_format]
+    with DatabaseConnection() as conn:
+        survey = conn.execute('SELECT * FROM surveys WHERE id = ?', (survey_id,)).fetchone()
+        latest = conn.execute(
+            'SELECT MAX(id) FROM responses WHERE survey_id = ?', (survey_id,)
+        ).fetchone()[0] or 0
+        questions = [dict(q) for q in conn.execute(
+            'SELECT * FROM questions WHERE survey_id = ? ORDER BY position', (survey_id,)
+        )]
     
-    return send_file(
-        io.BytesIO(output.getvalue().encode('utf-8')),
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name=filename
+    # Capped at the latest id now, so responses arriving mid-stream wait for the next pull
+    cursor = max(since, latest)
+    response = app.response_class(
+        generate(survey_id, questions, id_range=(since, cursor), filters=filters), mimetype=mimetype
     )
+    set_download_headers(response, export_filename(survey, export_format))
+    response.headers['X-Next-Cursor'] = str(cursor)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/survey/<int:survey_id>/export/jobs/<int:job_id>', methods=['GET'])
+@creator_only
+def export_status(survey_id, job_id):
+    """Progress of a background export, for the responses page to poll"""
+    job = export_jobs.status(survey_id, job_id)
+    if not job:
+        return jsonify({'error': 'Export job not found'}), 404
+    return jsonify(export_job_status(survey_id, job))
+
+@app.route('/survey/<int:survey_id>/export/download', methods=['GET'])
+@creator_only
+def download_export(survey_id):
+    """The survey's most recently finished export file in the ?format= requested"""
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        abort(404)
+    return send_export_artifact(survey_id, export_format)
 
 @app.route('/survey/<int:survey_id>/pdf', methods=['GET'])
 def export_survey_pdf(survey_id):
     """Generate a printable PDF-friendly version of the survey"""
     with DatabaseConnection() as conn:
-        survey = conn.execute('SELECT * FROM surveys WHERE id = ?', (survey_id,)).fetchone()
-        
-        if not survey:
-            abort(404)
-            
-        questions = conn.execute(
-            'SELECT * FROM questions WHERE survey_id = ? ORDER BY position', 
-            (survey_id,)
-        ).fetchall()
-        
-        # Fetch options for each question
-        questions_with_options = []
-        for question in questions:
-            options = conn.execute(
-                'SELECT * FROM options WHERE question_id = ? ORDER BY position',
-                (question['id'],)
-            ).fetchall()
-            question_dict = dict(question)
-            question_dict['options'] = [dict(option) for option in options]
-            questions_with_options.append(question_dict)
+        survey = load_survey_tree(conn, survey_id)
+    
+    if not survey:
+        abort(404)
     
     return render_template(
         'survey_pdf.html', 
         survey=survey, 
-        questions=questions_with_options,
+        questions=survey['questions'],
         now=datetime.datetime.now
     )
 
@@ -1085,7 +3790,7 @@ def add_question(survey_id):
         if errors:
             return jsonify({'error': next(iter(errors.values()))}), 400
         
-        with DatabaseConnection() as conn:
+        with DatabaseConnection(write=True) as conn:
             # Get the max position
             max_pos = conn.execute(
                 'SELECT MAX(position) as max_pos FROM questions WHERE survey_id = ?', 
@@ -1114,14 +3819,7 @@ def add_question(survey_id):
                     )
             
             # Fetch the newly created question with options
-            question = conn.execute('SELECT * FROM questions WHERE id = ?', (question_id,)).fetchone()
-            options = conn.execute(
-                'SELECT * FROM options WHERE question_id = ? ORDER BY position',
-                (question_id,)
-            ).fetchall()
-            
-            question_dict = dict(question)
-            question_dict['options'] = [dict(option) for option in options]
+            question_dict = load_questions(conn, survey_id, question_id=question_id)[0]
         
         # Clear cache
         clear_survey_cache(survey_id)
@@ -1146,19 +3844,12 @@ def update_question(question_id):
             if errors:
                 return jsonify({'error': next(iter(errors.values()))}), 400
         
-        with DatabaseConnection() as conn:
-            # First check if this user is allowed to edit this question
-            question_row = conn.execute('SELECT q.*, s.creator_ip, s.id as survey_id FROM questions q JOIN surveys s ON q.survey_id = s.id WHERE q.id = ?', (question_id,)).fetchone()
-            
-            if not question_row:
-                return jsonify({'error': 'Question not found'}), 404
-                
-            # Convert to dictionary
-            question = dict(question_row)
-            
-            if str(question.get('creator_ip', '')) != str(request.remote_addr):
-                return jsonify({'error': 'Unauthorized'}), 403
-            
+        # First check if this user is allowed to edit this question
+        survey_id, error = editor_owner('question', question_id)
+        if error:
+            return error
+        
+        with DatabaseConnection(write=True) as conn:
             # Update query based on provided fields
             update_fields = []
             params = []
@@ -1178,10 +3869,11 @@ def update_question(question_id):
             if update_fields:
                 query = f"UPDATE questions SET {', '.join(update_fields)} WHERE id = ?"
                 params.append(question_id)
-                conn.execute(query, params)
+                if conn.execute(query, params).rowcount == 0:
+                    return jsonify({'error': 'Question not found'}), 404
             
             # Clear cache
-            clear_survey_cache(question['survey_id'])
+            clear_survey_cache(survey_id)
         
         return jsonify({'success': True})
     
@@ -1192,19 +3884,12 @@ def update_question(question_id):
 @app.route('/api/question/<int:question_id>/image', methods=['POST'])
 def upload_question_image(question_id):
     try:
-        with DatabaseConnection() as conn:
-            # First check if this user is allowed to edit this question
-            question_row = conn.execute('SELECT q.*, s.creator_ip, s.id as survey_id FROM questions q JOIN surveys s ON q.survey_id = s.id WHERE q.id = ?', (question_id,)).fetchone()
-            
-            if not question_row:
-                return jsonify({'error': 'Question not found'}), 404
-                
-            # Convert to dictionary
-            question = dict(question_row)
-            
-            if str(question.get('creator_ip', '')) != str(request.remote_addr):
-                return jsonify({'error': 'Unauthorized'}), 403
-            
+        # First check if this user is allowed to edit this question
+        survey_id, error = editor_owner('question', question_id)
+        if error:
+            return error
+        
+        with DatabaseConnection(write=True) as conn:
             if 'image' not in request.files:
                 return jsonify({'error': 'No file part'}), 400
             
@@ -1220,13 +3905,15 @@ def upload_question_image(question_id):
                     return jsonify({'error': 'Failed to save file'}), 500
                 
                 # Update the question with the image path
-                conn.execute(
+                updated = conn.execute(
                     'UPDATE questions SET image_path = ? WHERE id = ?',
                     (file_path, question_id)
-                )
+                ).rowcount
+                if not updated:
+                    return jsonify({'error': 'Question not found'}), 404
                 
                 # Clear cache
-                clear_survey_cache(question['survey_id'])
+                clear_survey_cache(survey_id)
                 
                 return jsonify({
                     'success': True,
@@ -1242,25 +3929,12 @@ def upload_question_image(question_id):
 @app.route('/api/option/<int:option_id>/image', methods=['POST'])
 def upload_option_image(option_id):
     try:
-        with DatabaseConnection() as conn:
-            # First check if this user is allowed to edit this option
-            option_row = conn.execute("""
-                SELECT o.*, s.creator_ip, s.id as survey_id
-                FROM options o 
-                JOIN questions q ON o.question_id = q.id 
-                JOIN surveys s ON q.survey_id = s.id 
-                WHERE o.id = ?
-            """, (option_id,)).fetchone()
-            
-            if not option_row:
-                return jsonify({'error': 'Option not found'}), 404
-                
-            # Convert to dictionary
-            option = dict(option_row)
-            
-            if str(option.get('creator_ip', '')) != str(request.remote_addr):
-                return jsonify({'error': 'Unauthorized'}), 403
-            
+        # First check if this user is allowed to edit this option
+        survey_id, error = editor_owner('option', option_id)
+        if error:
+            return error
+        
+        with DatabaseConnection(write=True) as conn:
             if 'image' not in request.files:
                 return jsonify({'error': 'No file part'}), 400
             
@@ -1276,13 +3950,15 @@ def upload_option_image(option_id):
                     return jsonify({'error': 'Failed to save file'}), 500
                 
                 # Update the option with the image path
-                conn.execute(
+                updated = conn.execute(
                     'UPDATE options SET image_path = ? WHERE id = ?',
                     (file_path, option_id)
-                )
+                ).rowcount
+                if not updated:
+                    return jsonify({'error': 'Option not found'}), 404
                 
                 # Clear cache
-                clear_survey_cache(option['survey_id'])
+                clear_survey_cache(survey_id)
                 
                 return jsonify({
                     'success': True,
@@ -1306,19 +3982,12 @@ def add_option(question_id):
         if errors:
             return jsonify({'error': next(iter(errors.values()))}), 400
         
-        with DatabaseConnection() as conn:
-            # First check if this user is allowed to edit this question
-            question_row = conn.execute('SELECT q.*, s.creator_ip, s.id as survey_id FROM questions q JOIN surveys s ON q.survey_id = s.id WHERE q.id = ?', (question_id,)).fetchone()
-            
-            if not question_row:
-                return jsonify({'error': 'Question not found'}), 404
-                
-            # Convert to dictionary
-            question = dict(question_row)
-            
-            if str(question.get('creator_ip', '')) != str(request.remote_addr):
-                return jsonify({'error': 'Unauthorized'}), 403
-            
+        # First check if this user is allowed to edit this question
+        survey_id, error = editor_owner('question', question_id)
+        if error:
+            return error
+        
+        with DatabaseConnection(write=True) as conn:
             # Get the max position
             max_pos = conn.execute(
                 'SELECT MAX(position) as max_pos FROM options WHERE question_id = ?', 
@@ -1340,7 +4009,7 @@ def add_option(question_id):
             option_dict = dict(option)
             
             # Clear cache
-            clear_survey_cache(question['survey_id'])
+            clear_survey_cache(survey_id)
         
         return jsonify(option_dict)
     
@@ -1359,32 +4028,21 @@ def update_option(option_id):
         if errors:
             return jsonify({'error': next(iter(errors.values()))}), 400
         
-        with DatabaseConnection() as conn:
-            # First check if this user is allowed to edit this option
-            option_row = conn.execute("""
-                SELECT o.*, s.creator_ip, s.id as survey_id 
-                FROM options o 
-                JOIN questions q ON o.question_id = q.id 
-                JOIN surveys s ON q.survey_id = s.id 
-                WHERE o.id = ?
-            """, (option_id,)).fetchone()
-            
-            if not option_row:
-                return jsonify({'error': 'Option not found'}), 404
-            
-            # Convert SQLite row to dictionary
-            option = dict(option_row)
-            
-            if str(option.get('creator_ip', '')) != str(request.remote_addr):
-                return jsonify({'error': 'Unauthorized'}), 403
-            
-            conn.execute(
+        # First check if this user is allowed to edit this option
+        survey_id, error = editor_owner('option', option_id)
+        if error:
+            return error
+        
+        with DatabaseConnection(write=True) as conn:
+            updated = conn.execute(
                 'UPDATE options SET option_text = ? WHERE id = ?',
                 (option_text, option_id)
-            )
+            ).rowcount
+            if not updated:
+                return jsonify({'error': 'Option not found'}), 404
             
             # Clear cache
-            clear_survey_cache(option['survey_id'])
+            clear_survey_cache(survey_id)
         
         return jsonify({'success': True})
     
@@ -1395,29 +4053,19 @@ def update_option(option_id):
 @app.route('/api/option/<int:option_id>', methods=['DELETE'])
 def delete_option(option_id):
     try:
-        with DatabaseConnection() as conn:
-            # First check if this user is allowed to delete this option
-            option_row = conn.execute("""
-                SELECT o.*, s.creator_ip, s.id as survey_id 
-                FROM options o 
-                JOIN questions q ON o.question_id = q.id 
-                JOIN surveys s ON q.survey_id = s.id 
-                WHERE o.id = ?
-            """, (option_id,)).fetchone()
-            
-            if not option_row:
+        # First check if this user is allowed to delete this option
+        survey_id, error = editor_owner('option', option_id)
+        if error:
+            return error
+        
+        with DatabaseConnection(write=True) as conn:
+            deleted = conn.execute('DELETE FROM options WHERE id = ?', (option_id,)).rowcount
+            ownership.forget('option', option_id)
+            if not deleted:
                 return jsonify({'error': 'Option not found'}), 404
-                
-            # Convert to dictionary
-            option = dict(option_row)
-            
-            if str(option.get('creator_ip', '')) != str(request.remote_addr):
-                return jsonify({'error': 'Unauthorized'}), 403
-            
-            conn.execute('DELETE FROM options WHERE id = ?', (option_id,))
             
             # Clear cache
-            clear_survey_cache(option['survey_id'])
+            clear_survey_cache(survey_id)
         
         return jsonify({'success': True})
     
@@ -1428,25 +4076,24 @@ def delete_option(option_id):
 @app.route('/api/question/<int:question_id>', methods=['DELETE'])
 def delete_question(question_id):
     try:
-        with DatabaseConnection() as conn:
-            # First check if this user is allowed to delete this question
-            question_row = conn.execute('SELECT q.*, s.creator_ip, s.id as survey_id FROM questions q JOIN surveys s ON q.survey_id = s.id WHERE q.id = ?', (question_id,)).fetchone()
-            
-            if not question_row:
-                return jsonify({'error': 'Question not found'}), 404
-                
-            # Convert to dictionary
-            question = dict(question_row)
-            
-            if str(question.get('creator_ip', '')) != str(request.remote_addr):
-                return jsonify({'error': 'Unauthorized'}), 403
-            
+        # First check if this user is allowed to delete this question
+        survey_id, error = editor_owner('question', question_id)
+        if error:
+            return error
+        
+        with DatabaseConnection(write=True) as conn:
             # Delete options first (cascade should handle this but being explicit)
+            option_ids = [row[0] for row in conn.execute('SELECT id FROM options WHERE question_id = ?', (question_id,))]
             conn.execute('DELETE FROM options WHERE question_id = ?', (question_id,))
-            conn.execute('DELETE FROM questions WHERE id = ?', (question_id,))
+            deleted = conn.execute('DELETE FROM questions WHERE id = ?', (question_id,)).rowcount
+            ownership.forget('question', question_id)
+            for option_id in option_ids:
+                ownership.forget('option', option_id)
+            if not deleted:
+                return jsonify({'error': 'Question not found'}), 404
             
             # Clear cache
-            clear_survey_cache(question['survey_id'])
+            clear_survey_cache(survey_id)
         
         return jsonify({'success': True})
     
@@ -1454,6 +4101,200 @@ def delete_question(question_id):
         app.logger.error(f"Error deleting question: {e}")
         return jsonify({'error': 'An error occurred while deleting the question'}), 500
 
+# Batch editor operations. The editor sends its changes together to
+# /api/survey/<id>/batch, which applies them in order in one transaction, with
+# one ownership check and one cache clear for the lot. Each operation function
+# takes (conn, survey_id, operation, state) and returns the operation's result;
+# state tracks the ids created and deleted earlier in the batch. A ValueError
+# rejects the whole batch, unless the operation is marked "optional": true, in
+# which case only that operation is undone and its result is {"skipped": error}.
+EDITOR_BATCH_MAX_OPERATIONS = 200
+
+def _batch_object(kind, survey_id, object_id, state):
+    """object_id of a question or option of survey_id as an int; raises ValueError"""
+    object_id = _as_id(object_id)
+    if object_id and (kind, object_id) not in state['deleted']:
+        # Ids created in this batch aren't cached: they'd be reused if it rolled back
+        if object_id in state[kind]:
+            return object_id
+        owner = ownership.resolve(kind, object_id)
+        if owner and owner[0] == survey_id:
+            return object_id
+    raise ValueError(f"{kind.capitalize()} {object_id} not found in this survey")
+
+def _batch_check_question(question_text, question_type):
+    if not isinstance(question_text, str):
+        raise ValueError('Question text must be a string')
+    errors = validate_question_data(question_text, question_type)
+    if errors:
+        raise ValueError(next(iter(errors.values())))
+
+def _batch_check_option_text(option_text):
+    if not isinstance(option_text, str):
+        raise ValueError('Option text must be a string')
+    errors = validate_option_data(option_text)
+    if errors:
+        raise ValueError(next(iter(errors.values())))
+
+def _batch_insert_option(conn, question_id, option_text, state):
+    _batch_check_option_text(option_text)
+    position = conn.execute(
+        'SELECT COALESCE(MAX(position), 0) + 1 FROM options WHERE question_id = ?', (question_id,)
+    ).fetchone()[0]
+    option_id = conn.execute(
+        'INSERT INTO options (question_id, option_text, position) VALUES (?, ?, ?)',
+        (question_id, option_text, position)
+    ).lastrowid
+    state['option'].add(option_id)
+    return option_id
+
+def _batch_create_question(conn, survey_id, operation, state):
+    question_text = operation.get('question_text')
+    question_type = operation.get('question_type', 'multiple-choice')
+    _batch_check_question(question_text, question_type)
+    options = operation.get('options', [])
+    if not isinstance(options, list):
+        raise ValueError('options must be a list of option texts')
+    
+    position = conn.execute(
+        'SELECT COALESCE(MAX(position), 0) + 1 FROM questions WHERE survey_id = ?', (survey_id,)
+    ).fetchone()[0]
+    question_id = conn.execute(
+        'INSERT INTO questions (survey_id, question_text, question_type, position, required) VALUES (?, ?, ?, ?, ?)',
+        (survey_id, question_text, question_type, position, 1 if operation.get('required') else 0)
+    ).lastrowid
+    state['question'].add(question_id)
+    
+    option_ids = [_batch_insert_option(conn, question_id, option_text, state)
+                  for option_text in options]
+    return {'id': question_id, 'option_ids': option_ids}
+
+def _batch_update_question(conn, survey_id, operation, state):
+    question_id = _batch_object('question', survey_id, operation.get('id'), state)
+    # Only the fields given are changed, and validated
+    _batch_check_question(operation.get('question_text', 'Unchanged'), operation.get('question_type', 'text'))
+    
+    fields = {name: operation[name] for name in ('question_text', 'question_type') if name in operation}
+    if 'required' in operation:
+        fields['required'] = 1 if operation['required'] else 0
+    if fields:
+        assignments = ', '.join(f"{name} = ?" for name in fields)
+        updated = conn.execute(f"UPDATE questions SET {assignments} WHERE id = ?", (*fields.values(), question_id)).rowcount
+        if not updated:
+            raise ValueError(f"Question {question_id} not found in this survey")
+    return {}
+
+def _batch_delete_question(conn, survey_id, operation, state):
+    question_id = _batch_object('question', survey_id, operation.get('id'), state)
+    option_ids = [row[0] for row in conn.execute('SELECT id FROM options WHERE question_id = ?', (question_id,))]
+    conn.execute('DELETE FROM options WHERE question_id = ?', (question_id,))
+    if not conn.execute('DELETE FROM questions WHERE id = ?', (question_id,)).rowcount:
+        raise ValueError(f"Question {question_id} not found in this survey")
+    state['deleted'].add(('question', question_id))
+    state['deleted'].update(('option', option_id) for option_id in option_ids)
+    return {}
+
+def _batch_create_option(conn, survey_id, operation, state):
+    question_id = _batch_object('question', survey_id, operation.get('question_id'), state)
+    return {'id': _batch_insert_option(conn, question_id, operation.get('option_text'), state)}
+
+def _batch_update_option(conn, survey_id, operation, state):
+    option_id = _batch_object('option', survey_id, operation.get('id'), state)
+    _batch_check_option_text(operation.get('option_text'))
+    updated = conn.execute(
+        'UPDATE options SET option_text = ? WHERE id = ?', (operation['option_text'], option_id)
+    ).rowcount
+    if not updated:
+        raise ValueError(f"Option {option_id} not found in this survey")
+    return {}
+
+def _batch_delete_option(conn, survey_id, operation, state):
+    option_id = _batch_object('option', survey_id, operation.get('id'), state)
+    if not conn.execute('DELETE FROM options WHERE id = ?', (option_id,)).rowcount:
+        raise ValueError(f"Option {option_id} not found in this survey")
+    state['deleted'].add(('option', option_id))
+    return {}
+
+def _batch_reorder(conn, table, parent_column, parent_id, ids):
+    """Number the rows under parent_id 1, 2, ... in the order of ids, which must list each exactly once"""
+    ids = [_as_id(object_id) for object_id in ids] if isinstance(ids, list) else None
+    current = [row[0] for row in conn.execute(f"SELECT id FROM {table} WHERE {parent_column} = ?", (parent_id,))]
+    if ids is None or len(ids) != len(current) or set(ids) != set(current):
+        raise ValueError(f"ids must list every one of the {len(current)} {table} exactly once")
+    conn.executemany(f"UPDATE {table} SET position = ? WHERE id = ?", list(enumerate(ids, 1)))
+    return {}
+
+def _batch_reorder_questions(conn, survey_id, operation, state):
+    return _batch_reorder(conn, 'questions', 'survey_id', survey_id, operation.get('ids'))
+
+def _batch_reorder_options(conn, survey_id, operation, state):
+    question_id = _batch_object('question', survey_id, operation.get('question_id'), state)
+    return _batch_reorder(conn, 'options', 'question_id', question_id, operation.get('ids'))
+
+def _batch_apply_optional(apply, conn, survey_id, operation, state):
+    """Apply an optional operation, undoing just it (and its ids in state) if it's invalid"""
+    saved = {key: set(ids) for key, ids in state.items()}
+    conn.execute('SAVEPOINT editor_operation')
+    try:
+        result = apply(conn, survey_id, operation, state)
+    except ValueError as e:
+        conn.execute('ROLLBACK TO editor_operation')
+        state.update(saved)
+        result = {'skipped': str(e)}
+    conn.execute('RELEASE editor_operation')
+    return result
+
+EDITOR_OPERATIONS = {
+    'create_question': _batch_create_question,
+    'update_question': _batch_update_question,
+    'delete_question': _batch_delete_question,
+    'create_option': _batch_create_option,
+    'update_option': _batch_update_option,
+    'delete_option': _batch_delete_option,
+    'reorder_questions': _batch_reorder_questions,
+    'reorder_options': _batch_reorder_options
+}
+
+@app.route('/api/survey/<int:survey_id>/batch', methods=['POST'])
+@creator_only
+def apply_editor_batch(survey_id):
+    """Apply an ordered list of editor operations atomically: all of them or none"""
+    if rate_limit('editor_batch', limit=60, period=60):
+        return jsonify({'error': 'Too many requests. Please try again later.'}), 429
+    
+    data = request.get_json(silent=True) or {}
+    operations = data.get('operations')
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': 'No operations provided'}), 400
+    if len(operations) > EDITOR_BATCH_MAX_OPERATIONS:
+        return jsonify({'error': f"At most {EDITOR_BATCH_MAX_OPERATIONS} operations per batch"}), 400
+    
+    state = {'question': set(), 'option': set(), 'deleted': set()}
+    results = []
+    index = None
+    try:
+        with DatabaseConnection(write=True) as conn:
+            for index, operation in enumerate(operations):
+                apply = EDITOR_OPERATIONS.get(operation.get('op')) if isinstance(operation, dict) else None
+                if apply is None:
+                    raise ValueError(f"Unknown operation; expected one of: {', '.join(EDITOR_OPERATIONS)}")
+                if operation.get('optional'):
+                    results.append(_batch_apply_optional(apply, conn, survey_id, operation, state))
+                else:
+                    results.append(apply(conn, survey_id, operation, state))
+    except ValueError as e:
+        # Rolled back, so none of the batch was applied
+        return jsonify({'error': str(e), 'operation': index}), 400
+    except Exception as e:
+        app.logger.error(f"Error applying editor batch to survey {survey_id}: {e}")
+        return jsonify({'error': 'An error occurred while saving your changes'}), 500
+    
+    for kind, object_id in state['deleted']:
+        ownership.forget(kind, object_id)
+    clear_survey_cache(survey_id)
+    
+    return jsonify({'success': True, 'results': results})
+
 @app.route('/api/generate-questions', methods=['POST'])
 def generate_questions():
     # Rate limiting for API usage
@@ -1508,6 +4349,84 @@ def generate_questions():
         app.logger.error(f"Error generating questions: {e}")
         return jsonify({'error': 'An error occurred while generating questions'}), 500
 
+@app.route('/api/survey/<int:survey_id>/search', methods=['GET'])
+@creator_only
+def search_survey_answers(survey_id):
+    """Ranked full-text search over the survey's text answers"""
+    text = request.args.get('q', '').strip()
+    question_id = request.args.get('question_id', type=int)
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+    if not text:
+        return jsonify({'error': 'A search query (q) is required'}), 400
+    
+    with DatabaseConnection() as conn:
+        if not search_index_available(conn):
+            return jsonify({'error': 'Full-text search is not available on this server'}), 501
+        results = search_answers(conn, survey_id, text, question_id=question_id, limit=limit)
+    
+    return jsonify({'query': text, 'results': results})
+
+@app.route('/api/survey/<int:survey_id>/question/<int:question_id>/terms', methods=['GET'])
+@creator_only
+def question_terms(survey_id, question_id):
+    """Top terms and bigrams of a text question's answers"""
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+    with DatabaseConnection() as conn:
+        question = conn.execute(
+            'SELECT id FROM questions WHERE id = ? AND survey_id = ?', (question_id, survey_id)
+        ).fetchone()
+        if not question:
+            return jsonify({'error': 'Question not found'}), 404
+        terms = get_top_terms(conn, question_id, ngram=1, limit=limit)
+        bigrams = get_top_terms(conn, question_id, ngram=2, limit=limit)
+    
+    return jsonify({
+        'terms': [{'term': row['term'], 'count': row['answer_count']} for row in terms],
+        'bigrams': [{'term': row['term'], 'count': row['answer_count']} for row in bigrams]
+    })
+
+@app.route('/api/survey/<int:survey_id>/import', methods=['POST'])
+@creator_only
+def import_responses(survey_id):
+    """Bulk-load responses from NDJSON or CSV (format from ?format= or the Content-Type)"""
+    import_format = request.args.get('format') or IMPORT_MIMETYPES.get(request.mimetype)
+    if import_format not in ('ndjson', 'csv'):
+        return jsonify({'error': 'Upload NDJSON (application/x-ndjson) or CSV (text/csv)'}), 400
+    
+    survey = get_cached_survey(survey_id)
+    if not survey:
+        return jsonify({'error': 'Survey not found'}), 404
+    
+    importer = ResponseImport(survey, request.remote_addr, app.config['IMPORT_BATCH_SIZE'])
+    # Read as it arrives; only the current batch is held in memory
+    lines = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='' if import_format == 'csv' else None)
+    try:
+        if import_format == 'csv':
+            importer.read_csv(lines)
+        else:
+            importer.read_ndjson(lines)
+    except RequestEntityTooLarge:
+        # Only raised mid-stream for uploads without a Content-Length; earlier batches are stored
+        return jsonify({'error': import_too_large_message(), **importer.summary()}), 413
+    except UnicodeDecodeError:
+        return jsonify({'error': 'The file must be UTF-8 encoded', **importer.summary()}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e), **importer.summary()}), 400
+    except LookupError:
+        return jsonify({'error': 'Survey not found', **importer.summary()}), 404
+    except sqlite3.Error as e:
+        app.logger.error(f"Error importing responses into survey {survey_id}: {e}", exc_info=True)
+        return jsonify({'error': 'An error occurred while storing the responses', **importer.summary()}), 500
+    
+    app.logger.info(f"Imported {importer.imported} responses into survey {survey_id} "
+                    f"({importer.duplicates} duplicates, {importer.failed} rejected)")
+    return jsonify({'success': True, **importer.summary()})
+
+def import_too_large_message():
+    limit_mb = app.config['IMPORT_MAX_CONTENT_LENGTH'] // (1024 * 1024)
+    return (f"Import files are limited to {limit_mb}MB (IMPORT_MAX_CONTENT_LENGTH). Split the file and "
+            "import the parts; responses with submission keys (every exported row has one) can safely be imported again.")
+
 @app.route('/api/survey/<int:survey_id>/submit', methods=['POST'])
 def submit_survey(survey_id):
     # Rate limiting for submissions to prevent spamming
@@ -1534,108 +4453,65 @@ def submit_survey(survey_id):
         if not answers:
             return jsonify({'error': 'No answers provided'}), 400
         
-        with DatabaseConnection() as conn:
-            # Check if survey exists and is not expired
-            survey_row = conn.execute('SELECT * FROM surveys WHERE id = ?', (survey_id,)).fetchone()
-            
-            if not survey_row:
-                app.logger.warning(f"Survey {survey_id} not found in database")
+        # Retries of the same submission carry the same key and get the original response back
+        try:
+            submission_key = get_submission_key(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Checked against the cached survey schema, before taking the write lock
+        survey = get_cached_survey(survey_id)
+        
+        if not survey:
+            app.logger.warning(f"Survey {survey_id} not found in database")
+            return jsonify({'error': 'Survey not found'}), 404
+        
+        # Check expiry date
+        if 'expiry_date' in survey and survey['expiry_date']:
+            try:
+                expiry_date = datetime.datetime.strptime(survey['expiry_date'], '%Y-%m-%d').date()
+                today = datetime.date.today()
+                if today > expiry_date:
+                    app.logger.info(f"Survey {survey_id} is expired")
+                    return jsonify({'error': 'This survey has expired'}), 400
+            except (ValueError, TypeError):
+                # If date parsing fails, continue (invalid date format)
+                app.logger.warning(f"Invalid expiry date format for survey {survey_id}")
+                pass
+        
+        # FIXED: Improved publishing check with better logging
+        published = survey.get('published', 0)
+        creator_ip = survey.get('creator_ip', '')
+        
+        if published == 0:
+            app.logger.info(f"Checking if unpublished survey {survey_id} can be accessed: creator IP: {creator_ip}, request IP: {request.remote_addr}")
+            if str(creator_ip) != str(request.remote_addr):
+                app.logger.warning(f"Attempt to submit to unpublished survey {survey_id} by non-creator")
+                return jsonify({'error': 'This survey is not published yet'}), 400
+        
+        rows = validate_answers(survey, answers)
+        
+        if get_submit_mode() == 'group':
+            return submit_to_queue(survey, answers, rows, submission_key)
+        
+        with DatabaseConnection(write=True) as conn:
+            # Edited since it was cached? Then validate against the schema as of this transaction
+            current = conn.execute('SELECT version FROM surveys WHERE id = ?', (survey_id,)).fetchone()
+            if not current:
                 return jsonify({'error': 'Survey not found'}), 404
             
-            # Convert SQLite row to dictionary for easier access
-            survey = dict(survey_row)
-            
-            # Check expiry date
-            if 'expiry_date' in survey and survey['expiry_date']:
-                try:
-                    expiry_date = datetime.datetime.strptime(survey['expiry_date'], '%Y-%m-%d').date()
-                    today = datetime.date.today()
-                    if today > expiry_date:
-                        app.logger.info(f"Survey {survey_id} is expired")
-                        return jsonify({'error': 'This survey has expired'}), 400
-                except (ValueError, TypeError):
-                    # If date parsing fails, continue (invalid date format)
-                    app.logger.warning(f"Invalid expiry date format for survey {survey_id}")
-                    pass
-            
-            # FIXED: Improved publishing check with better logging
-            published = survey.get('published', 0)
-            creator_ip = survey.get('creator_ip', '')
-            
-            if published == 0:
-                app.logger.info(f"Checking if unpublished survey {survey_id} can be accessed: creator IP: {creator_ip}, request IP: {request.remote_addr}")
-                if str(creator_ip) != str(request.remote_addr):
-                    app.logger.warning(f"Attempt to submit to unpublished survey {survey_id} by non-creator")
-                    return jsonify({'error': 'This survey is not published yet'}), 400
-            
-            # Create a new response
-            cursor = conn.execute(
-                'INSERT INTO responses (survey_id, respondent_ip) VALUES (?, ?)',
-                (survey_id, request.remote_addr)
-            )
-            response_id = cursor.lastrowid
-            app.logger.info(f"Created response ID {response_id} for survey {survey_id}")
-            
-            # Add answers
-            answers_added = 0
-            for answer in answers:
-                question_id = answer.get('question_id')
-                if not question_id:
-                    app.logger.warning(f"Missing question_id in answer for response {response_id}")
-                    continue
-                    
-                question_row = conn.execute('SELECT question_type, required FROM questions WHERE id = ?', (question_id,)).fetchone()
-                
-                if not question_row:
-                    app.logger.warning(f"Question {question_id} not found for response {response_id}")
-                    continue
-                
-                # Convert to dictionary
-                question = dict(question_row)
-                question_type = question.get('question_type')
-                
-                if question_type == 'multiple-choice' or question_type == 'image-choice':
-                    option_id = answer.get('option_id')
-                    if question_id and option_id:
-                        # Verify option belongs to question
-                        option = conn.execute('SELECT id FROM options WHERE id = ? AND question_id = ?', 
-                                             (option_id, question_id)).fetchone()
-                        if option:
-                            conn.execute(
-                                'INSERT INTO answers (response_id, question_id, option_id) VALUES (?, ?, ?)',
-                                (response_id, question_id, option_id)
-                            )
-                            answers_added += 1
-                        else:
-                            app.logger.warning(f"Option {option_id} does not belong to question {question_id}")
-                elif question_type == 'text':
-                    text_answer = answer.get('text_answer', '')
-                    if text_answer or not question.get('required'):
-                        conn.execute(
-                            'INSERT INTO answers (response_id, question_id, text_answer) VALUES (?, ?, ?)',
-                            (response_id, question_id, text_answer)
-                        )
-                        answers_added += 1
-                elif question_type in ['rating', 'slider']:
-                    number_answer = answer.get('number_answer')
-                    if number_answer is not None:
-                        try:
-                            numeric_value = float(number_answer)
-                            conn.execute(
-                                'INSERT INTO answers (response_id, question_id, number_answer) VALUES (?, ?, ?)',
-                                (response_id, question_id, numeric_value)
-                            )
-                            answers_added += 1
-                        except (ValueError, TypeError):
-                            app.logger.warning(f"Invalid numeric value for question {question_id}: {number_answer}")
+            duplicate = find_submission(conn, survey_id, submission_key)
+            if duplicate:
+                return submission_reply(duplicate, len(rows), created=False)
             
-            app.logger.info(f"Added {answers_added} answers for response {response_id}")
+            if current['version'] != survey['version']:
+                rows = validate_answers(load_survey_tree(conn, survey_id), answers)
             
-            return jsonify({
-                'success': True,
-                'response_id': response_id,
-                'answers_recorded': answers_added
-            })
+            response_id = insert_submission(conn, survey_id, request.remote_addr, rows, submission_key)
+        
+        app.logger.info(f"Added {len(rows)} answers for response {response_id}")
+        
+        return submission_reply(response_id, len(rows))
         
     except Exception as e:
         app.logger.error(f"Error submitting survey {survey_id}: {e}", exc_info=True)
@@ -1654,6 +4530,15 @@ def forbidden(e):
 def bad_request(e):
     return render_template('400.html', error=str(e)), 400
 
+@app.errorhandler(413)
+def request_too_large(e):
+    if request.endpoint == 'import_responses':
+        return jsonify({'error': import_too_large_message()}), 413
+    limit_mb = app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)
+    if request.path.startswith('/api/'):
+        return jsonify({'error': f"Uploads are limited to {limit_mb}MB"}), 413
+    return render_template('400.html', error=f"Uploads are limited to {limit_mb}MB"), 413
+
 @app.errorhandler(500)
 def server_error(e):
     app.logger.error(f"Server error: {e}")
@@ -1667,7 +4552,21 @@ def too_many_requests(e):
 @app.route('/health')
 def health_check():
     """Basic health check endpoint for monitoring"""
-    return jsonify({'status': 'ok', 'version': '1.0.0'})
+    return jsonify({
+        'status': 'ok',
+        'version': '1.0.0',
+        'db_pool': get_pool().stats(),
+        'survey_cache': survey_cache.stats(),
+        'ownership_cache': ownership.stats(),
+        'chart_renderer': chart_renderer.stats(),
+        'export_jobs': export_jobs.stats(),
+        'submission_queue': submission_queue.stats(),
+        'rate_limiter': rate_limiter.stats()
+    })
+
+# Initialize database (not in chart render processes, which import this module as __mp_main__)
+if __name__ != '__mp_main__':
+    init_db()
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
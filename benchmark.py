@@ -0,0 +1,506 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+Performance benchmarks for the survey app.
+
+Each benchmark runs against a throwaway database in a temporary directory,
+never against survey.db. Usage:
+
+    python benchmark.py storage [--seconds 5] [--writers 4] [--readers 4]
+    python benchmark.py charts [--questions 40] [--repeat 3]
+    python benchmark.py export [--responses 100000] [--questions 10]
+    python benchmark.py submit [--questions 50] [--submissions 2000] [--threads 16]
+    python benchmark.py ratelimit [--checks 20000]
+"""
+
+import os
+import sys
+import time
+import argparse
+import random
+import subprocess
+import tempfile
+import threading
+import tracemalloc
+import multiprocessing
+
+# Point the app at a scratch database before it is imported
+_workdir = tempfile.mkdtemp(prefix='survey-bench-')
+os.environ['DATABASE'] = os.path.join(_workdir, 'bootstrap.db')
+os.environ.setdefault('FLASK_ENV', 'production')
+
+import app as survey_app  # noqa: E402
+
+app = survey_app.app
+app.logger.setLevel('ERROR')
+
+
+def use_database(name, **config):
+    """Switch the app to a fresh database file with the given config overrides"""
+    app.config.update(config)
+    app.config['DATABASE'] = os.path.join(_workdir, name)
+    survey_app.init_db()
+    return app.config['DATABASE']
+
+
+def first_question(survey_id):
+    with survey_app.DatabaseConnection() as conn:
+        return conn.execute(
+            'SELECT id FROM questions WHERE survey_id = ? ORDER BY position LIMIT 1', (survey_id,)
+        ).fetchone()['id']
+
+
+# Storage profile benchmark: concurrent submission writers vs. responses readers
+
+def _storage_writer(db_path, profile, question_id, deadline, results):
+    app.config.update(DATABASE=db_path, DB_STORAGE_PROFILE=profile)
+    done = errors = 0
+    latencies = []
+    while time.time() < deadline:
+        started = time.perf_counter()
+        try:
+            with survey_app.DatabaseConnection(write=True) as conn:
+                response_id = conn.execute(
+                    'INSERT INTO responses (survey_id, respondent_ip) VALUES (?, ?)', (1, 'bench')
+                ).lastrowid
+                conn.execute(
+                    'INSERT INTO answers (response_id, question_id, number_answer) VALUES (?, ?, ?)',
+                    (response_id, question_id, done % 5 + 1)
+                )
+            done += 1
+            latencies.append(time.perf_counter() - started)
+        except Exception:
+            errors += 1
+    results.put(('writer', done, errors, latencies))
+
+
+def _storage_reader(db_path, profile, deadline, results):
+    app.config.update(DATABASE=db_path, DB_STORAGE_PROFILE=profile)
+    done = errors = 0
+    latencies = []
+    while time.time() < deadline:
+        started = time.perf_counter()
+        try:
+            with survey_app.DatabaseConnection() as conn:
+                conn.execute('SELECT COUNT(*) FROM responses WHERE survey_id = ?', (1,)).fetchone()
+                conn.execute('SELECT AVG(number_answer) FROM answers').fetchone()
+            done += 1
+            latencies.append(time.perf_counter() - started)
+        except Exception:
+            errors += 1
+    results.put(('reader', done, errors, latencies))
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def bench_storage(args):
+    """Throughput and lock errors for each storage profile under mixed load"""
+    ctx = multiprocessing.get_context('fork')
+    print(f"{args.writers} writer / {args.readers} reader processes, {args.seconds}s per profile")
+    print(f"{'profile':<12}{'writes/s':>10}{'reads/s':>10}{'errors':>8}{'w p99 ms':>10}{'r p99 ms':>10}")
+    for profile in ('legacy', 'concurrent'):
+        # Keep the busy timeout short so contention shows up as errors, not just latency
+        db_path = use_database(f'storage-{profile}.db', DB_STORAGE_PROFILE=profile,
+                               DB_BUSY_TIMEOUT=0.1, DB_BUSY_RETRIES=args.retries)
+        question_id = first_question(1)
+        survey_app.get_pool(db_path).close_all()
+
+        results = ctx.Queue()
+        deadline = time.time() + args.seconds
+        procs = [ctx.Process(target=_storage_writer, args=(db_path, profile, question_id, deadline, results))
+                 for _ in range(args.writers)]
+        procs += [ctx.Process(target=_storage_reader, args=(db_path, profile, deadline, results))
+                  for _ in range(args.readers)]
+        for proc in procs:
+            proc.start()
+        totals = {'writer': [0, 0, []], 'reader': [0, 0, []]}
+        for _ in procs:
+            kind, done, errors, latencies = results.get()
+            totals[kind][0] += done
+            totals[kind][1] += errors
+            totals[kind][2].extend(latencies)
+        for proc in procs:
+            proc.join()
+
+        writes, write_errors, write_lat = totals['writer']
+        reads, read_errors, read_lat = totals['reader']
+        print(f"{profile:<12}{writes / args.seconds:>10.0f}{reads / args.seconds:>10.0f}"
+              f"{write_errors + read_errors:>8}{_percentile(write_lat, 0.99) * 1000:>10.1f}"
+              f"{_percentile(read_lat, 0.99) * 1000:>10.1f}")
+
+
+# Chart backend benchmark: render time and page weight per backend
+
+def _chart_specs(count):
+    rng = random.Random(42)
+    specs = []
+    for i in range(count):
+        if i % 2:
+            labels = [f"Option {n}" for n in range(1, rng.randint(3, 8))]
+            specs.append({'kind': 'bar', 'title': f"Question {i}", 'labels': labels,
+                          'counts': [rng.randint(0, 500) for _ in labels]})
+        else:
+            values = list(range(0, 11))
+            specs.append({'kind': 'histogram', 'title': f"Question {i}", 'values': values,
+                          'weights': [rng.randint(0, 500) for _ in values]})
+    return specs
+
+
+def bench_charts(args):
+    """Render every question's chart with each backend and compare cost and size"""
+    import chart_render
+
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'import matplotlib.figure'], check=True)
+    matplotlib_import = time.perf_counter() - started
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'import chart_render'], check=True,
+                   cwd=os.path.dirname(os.path.abspath(chart_render.__file__)))
+    chart_render_import = time.perf_counter() - started
+    print(f"process start + import: matplotlib {matplotlib_import * 1000:.0f} ms, "
+          f"chart_render {chart_render_import * 1000:.0f} ms")
+
+    specs = _chart_specs(args.questions)
+    print(f"{args.questions} charts per page, best of {args.repeat}")
+    print(f"{'backend':<12}{'ms/chart':>10}{'bytes/chart':>13}{'page KB':>10}")
+    for backend in ('matplotlib', 'svg', 'json'):
+        best = None
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            sizes = [len(chart_render.render_chart(spec, backend)[0]) for spec in specs]
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        page = sum(sizes)
+        print(f"{backend:<12}{best / len(specs) * 1000:>10.2f}{page / len(specs):>13.0f}{page / 1024:>10.1f}")
+    # What view_responses used to inline: every PNG base64-encoded into the HTML
+    inline = sum((size + 2) // 3 * 4 for size in
+                 (len(chart_render.render_chart(spec, 'matplotlib')[0]) for spec in specs))
+    print(f"{'inline b64':<12}{'':>10}{inline / len(specs):>13.0f}{inline / 1024:>10.1f}")
+
+
+# CSV export benchmark: streamed pivot query vs. the old per-cell queries
+
+def _seed_responses(responses, questions):
+    """A survey with alternating multiple-choice/rating questions and the given number of responses"""
+    rng = random.Random(42)
+    with survey_app.DatabaseConnection(write=True) as conn:
+        survey_id = conn.execute('INSERT INTO surveys (title, creator_ip) VALUES (?, ?)',
+                                 ('Export benchmark', 'bench')).lastrowid
+        question_ids, option_ids = [], {}
+        for position in range(1, questions + 1):
+            question_type = 'multiple-choice' if position % 2 else 'rating'
+            question_id = conn.execute(
+                'INSERT INTO questions (survey_id, question_text, question_type, position) VALUES (?, ?, ?, ?)',
+                (survey_id, f"Question {position}", question_type, position)
+            ).lastrowid
+            question_ids.append(question_id)
+            if question_type == 'multiple-choice':
+                option_ids[question_id] = [
+                    conn.execute('INSERT INTO options (question_id, option_text, position) VALUES (?, ?, ?)',
+                                 (question_id, f"Option {n}", n)).lastrowid
+                    for n in range(1, 5)
+                ]
+
+        for start in range(0, responses, 5000):
+            for _ in range(start, min(start + 5000, responses)):
+                response_id = conn.execute(
+                    'INSERT INTO responses (survey_id, respondent_ip) VALUES (?, ?)', (survey_id, 'bench')
+                ).lastrowid
+                conn.executemany(
+                    'INSERT INTO answers (response_id, question_id, option_id, number_answer) VALUES (?, ?, ?, ?)',
+                    [(response_id, question_id,
+                      rng.choice(option_ids[question_id]) if question_id in option_ids else None,
+                      None if question_id in option_ids else rng.randint(1, 5))
+                     for question_id in question_ids]
+                )
+    survey_app.rebuild_answer_aggregates(survey_id)
+    return survey_id
+
+
+def _legacy_export(survey_id, limit):
+    """The pre-streaming export: the whole CSV in memory, one query per cell"""
+    import csv
+    import io
+    queries = 0
+    with survey_app.DatabaseConnection() as conn:
+        questions = conn.execute('SELECT * FROM questions WHERE survey_id = ? ORDER BY position',
+                                 (survey_id,)).fetchall()
+        responses = conn.execute('SELECT * FROM responses WHERE survey_id = ? ORDER BY created_at LIMIT ?',
+                                 (survey_id, limit)).fetchall()
+        queries += 2
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(['Response ID', 'Submission Time', 'IP Address'] +
+                        [f"Q{q['position']}: {q['question_text']}" for q in questions])
+        for response in responses:
+            row = [response['id'], response['created_at'], response['respondent_ip']]
+            for question in questions:
+                if question['question_type'] == 'multiple-choice':
+                    answer = conn.execute(
+                        'SELECT o.option_text FROM answers a JOIN options o ON a.option_id = o.id '
+                        'WHERE a.response_id = ? AND a.question_id = ?', (response['id'], question['id'])
+                    ).fetchone()
+                    row.append(answer['option_text'] if answer else 'No answer')
+                else:
+                    answer = conn.execute(
+                        'SELECT text_answer, number_answer FROM answers WHERE response_id = ? AND question_id = ?',
+                        (response['id'], question['id'])
+                    ).fetchone()
+                    if answer and answer['text_answer']:
+                        row.append(answer['text_answer'])
+                    elif answer and answer['number_answer'] is not None:
+                        row.append(str(answer['number_answer']))
+                    else:
+                        row.append('No answer')
+                queries += 1
+            writer.writerow(row)
+        return output.getvalue().encode('utf-8'), queries
+
+
+def _streamed_export(survey_id, export_format='csv'):
+    generate = survey_app.EXPORT_FORMATS[export_format][0]
+    with survey_app.DatabaseConnection() as conn:
+        questions = [dict(q) for q in conn.execute(
+            'SELECT * FROM questions WHERE survey_id = ? ORDER BY position', (survey_id,))]
+    size = chunks = 0
+    for chunk in generate(survey_id, questions):
+        size += len(chunk if isinstance(chunk, bytes) else chunk.encode('utf-8'))
+        chunks += 1
+    return size, chunks
+
+
+def _measure(fn, *args):
+    """Run fn twice: once for wall time, once under tracemalloc (which slows it) for peak memory"""
+    started = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def bench_export(args):
+    """Time and peak memory of the CSV export at a large response count"""
+    use_database('export.db')
+    started = time.perf_counter()
+    survey_id = _seed_responses(args.responses, args.questions)
+    print(f"seeded {args.responses} responses x {args.questions} questions "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    legacy = min(args.legacy_responses, args.responses)
+    (data, queries), elapsed, peak = _measure(_legacy_export, survey_id, legacy)
+    scale = args.responses / legacy
+    print(f"{'export':<28}{'queries':>10}{'seconds':>10}{'peak MB':>10}{'file MB':>10}")
+    print(f"{f'per-cell ({legacy} responses)':<28}{queries:>10}{elapsed:>10.2f}"
+          f"{peak / 2 ** 20:>10.1f}{len(data) / 2 ** 20:>10.1f}")
+    print(f"{'per-cell (extrapolated)':<28}{int(queries * scale):>10}{elapsed * scale:>10.2f}"
+          f"{peak * scale / 2 ** 20:>10.1f}{len(data) * scale / 2 ** 20:>10.1f}")
+    for export_format in survey_app.EXPORT_FORMATS:
+        (size, chunks), elapsed, peak = _measure(_streamed_export, survey_id, export_format)
+        label = f"{export_format} ({chunks} chunks)"
+        print(f"{label:<28}{2:>10}{elapsed:>10.2f}{peak / 2 ** 20:>10.1f}{size / 2 ** 20:>10.1f}")
+
+
+# Submission benchmark: per-answer validation queries vs. one cached schema and executemany
+
+class _CountingConnection:
+    """Wraps a connection, counting the statements sent through execute/executemany"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.statements = 0
+
+    def execute(self, *args):
+        self.statements += 1
+        return self.conn.execute(*args)
+
+    def executemany(self, *args):
+        self.statements += 1
+        return self.conn.executemany(*args)
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+
+def _legacy_submit(conn, survey_id, answers):
+    """The pre-batching submit: each answer validated with its own queries and inserted alone"""
+    conn.execute('SELECT * FROM surveys WHERE id = ?', (survey_id,)).fetchone()
+    response_id = conn.execute('INSERT INTO responses (survey_id, respondent_ip) VALUES (?, ?)',
+                               (survey_id, 'bench')).lastrowid
+    recorded = []
+    for answer in answers:
+        question_id = answer['question_id']
+        question = conn.execute('SELECT question_type, required FROM questions WHERE id = ?',
+                                (question_id,)).fetchone()
+        if question['question_type'] == 'multiple-choice':
+            if conn.execute('SELECT id FROM options WHERE id = ? AND question_id = ?',
+                            (answer['option_id'], question_id)).fetchone():
+                conn.execute('INSERT INTO answers (response_id, question_id, option_id) VALUES (?, ?, ?)',
+                             (response_id, question_id, answer['option_id']))
+                recorded.append((question_id, answer['option_id'], None, None))
+        else:
+            value = float(answer['number_answer'])
+            conn.execute('INSERT INTO answers (response_id, question_id, number_answer) VALUES (?, ?, ?)',
+                         (response_id, question_id, value))
+            recorded.append((question_id, None, None, value))
+    survey_app.record_answer_aggregates(conn, survey_id, recorded)
+
+
+def _batched_submit(conn, survey_id, answers):
+    """What submit_survey does now: validate against the cached tree, then a constant number of writes"""
+    survey = survey_app.get_cached_survey(survey_id)
+    rows = survey_app.validate_answers(survey, answers)
+    conn.execute('SELECT version FROM surveys WHERE id = ?', (survey_id,)).fetchone()
+    survey_app.insert_submission(conn, survey_id, 'bench', rows)
+
+
+def bench_submit(args):
+    """Statements and time per submission to a survey with many questions"""
+    use_database('submit.db')
+    survey_id = _seed_responses(0, args.questions)
+    survey = survey_app.get_cached_survey(survey_id)
+    rng = random.Random(7)
+    answers = []
+    for question in survey['questions']:
+        if question['options']:
+            answers.append({'question_id': question['id'], 'option_id': rng.choice(question['options'])['id']})
+        else:
+            answers.append({'question_id': question['id'], 'number_answer': rng.randint(1, 5)})
+
+    print(f"{args.submissions} submissions x {args.questions} answers")
+    print(f"{'submit':<12}{'statements':>12}{'ms/submit':>12}")
+    for label, submit, extra in (('per-answer', _legacy_submit, 0),
+                                 # get_cached_survey's version check runs on its own read connection
+                                 ('batched', _batched_submit, 1)):
+        statements = 0
+        started = time.perf_counter()
+        for _ in range(args.submissions):
+            with survey_app.DatabaseConnection(write=True) as conn:
+                counted = _CountingConnection(conn)
+                submit(counted, survey_id, answers)
+            statements += counted.statements + extra
+        elapsed = time.perf_counter() - started
+        print(f"{label:<12}{statements / args.submissions:>12.0f}{elapsed * 1000 / args.submissions:>12.2f}")
+
+    # Concurrent submitters: a commit each vs. group commit on the writer thread
+    survey = survey_app.get_cached_survey(survey_id)
+    rows = survey_app.validate_answers(survey, answers)
+    per_thread = args.submissions // args.threads
+
+    def direct():
+        for _ in range(per_thread):
+            with survey_app.DatabaseConnection(write=True) as conn:
+                survey_app.insert_submission(conn, survey_id, 'bench', rows)
+
+    def grouped(limiter=None):
+        for n in range(per_thread):
+            # Each submitter its own client, with an allowance the run never exhausts
+            if limiter:
+                limiter.check('submit_survey', f"10.0.{threading.get_ident() % 250}.{n % 250}", 10 ** 6, 60)
+            survey_app.submission_queue.submit(survey, answers, rows, 'bench').result()
+
+    # The rate limit check submit_survey makes first: a write transaction per
+    # request with sqlite buckets, none with process-local ones
+    sqlite_limiter = survey_app.RateLimiter(backend='sqlite')
+    local_limiter = survey_app.RateLimiter(backend='sqlite', local_routes=['submit_survey'])
+
+    print(f"\n{args.threads} threads x {per_thread} submissions")
+    print(f"{'commit':<24}{'submits/s':>12}{'batches':>12}{'commit ms':>12}")
+    for label, worker in (('per-submit', direct), ('group', grouped),
+                          ('group + sqlite limit', lambda: grouped(sqlite_limiter)),
+                          ('group + local limit', lambda: grouped(local_limiter))):
+        batches_before = survey_app.submission_queue.stats()['batches']
+        threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        stats = survey_app.submission_queue.stats()
+        grouping = label != 'per-submit'
+        batches = stats['batches'] - batches_before if grouping else per_thread * args.threads
+        commit_ms = f"{stats['avg_commit_ms']:.2f}" if grouping else '-'
+        print(f"{label:<24}{per_thread * args.threads / elapsed:>12.0f}{batches:>12}{commit_ms:>12}")
+
+
+# Rate limiter benchmark: session-stored timestamps vs. token buckets
+
+def _legacy_rate_limit(session, now, limit=10, period=60):
+    """The old session rate limit: a timestamp dict re-serialized and re-signed into the cookie"""
+    current = {ts: count for ts, count in session.get('submit_survey:bench', {}).items() if now - float(ts) < period}
+    current[str(now)] = current.get(str(now), 0) + 1
+    session['submit_survey:bench'] = current
+    return sum(current.values()) > limit
+
+
+def bench_ratelimit(args):
+    """Time per check and cookie size at a steady request rate"""
+    use_database('ratelimit.db')
+    serializer = app.session_interface.get_signing_serializer(app)
+    # One request a second from one client for the whole run: the old limiter
+    # keeps a minute of timestamps in the cookie, the buckets a row per client
+    session = {}
+    started = time.perf_counter()
+    for n in range(args.checks):
+        _legacy_rate_limit(session, 1e9 + n, limit=100)
+        cookie = serializer.dumps(session)
+    elapsed = time.perf_counter() - started
+    print(f"{'limiter':<16}{'us/check':>10}{'cookie bytes':>14}")
+    print(f"{'session':<16}{elapsed * 1e6 / args.checks:>10.1f}{len(cookie):>14}")
+
+    for backend in ('memory', 'sqlite'):
+        limiter = survey_app.RateLimiter(backend=backend)
+        started = time.perf_counter()
+        for n in range(args.checks):
+            limiter.check('submit_survey', f"10.0.{n % 250}.{n % 7}", 100, 60)
+        elapsed = time.perf_counter() - started
+        print(f"{backend + ' bucket':<16}{elapsed * 1e6 / args.checks:>10.1f}{0:>14}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='benchmark', required=True)
+
+    storage = sub.add_parser('storage', help='WAL vs rollback journal under concurrent reads and writes')
+    storage.add_argument('--seconds', type=float, default=5)
+    storage.add_argument('--writers', type=int, default=4)
+    storage.add_argument('--readers', type=int, default=4)
+    storage.add_argument('--retries', type=int, default=5)
+    storage.set_defaults(func=bench_storage)
+
+    charts = sub.add_parser('charts', help='matplotlib PNG vs SVG vs JSON chart backends')
+    charts.add_argument('--questions', type=int, default=40)
+    charts.add_argument('--repeat', type=int, default=3)
+    charts.set_defaults(func=bench_charts)
+
+    export = sub.add_parser('export', help='streamed export formats vs the old per-cell CSV export')
+    export.add_argument('--responses', type=int, default=100000)
+    export.add_argument('--questions', type=int, default=10)
+    export.add_argument('--legacy-responses', type=int, default=5000,
+                        help='responses to run the slow per-cell export over before extrapolating')
+    export.set_defaults(func=bench_export)
+
+    submit = sub.add_parser('submit', help='cached-schema batched submit vs per-answer validation queries')
+    submit.add_argument('--questions', type=int, default=50)
+    submit.add_argument('--submissions', type=int, default=2000)
+    submit.add_argument('--threads', type=int, default=16, help='concurrent submitters for the group commit comparison')
+    submit.set_defaults(func=bench_submit)
+
+    ratelimit = sub.add_parser('ratelimit', help='token bucket rate limiter vs session-stored timestamps')
+    ratelimit.add_argument('--checks', type=int, default=20000)
+    ratelimit.set_defaults(func=bench_ratelimit)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+Chart rendering for the survey responses page.
+
+Kept separate from app.py so the chart process pool can import it without
+loading the Flask app. Three backends are available:
+
+    svg         compact SVG built directly from the spec (no dependencies)
+    json        the spec itself, drawn client-side by survey_responses.html
+    matplotlib  PNG via matplotlib's object-oriented Figure API, never pyplot's
+                global state, so renders are safe in any thread or process
+
+matplotlib is only imported when the matplotlib backend is actually used, and
+it's the fallback for chart kinds the lightweight backends don't handle.
+
+A chart spec is a plain dict built by app.get_chart_spec:
+    {'kind': 'bar', 'title': ..., 'labels': [...], 'counts': [...], 'x_label': ... (optional)}
+    {'kind': 'histogram', 'title': ..., 'values': [...], 'weights': [...]}
+"""
+
+import io
+import json
+from xml.sax.saxutils import escape
+
+CHART_COLOR = '#1DB954'
+HISTOGRAM_BINS = 5
+
+
+def histogram_bins(values, weights, bins=HISTOGRAM_BINS):
+    """Equal-width bins over the data range, like numpy.histogram: returns (edges, counts)"""
+    low, high = min(values), max(values)
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    width = (high - low) / bins
+    edges = [low + width * i for i in range(bins)] + [high]
+    counts = [0] * bins
+    for value, weight in zip(values, weights):
+        # The last bin includes its right edge
+        index = min(int((value - low) / width), bins - 1)
+        counts[index] += weight
+    return edges, counts
+
+
+def _format_number(value):
+    return str(int(value)) if float(value).is_integer() else f"{value:.2f}".rstrip('0')
+
+
+# SVG backend
+
+SVG_WIDTH = 600
+SVG_HEIGHT = 360
+SVG_MARGIN = {'top': 40, 'right': 20, 'bottom': 90, 'left': 50}
+
+
+def _svg_frame(title, x_label, y_label, max_count, body):
+    """Wrap plotted bars in an SVG document with title, axes and y gridlines"""
+    plot_width = SVG_WIDTH - SVG_MARGIN['left'] - SVG_MARGIN['right']
+    plot_height = SVG_HEIGHT - SVG_MARGIN['top'] - SVG_MARGIN['bottom']
+    left, top = SVG_MARGIN['left'], SVG_MARGIN['top']
+    bottom = top + plot_height
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {SVG_WIDTH} {SVG_HEIGHT}" '
+        f'font-family="sans-serif" font-size="11" fill="#999">',
+        f'<text x="{SVG_WIDTH / 2}" y="20" text-anchor="middle" font-size="14">{escape(title)}</text>'
+    ]
+
+    steps = min(max_count, 5) or 1
+    for i in range(steps + 1):
+        value = max_count * i / steps
+        y = bottom - plot_height * i / steps
+        parts.append(f'<line x1="{left}" y1="{y:.1f}" x2="{left + plot_width}" y2="{y:.1f}" stroke="#999" stroke-opacity="0.3"/>')
+        parts.append(f'<text x="{left - 6}" y="{y + 4:.1f}" text-anchor="end">{_format_number(round(value, 2))}</text>')
+
+    parts.extend(body)
+    parts.append(f'<text x="{left + plot_width / 2}" y="{SVG_HEIGHT - 8}" text-anchor="middle">{escape(x_label)}</text>')
+    parts.append(f'<text x="14" y="{top + plot_height / 2}" text-anchor="middle" '
+                 f'transform="rotate(-90 14 {top + plot_height / 2})">{escape(y_label)}</text>')
+    parts.append('</svg>')
+    return ''.join(parts)
+
+
+def render_bar_svg(spec):
+    counts = spec['counts']
+    max_count = max(counts) or 1
+    plot_width = SVG_WIDTH - SVG_MARGIN['left'] - SVG_MARGIN['right']
+    plot_height = SVG_HEIGHT - SVG_MARGIN['top'] - SVG_MARGIN['bottom']
+    bottom = SVG_MARGIN['top'] + plot_height
+    slot = plot_width / max(len(counts), 1)
+
+    body = []
+    for i, (label, count) in enumerate(zip(spec['labels'], counts)):
+        height = plot_height * count / max_count
+        x = SVG_MARGIN['left'] + slot * i + slot * 0.1
+        center = x + slot * 0.4
+        body.append(f'<rect x="{x:.1f}" y="{bottom - height:.1f}" width="{slot * 0.8:.1f}" '
+                    f'height="{height:.1f}" fill="{CHART_COLOR}"/>')
+        body.append(f'<text x="{center:.1f}" y="{bottom - height - 4:.1f}" text-anchor="middle">{count}</text>')
+        body.append(f'<text x="{center:.1f}" y="{bottom + 12}" text-anchor="end" '
+                    f'transform="rotate(-45 {center:.1f} {bottom + 12})">{escape(label)}</text>')
+    return _svg_frame(spec['title'], spec.get('x_label', 'Options'), 'Response Count', max_count, body)
+
+
+def render_histogram_svg(spec):
+    edges, counts = histogram_bins(spec['values'], spec['weights'])
+    max_count = max(counts) or 1
+    plot_width = SVG_WIDTH - SVG_MARGIN['left'] - SVG_MARGIN['right']
+    plot_height = SVG_HEIGHT - SVG_MARGIN['top'] - SVG_MARGIN['bottom']
+    bottom = SVG_MARGIN['top'] + plot_height
+    slot = plot_width / len(counts)
+
+    body = []
+    for i, count in enumerate(counts):
+        height = plot_height * count / max_count
+        x = SVG_MARGIN['left'] + slot * i
+        body.append(f'<rect x="{x:.1f}" y="{bottom - height:.1f}" width="{slot:.1f}" height="{height:.1f}" '
+                    f'fill="{CHART_COLOR}" fill-opacity="0.7" stroke="#000"/>')
+    for i, edge in enumerate(edges):
+        x = SVG_MARGIN['left'] + slot * i
+        body.append(f'<text x="{x:.1f}" y="{bottom + 14}" text-anchor="middle">{_format_number(round(edge, 2))}</text>')
+    return _svg_frame(spec['title'], 'Rating', 'Response Count', max_count, body)
+
+
+SVG_RENDERERS = {
+    'bar': render_bar_svg,
+    'histogram': render_histogram_svg
+}
+
+
+def render_chart_svg(spec):
+    """Render a chart spec to SVG bytes"""
+    return SVG_RENDERERS[spec['kind']](spec).encode('utf-8')
+
+
+# JSON backend
+
+def render_chart_json(spec):
+    """Serialize a chart spec for client-side drawing, with histogram bins precomputed"""
+    if spec['kind'] == 'histogram':
+        edges, counts = histogram_bins(spec['values'], spec['weights'])
+        spec = {
+            'kind': 'histogram',
+            'title': spec['title'],
+            'edges': [round(edge, 4) for edge in edges],
+            'counts': counts
+        }
+    elif spec['kind'] != 'bar':
+        raise KeyError(spec['kind'])
+    return json.dumps(spec, separators=(',', ':')).encode('utf-8')
+
+
+# matplotlib backend
+
+def render_bar_chart(ax, spec):
+    bars = ax.bar(spec['labels'], spec['counts'], color=CHART_COLOR)
+
+    # Add value labels on top of bars
+    for bar in bars:
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width() / 2., height + 0.1,
+                str(int(height)), ha='center', va='bottom')
+
+    ax.set_xlabel(spec.get('x_label', 'Options'))
+    ax.set_ylabel('Response Count')
+    ax.tick_params(axis='x', labelrotation=45)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment('right')
+
+
+def render_histogram(ax, spec):
+    ax.hist(spec['values'], weights=spec['weights'], bins=HISTOGRAM_BINS, color=CHART_COLOR, alpha=0.7, edgecolor='black')
+    ax.set_xlabel('Rating')
+    ax.set_ylabel('Response Count')
+
+    # Add grid for better readability
+    ax.grid(axis='y', alpha=0.3)
+
+
+RENDERERS = {
+    'bar': render_bar_chart,
+    'histogram': render_histogram
+}
+
+
+def render_chart_png(spec):
+    """Render a chart spec to PNG bytes"""
+    import matplotlib
+    matplotlib.use('Agg')  # Use Agg backend to avoid GUI requirements
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    RENDERERS[spec['kind']](ax, spec)
+    ax.set_title(spec['title'])
+    fig.tight_layout()
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', transparent=True)
+    return buf.getvalue()
+
+
+BACKENDS = {
+    'svg': (render_chart_svg, 'image/svg+xml', SVG_RENDERERS),
+    'json': (render_chart_json, 'application/json', SVG_RENDERERS),
+    'matplotlib': (render_chart_png, 'image/png', RENDERERS)
+}
+
+
+def resolve_backend(spec, backend):
+    """The backend that will actually draw spec: the requested one, or matplotlib as the fallback"""
+    if spec['kind'] in BACKENDS[backend][2]:
+        return backend
+    return 'matplotlib'
+
+
+def render_chart(spec, backend='svg'):
+    """Render a chart spec with the given backend; returns (data, mimetype)"""
+    renderer, mimetype, _ = BACKENDS[resolve_backend(spec, backend)]
+    return renderer(spec), mimetype
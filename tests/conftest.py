@@ -0,0 +1,68 @@
+# coding: utf-8
+"""
+Shared fixtures. Like benchmark.py, the tests never touch survey.db: the app
+is pointed at a scratch database before it is imported, and every test gets
+a fresh database file of its own.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+_workdir = tempfile.mkdtemp(prefix='survey-tests-')
+os.environ['DATABASE'] = os.path.join(_workdir, 'bootstrap.db')
+os.environ.setdefault('FLASK_ENV', 'production')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as survey_app  # noqa: E402
+
+CREATOR = 'test-creator'
+
+
+@pytest.fixture
+def app(tmp_path):
+    """The app on a fresh database, with CSRF off and empty caches"""
+    flask_app = survey_app.app
+    saved = dict(flask_app.config)
+    flask_app.config.update(DATABASE=str(tmp_path / 'survey.db'), WTF_CSRF_ENABLED=False)
+    survey_app.init_db()
+    survey_app.survey_cache.clear()
+    survey_app.ownership._cache.clear()
+    yield flask_app
+    flask_app.config.clear()
+    flask_app.config.update(saved)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_survey(app):
+    """make_survey(questions) -> survey id; questions are (question_type, [option texts]) pairs"""
+    def make(questions, published=True):
+        with survey_app.DatabaseConnection(write=True) as conn:
+            survey_id = conn.execute(
+                'INSERT INTO surveys (title, creator_ip, published) VALUES (?, ?, ?)',
+                ('Test survey', CREATOR, 1 if published else 0)
+            ).lastrowid
+            for position, (question_type, options) in enumerate(questions, 1):
+                question_id = conn.execute(
+                    'INSERT INTO questions (survey_id, question_text, question_type, position) VALUES (?, ?, ?, ?)',
+                    (survey_id, f"Question {position}", question_type, position)
+                ).lastrowid
+                for option_position, option_text in enumerate(options, 1):
+                    conn.execute(
+                        'INSERT INTO options (question_id, option_text, position) VALUES (?, ?, ?)',
+                        (question_id, option_text, option_position)
+                    )
+        return survey_id
+    return make
+
+
+def as_creator():
+    """environ_base for requests made from the survey creator's address"""
+    return {'REMOTE_ADDR': CREATOR}
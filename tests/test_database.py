@@ -0,0 +1,44 @@
+# coding: utf-8
+import sqlite3
+
+import pytest
+
+import app as survey_app
+
+
+def survey_titles(app):
+    other = sqlite3.connect(app.config['DATABASE'])
+    try:
+        return [row[0] for row in other.execute("SELECT title FROM surveys WHERE title IN ('outer', 'inner', 'after', 'nested') ORDER BY id")]
+    finally:
+        other.close()
+
+
+def test_write_nested_in_a_read_commits_at_its_own_end(app):
+    with survey_app.DatabaseConnection() as conn:
+        cursor = conn.execute('SELECT id FROM surveys ORDER BY id')
+        first = next(cursor)[0]
+        with survey_app.DatabaseConnection(write=True) as inner:
+            inner.execute("INSERT INTO surveys (title) VALUES ('nested')")
+        
+        # Committed and the write lock released while the outer read is still open
+        assert survey_titles(app)[-1] == 'nested'
+        other = sqlite3.connect(app.config['DATABASE'], timeout=0)
+        try:
+            other.execute('BEGIN IMMEDIATE')
+            other.rollback()
+        finally:
+            other.close()
+        assert all(row[0] > first for row in cursor)
+
+
+def test_failed_nested_write_is_rolled_back_on_its_own(app):
+    with survey_app.DatabaseConnection(write=True) as conn:
+        conn.execute("INSERT INTO surveys (title) VALUES ('outer')")
+        with pytest.raises(ValueError):
+            with survey_app.DatabaseConnection(write=True) as inner:
+                inner.execute("INSERT INTO surveys (title) VALUES ('inner')")
+                raise ValueError('rejected')
+        conn.execute("INSERT INTO surveys (title) VALUES ('after')")
+    
+    assert survey_titles(app) == ['outer', 'after']
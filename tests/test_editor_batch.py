@@ -0,0 +1,57 @@
+# coding: utf-8
+import app as survey_app
+from conftest import as_creator
+
+
+def batch(client, survey_id, operations):
+    return client.post(f'/api/survey/{survey_id}/batch', json={'operations': operations}, environ_base=as_creator())
+
+
+def stored_questions(survey_id):
+    with survey_app.DatabaseConnection() as conn:
+        return [(question['question_text'], [option['option_text'] for option in question['options']])
+                for question in survey_app.load_questions(conn, survey_id)]
+
+
+def test_optional_operations_skip_invalid_items(client, make_survey):
+    survey_id = make_survey([])
+    response = batch(client, survey_id, [
+        {'op': 'create_question', 'optional': True, 'question_text': 'Favourite colour?', 'options': ['Red', 'Blue']},
+        {'op': 'create_question', 'optional': True, 'question_text': 'x' * 501, 'question_type': 'text'},
+        {'op': 'create_question', 'optional': True, 'question_text': 'Pick one', 'options': ['A', 5]},
+        {'op': 'create_question', 'optional': True, 'question_text': 'How was it?', 'question_type': 'rating'}
+    ])
+    assert response.status_code == 200, response.get_json()
+    
+    results = response.get_json()['results']
+    assert [bool(result.get('skipped')) for result in results] == [False, True, True, False]
+    assert results[2]['skipped'] == 'Option text must be a string'
+    assert stored_questions(survey_id) == [('Favourite colour?', ['Red', 'Blue']), ('How was it?', [])]
+
+
+def test_invalid_operation_rolls_back_the_batch(client, make_survey):
+    survey_id = make_survey([])
+    response = batch(client, survey_id, [
+        {'op': 'create_question', 'question_text': 'Favourite colour?', 'options': ['Red', 'Blue']},
+        {'op': 'create_question', 'question_text': 'Pick one', 'options': 'ABC'}
+    ])
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'options must be a list of option texts', 'operation': 1}
+    assert stored_questions(survey_id) == []
+
+
+def test_deleting_a_question_deletes_its_options(client, make_survey):
+    survey_id = make_survey([('multiple-choice', ['Red', 'Blue'])])
+    question = survey_app.get_cached_survey(survey_id)['questions'][0]
+    option_id = question['options'][0]['id']
+    assert survey_app.ownership.resolve('option', option_id)[0] == survey_id
+    
+    response = batch(client, survey_id, [
+        {'op': 'delete_question', 'id': question['id']},
+        {'op': 'update_option', 'optional': True, 'id': option_id, 'option_text': 'Green'}
+    ])
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['results'][1] == {'skipped': f"Option {option_id} not found in this survey"}
+    
+    # Forgotten once committed, not served from the ownership cache
+    assert survey_app.ownership.resolve('option', option_id) is None
@@ -0,0 +1,60 @@
+# coding: utf-8
+import sqlite3
+
+import pytest
+
+import app as survey_app
+
+
+def seed_ratings(survey_id, responses):
+    with survey_app.DatabaseConnection(write=True) as conn:
+        question_id = conn.execute('SELECT id FROM questions WHERE survey_id = ?', (survey_id,)).fetchone()[0]
+        for n in range(responses):
+            response_id = conn.execute(
+                'INSERT INTO responses (survey_id, respondent_ip) VALUES (?, ?)', (survey_id, 'seed')
+            ).lastrowid
+            conn.execute(
+                'INSERT INTO answers (response_id, question_id, number_answer) VALUES (?, ?, ?)',
+                (response_id, question_id, n % 5 + 1)
+            )
+
+
+@pytest.mark.parametrize('export_format', ['csv', 'npz'])
+def test_export_job_progress_is_visible_while_it_runs(app, make_survey, monkeypatch, export_format):
+    survey_id = make_survey([('rating', [])])
+    seed_ratings(survey_id, 25000)
+    monkeypatch.setattr(survey_app, 'EXPORT_CHUNK_SIZE', 4096)
+    monkeypatch.setattr(survey_app.ExportJobs, 'PROGRESS_INTERVAL', 0)
+    
+    with survey_app.DatabaseConnection(write=True) as conn:
+        job_id = conn.execute(
+            'INSERT INTO export_jobs (survey_id, format, stamp, total) VALUES (?, ?, ?, ?)',
+            (survey_id, export_format, 'test', 25000)
+        ).lastrowid
+    
+    # Look at the job from another connection each time the export reports progress
+    observed = []
+    build_export = survey_app.build_export
+    
+    def observing_build_export(survey_id, export_format, progress=None):
+        def observe(done):
+            progress(done)
+            other = sqlite3.connect(app.config['DATABASE'], timeout=0)
+            try:
+                observed.append(other.execute('SELECT progress FROM export_jobs WHERE id = ?', (job_id,)).fetchone()[0])
+                # Fails with "database is locked" if the export is holding the write lock
+                other.execute('BEGIN IMMEDIATE')
+                other.execute('ROLLBACK')
+            finally:
+                other.close()
+        return build_export(survey_id, export_format, progress=observe)
+    
+    monkeypatch.setattr(survey_app, 'build_export', observing_build_export)
+    survey_app.ExportJobs(workers=1)._run(job_id, survey_id, export_format, 'test')
+    
+    job = survey_app.export_jobs.status(survey_id, job_id)
+    assert job['status'] == 'done', job['error']
+    assert job['progress'] == 25000
+    assert len(observed) > 1
+    assert 0 < observed[-1] <= 25000
+    assert observed == sorted(observed)
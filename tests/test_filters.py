@@ -0,0 +1,46 @@
+# coding: utf-8
+import pytest
+
+import app as survey_app
+from conftest import as_creator
+
+
+def matching_responses(survey_id, questions, args):
+    conditions, params = survey_app.parse_response_filters(args, questions)
+    with survey_app.DatabaseConnection() as conn:
+        where = ' AND '.join(['r.survey_id = ?'] + conditions)
+        return [row[0] for row in conn.execute(f'SELECT r.id FROM responses r WHERE {where} ORDER BY r.id',
+                                               [survey_id] + params)]
+
+
+@pytest.fixture
+def text_survey(make_survey):
+    survey_id = make_survey([('text', []), ('text', [])])
+    questions = survey_app.get_cached_survey(survey_id)['questions']
+    first, second = (question['id'] for question in questions)
+    with survey_app.DatabaseConnection(write=True) as conn:
+        for text in ('Äpfel sind gut', 'Birnen', 'Kirschen'):
+            rows = [(first, None, text, None), (second, None, 'Äpfel', None)]
+            survey_app.insert_response(conn, survey_id, 'seed', rows)
+    return survey_id, questions
+
+
+@pytest.mark.parametrize('value', ['äpfel', 'ÄPFEL', 'apfel', 'Äpf GUT'])
+def test_contains_folds_case_and_accents(text_survey, value):
+    survey_id, questions = text_survey
+    assert matching_responses(survey_id, questions, {f"contains_{questions[0]['id']}": value}) == [1]
+
+
+def test_contains_is_scoped_to_the_question(text_survey):
+    survey_id, questions = text_survey
+    assert matching_responses(survey_id, questions, {f"contains_{questions[0]['id']}": 'birnen'}) == [2]
+    assert matching_responses(survey_id, questions, {f"contains_{questions[1]['id']}": 'birnen'}) == []
+
+
+@pytest.mark.parametrize('value', ['nan', 'inf', '-inf'])
+def test_non_finite_bounds_are_rejected(client, make_survey, value):
+    survey_id = make_survey([('rating', [])])
+    question_id = survey_app.get_cached_survey(survey_id)['questions'][0]['id']
+    response = client.get(f'/survey/{survey_id}/export?min_{question_id}={value}', environ_base=as_creator())
+    assert response.status_code == 400
+    assert response.get_json() == {'error': f"Invalid filter: Invalid min for question {question_id}: {value}"}
@@ -0,0 +1,82 @@
+# coding: utf-8
+import json
+
+import pytest
+
+import app as survey_app
+from conftest import as_creator
+
+
+def ndjson(question_id, responses):
+    return ''.join(json.dumps({'answers': [{'question_id': question_id, 'number_answer': n % 5 + 1}],
+                               'submission_key': f"replay-{n}"}) + '\n'
+                   for n in range(responses))
+
+
+def test_imports_have_their_own_upload_limit(app, client, make_survey):
+    app.config.update(MAX_CONTENT_LENGTH=1000, IMPORT_MAX_CONTENT_LENGTH=100000)
+    survey_id = make_survey([('rating', [])])
+    question_id = survey_app.get_cached_survey(survey_id)['questions'][0]['id']
+    
+    body = ndjson(question_id, 200)
+    assert 1000 < len(body) < 100000
+    response = client.post(f'/api/survey/{survey_id}/import', data=body,
+                           content_type='application/x-ndjson', environ_base=as_creator())
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['imported'] == 200
+    
+    response = client.post(f'/api/survey/{survey_id}/import', data=ndjson(question_id, 2000),
+                           content_type='application/x-ndjson', environ_base=as_creator())
+    assert response.status_code == 413
+    assert 'IMPORT_MAX_CONTENT_LENGTH' in response.get_json()['error']
+
+
+
+def seed_unkeyed(survey_id, question_id, responses):
+    with survey_app.DatabaseConnection(write=True) as conn:
+        for n in range(responses):
+            survey_app.insert_response(conn, survey_id, 'seed',
+                                       [(question_id, None, None, n % 5 + 1)])
+
+
+def import_file(client, survey_id, body, import_format):
+    response = client.post(f'/api/survey/{survey_id}/import?format={import_format}', data=body,
+                           environ_base=as_creator())
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+@pytest.mark.parametrize('export_format', ['csv', 'ndjson'])
+def test_exports_can_be_imported_again(client, make_survey, export_format):
+    survey_id = make_survey([('rating', [])])
+    copy_id = make_survey([('rating', [])])
+    question_id = survey_app.get_cached_survey(survey_id)['questions'][0]['id']
+    seed_unkeyed(survey_id, question_id, 3)
+    
+    exported = client.get(f'/survey/{survey_id}/export?format={export_format}', environ_base=as_creator())
+    assert exported.status_code == 200
+    body = exported.get_data()
+    
+    # Into the survey it came from: every row is already there
+    result = import_file(client, survey_id, body, export_format)
+    assert (result['imported'], result['duplicates'], result['unkeyed']) == (0, 3, 0)
+    assert 'warning' not in result
+    
+    # Into another survey (ndjson answers are keyed by question id, so only csv moves between surveys):
+    # stored once, duplicates the second time
+    if export_format != 'csv':
+        return
+    result = import_file(client, copy_id, body, export_format)
+    assert (result['imported'], result['duplicates']) == (3, 0)
+    result = import_file(client, copy_id, body, export_format)
+    assert (result['imported'], result['duplicates']) == (0, 3)
+
+
+def test_import_warns_about_responses_without_a_key(client, make_survey):
+    survey_id = make_survey([('rating', [])])
+    question_id = survey_app.get_cached_survey(survey_id)['questions'][0]['id']
+    body = json.dumps({'answers': [{'question_id': question_id, 'number_answer': 3}]}) + '\n'
+    
+    result = import_file(client, survey_id, body, 'ndjson')
+    assert (result['imported'], result['unkeyed']) == (1, 1)
+    assert 'no submission key' in result['warning']
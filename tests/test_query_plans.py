@@ -0,0 +1,7 @@
+# coding: utf-8
+import app as survey_app
+
+
+def test_hot_path_queries_use_their_indexes(app):
+    assert survey_app.init_db() == survey_app.MIGRATIONS[-1][0]
+    assert survey_app.check_query_plans() == []
@@ -0,0 +1,43 @@
+# coding: utf-8
+import sqlite3
+
+import pytest
+
+import app as survey_app
+
+
+def test_rejecting_an_empty_bucket_needs_no_write_lock(app):
+    limiter = survey_app.RateLimiter(backend='sqlite')
+    assert limiter.check('add_question', 'client', 1, 60)
+    
+    # With another connection holding the write lock, a failed write would fail open (allow)
+    other = sqlite3.connect(app.config['DATABASE'])
+    try:
+        other.execute('BEGIN IMMEDIATE')
+        assert not limiter.check('add_question', 'client', 1, 60)
+    finally:
+        other.rollback()
+        other.close()
+    assert limiter.stats()['errors'] == 0
+
+
+def test_local_routes_are_limited_in_process(app):
+    limiter = survey_app.RateLimiter(backend='sqlite', local_routes=['submit_survey'])
+    assert [limiter.check('submit_survey', 'client', 2, 60) for _ in range(3)] == [True, True, False]
+    
+    with survey_app.DatabaseConnection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM rate_limits').fetchone()[0] == 0
+
+
+def test_rate_limit_overrides_are_validated():
+    assert survey_app.parse_rate_limits(' submit_survey=100/60, add_question=5 ') == {
+        'submit_survey': (100, 60.0), 'add_question': (5, 60.0)
+    }
+    for value in ('submit_survey=0/60', 'submit_survey=10/0', 'foo=abc', 'foo', '=5/60', 'foo=5/nan', 'foo=-1/60'):
+        with pytest.raises(ValueError, match='Invalid RATE_LIMITS entry'):
+            survey_app.parse_rate_limits(value)
+
+
+def test_rate_limit_backend_is_validated():
+    with pytest.raises(ValueError, match="Unknown RATE_LIMIT_BACKEND 'sqllite'"):
+        survey_app.RateLimiter(backend='sqllite')
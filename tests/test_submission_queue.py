@@ -0,0 +1,39 @@
+# coding: utf-8
+import threading
+import time
+
+import pytest
+
+import app as survey_app
+
+
+def test_close_gives_up_on_a_full_queue(app, monkeypatch, caplog):
+    release = threading.Event()
+    monkeypatch.setattr(survey_app.SubmissionQueue, '_write', lambda self, batch: release.wait(5))
+    submissions = survey_app.SubmissionQueue(batch_size=1, batch_wait=0, max_depth=2)
+    survey = {'id': 1, 'version': 1}
+    
+    # One batch stuck in the writer, and the queue behind it full
+    submissions.submit(survey, [], [], 'test')
+    deadline = time.monotonic() + 5
+    while submissions.stats()['depth'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    submissions.submit(survey, [], [], 'test')
+    submissions.submit(survey, [], [], 'test')
+    
+    started = time.monotonic()
+    try:
+        submissions.close(timeout=0.2)
+        assert time.monotonic() - started < 2
+        assert '2 queued submissions were not written' in caplog.text
+    finally:
+        release.set()
+
+
+def test_unknown_submit_mode_is_rejected(app):
+    app.config['SUBMIT_MODE'] = 'batch'
+    with pytest.raises(ValueError, match="Unknown SUBMIT_MODE 'batch'"):
+        survey_app.get_submit_mode()
+    
+    app.config['SUBMIT_MODE'] = 'group'
+    assert survey_app.get_submit_mode() == 'group'
@@ -0,0 +1,69 @@
+# coding: utf-8
+import math
+
+import pytest
+
+import app as survey_app
+
+
+def question_ids(survey_id):
+    with survey_app.DatabaseConnection() as conn:
+        return [row['id'] for row in conn.execute(
+            'SELECT id FROM questions WHERE survey_id = ? ORDER BY position', (survey_id,)
+        )]
+
+
+@pytest.mark.parametrize('value', ['nan', 'inf', '-inf', 'Infinity', 1e300])
+def test_validate_answers_rejects_non_finite_and_out_of_range_numbers(app, make_survey, value):
+    survey_id = make_survey([('rating', [])])
+    question_id, = question_ids(survey_id)
+    survey = survey_app.get_cached_survey(survey_id)
+    
+    errors = []
+    rows = survey_app.validate_answers(survey, [{'question_id': question_id, 'number_answer': value}], errors)
+    assert rows == []
+    assert errors == [f"Numeric value out of range for question {question_id}: {float(value)}"]
+
+
+def test_submit_with_non_finite_number_keeps_aggregates_finite(client, make_survey):
+    survey_id = make_survey([('rating', []), ('slider', [])])
+    rating_id, slider_id = question_ids(survey_id)
+    
+    response = client.post(f'/api/survey/{survey_id}/submit', json={'answers': [
+        {'question_id': rating_id, 'number_answer': 'nan'},
+        {'question_id': slider_id, 'number_answer': '7.5'}
+    ]})
+    assert response.status_code == 200, response.get_json()
+    
+    with survey_app.DatabaseConnection() as conn:
+        stats = {row['question_id']: row for row in conn.execute('SELECT * FROM question_stats')}
+        stored = [row[0] for row in conn.execute('SELECT number_answer FROM answers')]
+    assert stored == [7.5]
+    assert rating_id not in stats
+    assert stats[slider_id]['number_sum'] == 7.5
+    assert all(math.isfinite(row['number_sum_squares']) for row in stats.values())
+
+
+def test_submit_with_numeric_text_answer_is_stored_as_text(client, make_survey):
+    survey_id = make_survey([('text', [])])
+    question_id, = question_ids(survey_id)
+    
+    response = client.post(f'/api/survey/{survey_id}/submit', json={'answers': [
+        {'question_id': question_id, 'text_answer': 5}
+    ]})
+    assert response.status_code == 200, response.get_json()
+    
+    with survey_app.DatabaseConnection() as conn:
+        assert conn.execute('SELECT text_answer FROM answers').fetchone()[0] == '5'
+
+
+@pytest.mark.parametrize('value', [['a', 'list'], {'an': 'object'}, True])
+def test_validate_answers_rejects_non_string_text_answers(app, make_survey, value):
+    survey_id = make_survey([('text', [])])
+    question_id, = question_ids(survey_id)
+    survey = survey_app.get_cached_survey(survey_id)
+    
+    errors = []
+    rows = survey_app.validate_answers(survey, [{'question_id': question_id, 'text_answer': value}], errors)
+    assert rows == []
+    assert errors == [f"Invalid text answer for question {question_id}: expected a string"]
@@ -0,0 +1,31 @@
+# coding: utf-8
+import sqlite3
+
+import app as survey_app
+
+
+def test_survey_tree_is_cached_under_the_version_it_was_read_at(app, make_survey, monkeypatch):
+    survey_id = make_survey([('rating', [])])
+    load_questions = survey_app.load_questions
+    
+    def load_questions_during_an_edit(conn, survey_id, question_id=None):
+        # Another worker adds a question between the survey row and the questions being read
+        other = sqlite3.connect(app.config['DATABASE'])
+        try:
+            with other:
+                other.execute(
+                    "INSERT INTO questions (survey_id, question_text, question_type, position) VALUES (?, 'Added', 'text', 2)",
+                    (survey_id,)
+                )
+        finally:
+            other.close()
+        monkeypatch.setattr(survey_app, 'load_questions', load_questions)
+        return load_questions(conn, survey_id, question_id)
+    
+    monkeypatch.setattr(survey_app, 'load_questions', load_questions_during_an_edit)
+    survey = survey_app.get_cached_survey(survey_id)
+    assert len(survey['questions']) == 1
+    
+    # The edit bumped the version, so the next read reloads the tree
+    survey = survey_app.get_cached_survey(survey_id)
+    assert [question['question_text'] for question in survey['questions']] == ['Question 1', 'Added']
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# coding: utf-8
+"""
+Term extraction for text answers.
+
+Used by app.record_answer_aggregates to fold each text answer into the
+per-question term and bigram counts as it's submitted, so top terms never
+need a scan over the answers table. Kept free of Flask like chart_render.
+
+Words are lowercased with accents removed. Stop words and one-letter words
+are dropped; bigrams are pairs of adjacent kept words, so they never span a
+stop word ("fast and friendly" gives no bigram, "friendly staff" does).
+"""
+
+import re
+import unicodedata
+
+WORD = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)*")
+
+STOP_WORDS = frozenset("""
+a about above after again against all am an and any are aren't as at be because been before being
+below between both but by can can't cannot could couldn't did didn't do does doesn't doing don't down
+during each few for from further get got had hadn't has hasn't have haven't having he he'd he'll he's
+her here here's hers herself him himself his how how's i i'd i'll i'm i've if in into is isn't it it's
+its itself just let's me more most much mustn't my myself no nor not of off on once only or other ought
+our ours ourselves out over own really same shan't she she'd she'll she's should shouldn't so some such
+than that that's the their theirs them themselves then there there's these they they'd they'll they're
+they've this those through to too under until up very was wasn't we we'd we'll we're we've were weren't
+what what's when when's where where's which while who who's whom why why's will with won't would
+wouldn't you you'd you'll you're you've your yours yourself yourselves also yes ok okay
+""".split())
+
+
+def normalize(text):
+    """Lowercase and strip accents, so "Café" and "cafe" count as one term"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).replace('’', "'")
+
+
+def extract_terms(text):
+    """(terms, bigrams): the distinct words and adjacent word pairs of a text answer"""
+    terms = set()
+    bigrams = set()
+    previous = None
+    for word in WORD.findall(normalize(text)):
+        if len(word) < 2 or word in STOP_WORDS:
+            previous = None
+            continue
+        terms.add(word)
+        if previous:
+            bigrams.add(f"{previous} {word}")
+        previous = word
+    return terms, bigrams